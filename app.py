@@ -1,10 +1,40 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, abort
+import hmac
+import os
 import config
 import db
+import metrics
+import mongo_monitoring
+import threading
 from assistant_processor import assistant_processor
+from assistant_functions import warm_reference_cache
 
 app = Flask(__name__)
 
+def start_reference_cache_warmup():
+    """Load plans in the background so the first Katie commands don't pay for it (once per server process)"""
+    if config.REFERENCE_CACHE_WARMUP:
+        threading.Thread(target=warm_reference_cache, daemon=True, name="reference-cache-warmup").start()
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """
+    Counters and histograms (incl. mongo.<client>.* latencies) and recent slow MongoDB commands
+    
+    Per process: only the gunicorn worker that served this request (pid in the response).
+    The reply worker prints its own metrics periodically (see worker/worker.py dump_metrics).
+    """
+    # Internal data on the public webhook server - only for callers holding METRICS_TOKEN
+    token = request.headers.get('X-Metrics-Token', '')
+    if not config.METRICS_TOKEN or not hmac.compare_digest(token.encode(), config.METRICS_TOKEN.encode()):
+        abort(404)
+    
+    return jsonify({
+        "pid": os.getpid(),
+        **metrics.snapshot(),
+        "slow_mongo_commands": mongo_monitoring.recent_slow_commands()
+    })
+
 @app.route('/webhook/', methods=['POST'])
 def webhook():
     data = request.json
@@ -162,4 +192,5 @@ if __name__ == '__main__':
     print(f"Testing mode: {config.TESTING}")
     print(f"Port: {config.FLASK_PORT}")
     
+    start_reference_cache_warmup()
     app.run(host='0.0.0.0', port=config.FLASK_PORT, debug=config.FLASK_DEBUG) 
\ No newline at end of file
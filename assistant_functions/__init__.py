@@ -5,10 +5,12 @@ Structured database interaction functions for AI assistant
 
 from .database import AssistantDB
 from .function_registry import FunctionRegistry
-from .function_loader import get_registry, get_functions_documentation, execute_function
+from .identity_loader import IdentityLoader
+from .reference_cache import warm_reference_cache, invalidate_reference_cache, reference_cache_stats
+from .function_loader import get_registry, get_functions_documentation, get_functions_prompt, get_tool_schemas, execute_function, execute_function_traced, reload_functions
 
 # Initialize components
 assistant_db = AssistantDB()
 
 # Export main interface
-__all__ = ['assistant_db', 'get_registry', 'get_functions_documentation', 'execute_function']
\ No newline at end of file
+__all__ = ['assistant_db', 'IdentityLoader', 'warm_reference_cache', 'invalidate_reference_cache', 'reference_cache_stats', 'get_registry', 'get_functions_documentation', 'get_functions_prompt', 'get_tool_schemas', 'execute_function', 'execute_function_traced', 'reload_functions']
\ No newline at end of file
@@ -0,0 +1,522 @@
+"""
+Materialized Account Snapshots
+Denormalized user -> workspaces -> organization -> plan view, kept in the dashboard DB
+
+One document per user email answers "all workspaces with plan, owner and status for
+this email" with a single _id read, instead of walking users, workspaces,
+organizations and plans in the production app DB on every Katie command.
+
+Snapshots are written three ways:
+- read-through: IdentityLoader.build_account_view() stores what check_user_plan computed
+  live when no fresh snapshot exists
+- change streams: watch_app_changes() refreshes users affected by app DB changes
+- delta job: run_delta_refresh() refreshes users affected by documents modified since the
+  last run (for deployments without change streams)
+(run_snapshot_refresher.py runs either of the last two.)
+
+Snapshot document:
+    {"_id": email, "user_info", "workspaces", "workspace_summary",
+     "user_id", "workspace_ids", "org_ids", "plan_ids",  # source ids, indexed for refreshes
+     "refreshed_at", "source", "version"}               # staleness metadata
+
+Freshness: while the refresher is running (reported within
+ACCOUNT_SNAPSHOT_REFRESHER_HEALTHY_SECONDS) every snapshot it wrote since it started
+covering changes is current, whatever its age. Without a running refresher its
+snapshots older than ACCOUNT_SNAPSHOT_MAX_AGE_SECONDS are rebuilt live. Read-through
+snapshots are built from secondaries and the reference cache, and may predate a change
+the refresher already applied - they expire after ACCOUNT_SNAPSHOT_READ_THROUGH_MAX_AGE_SECONDS.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import time
+from datetime import timedelta, timezone
+
+import config
+import metrics
+from .database import AssistantDB
+from .reference_cache import REFERENCE_CACHES, TTLCache, invalidate_reference_cache
+
+# Bump when the snapshot shape changes - older snapshots are treated as missing
+SNAPSHOT_VERSION = 2
+
+# Fields returned to readers (the source id arrays are only for refreshes)
+SNAPSHOT_PROJECTION = {
+    "user_info": 1, "workspaces": 1, "workspace_summary": 1,
+    "refreshed_at": 1, "source": 1, "version": 1
+}
+
+# App DB collections a snapshot is built from
+SOURCE_COLLECTIONS = ["users", "workspaces", "organizations", "plans"]
+
+# Snapshot field holding each source collection's ids (users are keyed by email)
+SOURCE_ID_FIELDS = {"workspaces": "workspace_ids", "organizations": "org_ids", "plans": "plan_ids"}
+
+# Refresh state document (_id) in the <collection>_state collection
+STATE_ID = "refresher"
+
+# Snapshot sources written by the refresher (trusted for as long as it keeps running)
+REFRESHER_SOURCES = {"delta", "change_stream"}
+
+# State fields a running refresher keeps moving (delta runs, changes, idle change stream heartbeats)
+STATE_REPORT_FIELDS = ["last_delta_at", "last_change_at", "heartbeat_at"]
+
+# Refresher state as seen by readers (one state read per process every few seconds)
+_state_cache = TTLCache("account_snapshot_state", config.ACCOUNT_SNAPSHOT_STATE_CACHE_SECONDS, 1)
+
+# Re-read this much before the last delta run to cover clock skew and in-flight writes
+DELTA_OVERLAP_SECONDS = 60
+
+# User ids checked per query when looking for deleted users
+DELETE_CHECK_BATCH_SIZE = 1000
+
+
+def build_account_view(loader, user_doc):
+    """
+    Assemble a user's workspaces with plan, owner and status (the check_user_plan result)
+
+    Returns:
+        (view, source_ids) - source_ids: {"user_id", "workspace_ids", "org_ids", "plan_ids"} the view was built from
+    """
+    user_workspaces = user_doc.get("workspaces", [])
+    workspace_ids = [ws_info.get("workspace_id") for ws_info in user_workspaces]
+
+    # Batch-fetch workspaces, organizations, plans and owners - one $in query each
+    # instead of four queries per workspace (cached for the rest of the command)
+    workspaces_by_id = loader.load_workspaces(workspace_ids)
+
+    org_ids = [ws_doc.get("org_id") for ws_doc in workspaces_by_id.values()]
+    orgs_by_id = loader.load_organizations(org_ids)
+
+    plan_ids = [org_doc.get("plan_id") for org_doc in orgs_by_id.values()]
+    plans_by_id = loader.load_plans(plan_ids)
+
+    owner_email_by_org = loader.load_owner_emails(list(orgs_by_id.keys()))
+
+    workspace_info_list = []
+
+    for ws_info in user_workspaces:
+        ws_id_obj = ws_info.get("workspace_id")
+        if not ws_id_obj:
+            continue
+
+        role_name = ws_info.get("role_name", "N/A")
+
+        # Get workspace document
+        ws_doc = workspaces_by_id.get(ws_id_obj)
+        if not ws_doc:
+            continue
+
+        workspace_name = ws_doc.get("name", f"Workspace {str(ws_id_obj)}")
+        workspace_status = ws_doc.get("status", "Unknown")
+
+        # Get organization and plan details
+        org_id = ws_doc.get("org_id")
+        plan_name = "N/A"
+        owner_email = "N/A"
+        internal_group = "N/A"
+
+        if org_id:
+            org_doc = orgs_by_id.get(org_id)
+            if org_doc:
+                # Get plan name
+                plan_id = org_doc.get("plan_id")
+                if plan_id:
+                    plan_doc = plans_by_id.get(plan_id)
+                    if plan_doc:
+                        plan_name = plan_doc.get("plan_name", "N/A")
+
+                # Workspace owner
+                owner_email = owner_email_by_org.get(org_id, "N/A")
+
+                internal_group = org_doc.get("internal_group", "N/A")
+
+        workspace_info_list.append({
+            "workspace_id": str(ws_id_obj),
+            "organization_id": str(org_id) if org_id else None,
+            "workspace_name": workspace_name,
+            "role_name": role_name,
+            "plan_name": plan_name,
+            "owner_email": owner_email,
+            "status": workspace_status,
+            "internal_group": internal_group
+        })
+
+    # Count active/inactive workspaces
+    active_workspaces = sum(1 for ws in workspace_info_list if ws["status"] == "ACTIVE")
+    inactive_workspaces = sum(1 for ws in workspace_info_list if ws["status"] == "INACTIVE")
+
+    view = {
+        "user_info": {
+            "email": user_doc.get("email"),
+            "first_name": user_doc.get("first_name"),
+            "last_name": user_doc.get("last_name"),
+            "role_name": user_doc.get("role_name"),
+            "status": user_doc.get("status")
+        },
+        "workspaces": workspace_info_list,
+        "workspace_summary": {
+            "total_workspaces": len(workspace_info_list),
+            "active_workspaces": active_workspaces,
+            "inactive_workspaces": inactive_workspaces
+        }
+    }
+
+    source_ids = {
+        "user_id": user_doc.get("_id"),
+        "workspace_ids": [ws_id for ws_id in workspace_ids if ws_id],
+        "org_ids": [org_id for org_id in org_ids if org_id],
+        "plan_ids": [plan_id for plan_id in plan_ids if plan_id]
+    }
+
+    return view, source_ids
+
+
+def read_account_snapshot(db, email, max_age_seconds=None):
+    """
+    Get a user's snapshot if it is fresh enough
+
+    A refresher-written snapshot is fresh when the refresher is running and has covered
+    changes since it was written, otherwise when it is younger than max_age_seconds.
+    A read-through snapshot is fresh only for ACCOUNT_SNAPSHOT_READ_THROUGH_MAX_AGE_SECONDS.
+
+    Returns:
+        Snapshot document (with "age_seconds") or None when missing, stale or an old version
+    """
+    if not config.ACCOUNT_SNAPSHOT_ENABLED or not email:
+        return None
+
+    max_age_seconds = max_age_seconds or config.ACCOUNT_SNAPSHOT_MAX_AGE_SECONDS
+
+    snapshot = db.execute_query(
+        config.ACCOUNT_SNAPSHOT_COLLECTION, "find_one", {"_id": email.lower()}, SNAPSHOT_PROJECTION,
+        use_dashboard_db=True
+    )
+    if not snapshot or snapshot.get("version") != SNAPSHOT_VERSION:
+        metrics.increment("account_snapshot.misses")
+        return None
+
+    refreshed_at = _as_utc(snapshot.get("refreshed_at"))
+    age_seconds = (db.utc_now() - refreshed_at).total_seconds() if refreshed_at else None
+    if age_seconds is None:
+        metrics.increment("account_snapshot.stale")
+        return None
+
+    if snapshot.get("source") in REFRESHER_SOURCES:
+        covered_since = refresher_covered_since(db)
+        if covered_since and refreshed_at >= covered_since:
+            max_age_seconds = None
+            metrics.increment("account_snapshot.refresher_fresh")
+    else:
+        max_age_seconds = min(max_age_seconds, config.ACCOUNT_SNAPSHOT_READ_THROUGH_MAX_AGE_SECONDS)
+
+    if max_age_seconds is not None and age_seconds > max_age_seconds:
+        metrics.increment("account_snapshot.stale")
+        return None
+
+    metrics.increment("account_snapshot.hits")
+    snapshot["age_seconds"] = round(age_seconds)
+    return snapshot
+
+
+def refresher_covered_since(db):
+    """
+    Time since which the refresher has applied every app DB change, or None when
+    no refresher reported within ACCOUNT_SNAPSHOT_REFRESHER_HEALTHY_SECONDS
+    """
+    found, state = _state_cache.get(STATE_ID)
+    if not found:
+        try:
+            state = db.execute_query(
+                f"{config.ACCOUNT_SNAPSHOT_COLLECTION}_state", "find_one", {"_id": STATE_ID},
+                {field: 1 for field in STATE_REPORT_FIELDS + ["covered_since"]},
+                use_dashboard_db=True
+            ) or {}
+        except Exception as e:
+            print(f"Error reading account snapshot refresher state: {e}")
+            state = {}
+        _state_cache.set(STATE_ID, state)
+
+    reports = [_as_utc(state.get(field)) for field in STATE_REPORT_FIELDS if state.get(field)]
+    if not reports or not state.get("covered_since"):
+        return None
+    if (db.utc_now() - max(reports)).total_seconds() > config.ACCOUNT_SNAPSHOT_REFRESHER_HEALTHY_SECONDS:
+        return None
+    return _as_utc(state["covered_since"])
+
+
+def write_account_snapshot(db, view, source_ids, source):
+    """Store a user's view as their snapshot (best effort - failures are logged, not raised)"""
+    email = (view.get("user_info", {}).get("email") or "").lower()
+    if not config.ACCOUNT_SNAPSHOT_ENABLED or not email:
+        return False
+
+    try:
+        _snapshots(db).replace_one(
+            {"_id": email},
+            {
+                "_id": email,
+                **view,
+                **source_ids,
+                "refreshed_at": db.utc_now(),
+                "source": source,
+                "version": SNAPSHOT_VERSION
+            },
+            upsert=True
+        )
+        metrics.increment(f"account_snapshot.writes.{source}")
+        return True
+    except Exception as e:
+        print(f"Error writing account snapshot for {email}: {e}")
+        return False
+
+
+def refresh_account_snapshots(emails, db=None, source="delta"):
+    """
+    Rebuild the snapshots of the given users from the app DB
+
+    Users that no longer exist have their snapshot removed.
+
+    Returns:
+        Number of snapshots written
+    """
+    from .identity_loader import IdentityLoader
+
+    db = db or _refresher_db()
+    written = 0
+
+    for email in sorted({email.lower() for email in emails if email}):
+        # A fresh loader per user - organizations/plans still come from the shared cache
+        # (the refresher invalidates changed ones first)
+        loader = IdentityLoader(db)
+        user_doc = loader.load_user(email)
+        if not user_doc:
+            _snapshots(db).delete_one({"_id": email})
+            continue
+
+        view, source_ids = build_account_view(loader, user_doc)
+        if write_account_snapshot(db, view, source_ids, source):
+            written += 1
+
+    return written
+
+
+def affected_emails(db, changed_ids):
+    """
+    Emails whose snapshot depends on any of the changed documents
+
+    Args:
+        changed_ids: {collection: [_id, ...]} for the SOURCE_COLLECTIONS
+
+    Returns:
+        set of emails
+    """
+    emails = set()
+
+    # Changed users: themselves, plus everyone whose workspace owner may have changed
+    user_ids = changed_ids.get("users") or []
+    if user_ids:
+        users = _find(db.get_collection("users"), {"_id": {"$in": user_ids}}, {"email": 1, "workspaces.org_id": 1})
+        emails.update(user.get("email") for user in users)
+        owner_org_ids = [ws.get("org_id") for user in users for ws in user.get("workspaces", [])]
+        changed_ids = {**changed_ids, "organizations": list(changed_ids.get("organizations") or []) + owner_org_ids}
+
+    # Changed workspaces/organizations/plans: the snapshots built from them
+    conditions = [
+        {SOURCE_ID_FIELDS[collection]: {"$in": ids}}
+        for collection, ids in changed_ids.items()
+        if collection in SOURCE_ID_FIELDS and ids
+    ]
+    if conditions:
+        snapshots = _find(_snapshots(db), {"$or": conditions}, {"_id": 1})
+        emails.update(snapshot["_id"] for snapshot in snapshots)
+
+    emails.discard(None)
+    return emails
+
+
+def run_delta_refresh(db=None):
+    """
+    Refresh the snapshots affected by app DB documents modified since the last run
+
+    Uses config.ACCOUNT_SNAPSHOT_DELTA_FIELD (e.g. modified_at) on the source collections;
+    the first run only records its start time as covered_since (snapshots written before
+    it are judged by age).
+    Deleted users leave nothing to find by that field, so once every
+    ACCOUNT_SNAPSHOT_DELETE_SWEEP_INTERVAL_SECONDS a run also removes the snapshots whose
+    user_id no longer exists (a scan of every snapshot - too heavy for each run).
+
+    Returns:
+        {"since", "changed", "refreshed", "deleted" (None when no sweep ran), "elapsed_ms"}
+    """
+    db = db or _refresher_db()
+    start_time = time.time()
+    run_started_at = db.utc_now()
+
+    state = _state(db).find_one({"_id": STATE_ID}) or {}
+    last_run_at = _as_utc(state.get("last_delta_at"))
+
+    changed = {}
+    refreshed = 0
+    since = None
+
+    if last_run_at:
+        since = last_run_at - timedelta(seconds=DELTA_OVERLAP_SECONDS)
+        for collection in SOURCE_COLLECTIONS:
+            docs = _find(db.get_collection(collection), {config.ACCOUNT_SNAPSHOT_DELTA_FIELD: {"$gte": since}}, {"_id": 1})
+            if docs:
+                changed[collection] = [doc["_id"] for doc in docs]
+
+        if changed:
+            _invalidate_references(changed)
+            refreshed = refresh_account_snapshots(affected_emails(db, changed), db=db, source="delta")
+
+    update = {"last_delta_at": run_started_at}
+
+    deleted = None
+    last_sweep_at = _as_utc(state.get("last_delete_sweep_at"))
+    if not last_sweep_at or (run_started_at - last_sweep_at).total_seconds() >= config.ACCOUNT_SNAPSHOT_DELETE_SWEEP_INTERVAL_SECONDS:
+        deleted = _delete_removed_users(db)
+        update["last_delete_sweep_at"] = run_started_at
+
+    if not last_run_at:
+        update["covered_since"] = run_started_at
+    _state(db).update_one({"_id": STATE_ID}, {"$set": update}, upsert=True)
+
+    elapsed_ms = (time.time() - start_time) * 1000
+    metrics.observe("account_snapshot.delta_ms", elapsed_ms)
+    summary = {
+        "since": since,
+        "changed": {collection: len(ids) for collection, ids in changed.items()},
+        "refreshed": refreshed,
+        "deleted": deleted,
+        "elapsed_ms": round(elapsed_ms)
+    }
+    print(f"DEBUG: Account snapshot delta refresh: {summary}")
+    return summary
+
+
+def watch_app_changes(db=None):
+    """
+    Refresh snapshots from an app DB change stream (blocks; resumes from the stored token)
+
+    Requires a replica set and changeStream privileges on the app DB; raises otherwise
+    so the caller can fall back to run_delta_refresh(). While idle it records a heartbeat
+    every ACCOUNT_SNAPSHOT_DELTA_INTERVAL_SECONDS so readers know it is running.
+    """
+    db = db or _refresher_db()
+    state = _state(db).find_one({"_id": STATE_ID}) or {}
+
+    pipeline = [{"$match": {"ns.coll": {"$in": SOURCE_COLLECTIONS}}}]
+    with db.app_db.watch(pipeline, resume_after=state.get("resume_token")) as stream:
+        print(f"DEBUG: Watching app DB changes on {SOURCE_COLLECTIONS}")
+        if not state.get("resume_token"):
+            # No resume point - changes before now were never applied
+            _state(db).update_one({"_id": STATE_ID}, {"$set": {"covered_since": db.utc_now()}}, upsert=True)
+
+        last_heartbeat = 0
+        while stream.alive:
+            change = stream.try_next()
+            if change is None:
+                if time.time() - last_heartbeat >= config.ACCOUNT_SNAPSHOT_DELTA_INTERVAL_SECONDS:
+                    _state(db).update_one(
+                        {"_id": STATE_ID},
+                        {"$set": {"resume_token": stream.resume_token, "heartbeat_at": db.utc_now()}},
+                        upsert=True
+                    )
+                    last_heartbeat = time.time()
+                continue
+
+            collection = change["ns"]["coll"]
+            doc_id = change.get("documentKey", {}).get("_id")
+
+            if collection == "users" and change["operationType"] == "delete":
+                # The email is gone with the document - find the snapshot by user_id
+                deleted = _snapshots(db).delete_many({"user_id": doc_id}).deleted_count
+                metrics.increment("account_snapshot.deletes", deleted)
+                emails = set()
+            else:
+                _invalidate_references({collection: [doc_id]})
+                emails = affected_emails(db, {collection: [doc_id]})
+
+            refreshed = refresh_account_snapshots(emails, db=db, source="change_stream")
+            metrics.increment("account_snapshot.changes")
+            print(f"DEBUG: {change['operationType']} on {collection} {doc_id} - refreshed {refreshed} snapshots")
+
+            _state(db).update_one(
+                {"_id": STATE_ID},
+                {"$set": {"resume_token": stream.resume_token, "last_change_at": db.utc_now()}},
+                upsert=True
+            )
+
+
+def ensure_snapshot_indexes(db=None):
+    """Create the indexes refreshes rely on (the _id index serves reads)"""
+    db = db or _refresher_db()
+    for field in ["user_id"] + list(SOURCE_ID_FIELDS.values()):
+        _snapshots(db).create_index(field)
+    _snapshots(db).create_index("refreshed_at")
+
+
+def _delete_removed_users(db):
+    """Delete snapshots of users no longer in the app DB; returns the number deleted"""
+    user_ids = [snapshot["user_id"] for snapshot in _find(_snapshots(db), {}, {"user_id": 1}) if snapshot.get("user_id")]
+
+    existing = set()
+    for start in range(0, len(user_ids), DELETE_CHECK_BATCH_SIZE):
+        batch = user_ids[start:start + DELETE_CHECK_BATCH_SIZE]
+        existing.update(user["_id"] for user in _find(db.get_collection("users"), {"_id": {"$in": batch}}, {"_id": 1}))
+
+    removed = [user_id for user_id in user_ids if user_id not in existing]
+    if not removed:
+        return 0
+
+    deleted = _snapshots(db).delete_many({"user_id": {"$in": removed}}).deleted_count
+    metrics.increment("account_snapshot.deletes", deleted)
+    return deleted
+
+
+def _invalidate_references(changed_ids):
+    """
+    Drop changed organizations/plans from the reference cache so the rebuild reads
+    them from the app DB instead of serving the cached (pre-change) documents
+    """
+    for collection, ids in changed_ids.items():
+        if collection in REFERENCE_CACHES:
+            for doc_id in ids:
+                invalidate_reference_cache(collection, doc_id)
+
+
+def _refresher_db():
+    """
+    AssistantDB reading the app DB with ACCOUNT_SNAPSHOT_APP_READ_PREFERENCE (primary) -
+    a lagging secondary would rebuild a snapshot from data older than the change being applied
+    """
+    return AssistantDB(app_read_preference=config.ACCOUNT_SNAPSHOT_APP_READ_PREFERENCE)
+
+
+def _find(collection, query, projection):
+    """
+    Unbounded projected find for the refresher (AssistantDB.execute_query caps results
+    at MONGO_DEFAULT_LIMIT, which would silently drop changes from a large delta)
+    """
+    return list(collection.find(query, projection, max_time_ms=config.ACCOUNT_SNAPSHOT_QUERY_MAX_TIME_MS))
+
+
+def _snapshots(db):
+    """Snapshot collection (dashboard DB)"""
+    return db.get_collection(config.ACCOUNT_SNAPSHOT_COLLECTION, use_dashboard_db=True)
+
+
+def _state(db):
+    """Refresher state collection (dashboard DB)"""
+    return db.get_collection(f"{config.ACCOUNT_SNAPSHOT_COLLECTION}_state", use_dashboard_db=True)
+
+
+def _as_utc(value):
+    """Datetimes read back without tzinfo are UTC"""
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=timezone.utc)
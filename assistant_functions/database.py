@@ -7,21 +7,136 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
+import threading
 import config
+import metrics
+import bson
 from pymongo import MongoClient
+from mongo_monitoring import command_listeners
 from datetime import datetime, timezone
 
 
+# Process-wide client registry: one pooled MongoClient per URI, shared by every AssistantDB
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_mongo_client(uri, name="assistant_dashboard", read_preference=None, max_staleness_seconds=None):
+    """
+    Get the shared MongoClient for a URI and read preference, creating it on first use
+    
+    Args:
+        name: Client label for command metrics ("app", "assistant_dashboard")
+        read_preference: Read preference mode (e.g. "secondaryPreferred"; None = primary)
+        max_staleness_seconds: Skip secondaries lagging more than this (read_preference other than primary)
+    """
+    key = (uri, read_preference, max_staleness_seconds)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            options = {}
+            if read_preference:
+                options["readPreference"] = read_preference
+                if max_staleness_seconds and read_preference != "primary":
+                    options["maxStalenessSeconds"] = max_staleness_seconds
+            
+            client = MongoClient(
+                uri,
+                maxPoolSize=config.MONGO_MAX_POOL_SIZE,
+                minPoolSize=config.MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=config.MONGO_MAX_IDLE_TIME_MS,
+                serverSelectionTimeoutMS=config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                event_listeners=command_listeners(name),
+                **options
+            )
+            _clients[key] = client
+        return client
+
+
+def _reset_clients_after_fork():
+    """MongoClient is not fork-safe - drop the parent's clients in the child (e.g. gunicorn workers)"""
+    global _clients_lock
+    _clients_lock = threading.Lock()
+    _clients.clear()
+
+
+os.register_at_fork(after_in_child=_reset_clients_after_fork)
+
+
+class QueryResult(list):
+    """find/aggregate documents from execute_query; truncated is True when a cap cut the result short"""
+    truncated = False
+
+
+class QueryStream:
+    """
+    Iterable find/aggregate result from iter_query
+    
+    After iteration, truncated is True when the byte cap, max_docs or the default limit
+    stopped the result before the query ran out of documents
+    """
+    
+    def __init__(self, db, collection_name, operation, cursor, max_docs, max_bytes, default_limit):
+        self._db = db
+        self._collection_name = collection_name
+        self._operation = operation
+        self._cursor = cursor
+        self._max_docs = max_docs
+        self._max_bytes = max_bytes
+        self._default_limit = default_limit  # the query limit is MONGO_DEFAULT_LIMIT, not the caller's
+        self.truncated = False
+        self.doc_count = 0
+        self.byte_count = 0
+    
+    def __iter__(self):
+        try:
+            for doc in self._cursor:
+                self.byte_count += len(bson.encode(doc))
+                self.doc_count += 1
+                yield doc
+                
+                if self.byte_count >= self._max_bytes:
+                    self.truncated = self._has_more()
+                    break
+                if self.doc_count >= self._max_docs:
+                    # The query limit can't tell whether more matched - a default limit counts as a cut
+                    self.truncated = self._default_limit or self._has_more()
+                    break
+        finally:
+            self._cursor.close()
+            self._db._record_result_size(self._collection_name, self.doc_count, self.byte_count)
+        
+        if self.truncated:
+            print(f"WARNING: {self._operation} on {self._collection_name} truncated at {self.doc_count} docs / {self.byte_count} bytes")
+            metrics.increment("assistant_db.capped_queries")
+    
+    def _has_more(self):
+        """Whether the cursor holds another document"""
+        return next(self._cursor, None) is not None
+
+
 class AssistantDB:
     """Database interface for AI assistant functions"""
     
-    def __init__(self):
-        # Production database connection (for campaigns, email accounts, etc.)
-        self.app_client = MongoClient(config.APP_DB_URI)
+    def __init__(self, app_read_preference=None):
+        """
+        Args:
+            app_read_preference: Read preference for the production DB (default MONGO_APP_READ_PREFERENCE;
+                "primary" for readers that must see their latest writes, e.g. the snapshot refresher)
+        """
+        # Production database connection (for campaigns, email accounts, etc.) - read-only,
+        # routed to secondaries so support lookups don't compete with product traffic
+        app_read_preference = app_read_preference or config.MONGO_APP_READ_PREFERENCE
+        self.app_client = get_mongo_client(
+            config.APP_DB_URI,
+            name="app" if app_read_preference == config.MONGO_APP_READ_PREFERENCE else f"app_{app_read_preference}",
+            read_preference=app_read_preference,
+            max_staleness_seconds=config.MONGO_APP_MAX_STALENESS_SECONDS if app_read_preference != "primary" else None
+        )
         self.app_db = self.app_client.get_default_database()
         
         # CS bot database connection (for conversations, settings, etc.)
-        self.dashboard_client = MongoClient(config.DASHBOARD_DB_URI)
+        self.dashboard_client = get_mongo_client(config.DASHBOARD_DB_URI)
         self.dashboard_db = self.dashboard_client.get_default_database()
         
         # Default to production database for assistant queries
@@ -44,28 +159,104 @@ class AssistantDB:
             return self.app_db[collection_name]
     
     def execute_query(self, collection_name, operation, *args, use_dashboard_db=False, **kwargs):
-        """Execute a database operation with error handling"""
+        """
+        Execute a database operation with error handling
+        
+        find/aggregate return a QueryResult (a list) capped like iter_query; its truncated
+        attribute tells whether documents were left out
+        """
         try:
+            # Execute the operation - READ-ONLY for safety
+            # Every read gets a server-side time limit unless the caller sets one
+            if operation in ('find', 'aggregate'):
+                stream = self.iter_query(collection_name, operation, *args, use_dashboard_db=use_dashboard_db, **kwargs)
+                result = QueryResult(stream)
+                result.truncated = stream.truncated
+                return result
+            
             collection = self.get_collection(collection_name, use_dashboard_db)
             
-            # Execute the operation - READ-ONLY for safety
-            if operation == 'find':
-                return list(collection.find(*args, **kwargs))
-            elif operation == 'find_one':
-                return collection.find_one(*args, **kwargs)
+            if operation == 'find_one':
+                kwargs.setdefault('max_time_ms', config.MONGO_MAX_TIME_MS)
+                self._check_projection(collection_name, operation, args, kwargs)
+                doc = collection.find_one(*args, **kwargs)
+                self._record_result_size(collection_name, 1 if doc else 0, len(bson.encode(doc)) if doc else 0)
+                return doc
             # elif operation == 'insert_one':
             #     return collection.insert_one(*args, **kwargs)
             # elif operation == 'update_one':
             #     return collection.update_one(*args, **kwargs)
             # elif operation == 'delete_one':
             #     return collection.delete_one(*args, **kwargs)
-            elif operation == 'aggregate':
-                return list(collection.aggregate(*args, **kwargs))
             elif operation == 'count_documents':
+                kwargs.setdefault('maxTimeMS', config.MONGO_MAX_TIME_MS)
                 return collection.count_documents(*args, **kwargs)
             else:
                 raise ValueError(f"Unsupported operation: {operation} - Only read operations allowed")
                 
         except Exception as e:
             print(f"Database operation error: {e}")
-            return None
\ No newline at end of file
+            return None
+    
+    def iter_query(self, collection_name, operation, *args, use_dashboard_db=False,
+                   max_docs=None, max_bytes=None, **kwargs):
+        """
+        Stream a find/aggregate result in batches, stopping at the document and byte caps
+        
+        Returns a QueryStream; its truncated attribute is set once iteration finishes.
+        
+        Every query gets maxTimeMS, a batch size and a limit (default MONGO_DEFAULT_LIMIT when
+        the caller sets none); find must pass a projection and pipelines must $project when
+        MONGO_REQUIRE_PROJECTION is on (otherwise they are logged). Raises on database errors.
+        
+        Args:
+            max_docs: Stop after this many documents (defaults to the query limit)
+            max_bytes: Stop once the BSON size of the returned documents exceeds this
+        """
+        collection = self.get_collection(collection_name, use_dashboard_db)
+        max_bytes = max_bytes or config.MONGO_MAX_RESULT_BYTES
+        
+        if operation == 'find':
+            kwargs.setdefault('max_time_ms', config.MONGO_MAX_TIME_MS)
+            kwargs.setdefault('batch_size', config.MONGO_BATCH_SIZE)
+            default_limit = not kwargs.get('limit')
+            if default_limit:
+                kwargs['limit'] = config.MONGO_DEFAULT_LIMIT
+            max_docs = max_docs or kwargs['limit']
+            self._check_projection(collection_name, operation, args, kwargs)
+            cursor = collection.find(*args, **kwargs)
+        elif operation == 'aggregate':
+            kwargs.setdefault('maxTimeMS', config.MONGO_MAX_TIME_MS)
+            kwargs.setdefault('batchSize', config.MONGO_BATCH_SIZE)
+            pipeline = list(args[0]) if args else list(kwargs.pop('pipeline', []))
+            default_limit = not any('$limit' in stage for stage in pipeline)
+            if default_limit:
+                pipeline.append({'$limit': config.MONGO_DEFAULT_LIMIT})
+            max_docs = max_docs or config.MONGO_DEFAULT_LIMIT
+            self._check_projection(collection_name, operation, (pipeline,), kwargs)
+            cursor = collection.aggregate(pipeline, *args[1:], **kwargs)
+        else:
+            raise ValueError(f"Unsupported streaming operation: {operation}")
+        
+        return QueryStream(self, collection_name, operation, cursor, max_docs, max_bytes, default_limit)
+    
+    def _check_projection(self, collection_name, operation, args, kwargs):
+        """Reject (or log) reads that would return whole documents"""
+        if operation in ('find', 'find_one'):
+            has_projection = len(args) > 1 or kwargs.get('projection') is not None
+        else:
+            pipeline = args[0] if args else []
+            has_projection = any('$project' in stage for stage in pipeline)
+        
+        if has_projection:
+            return
+        
+        metrics.increment("assistant_db.unprojected_queries")
+        if config.MONGO_REQUIRE_PROJECTION:
+            raise ValueError(f"{operation} on {collection_name} must specify a projection")
+        print(f"WARNING: {operation} on {collection_name} without a projection")
+    
+    def _record_result_size(self, collection_name, doc_count, byte_count):
+        """Per-call documents and bytes returned"""
+        metrics.observe(f"assistant_db.{collection_name}.docs", doc_count, buckets=None)
+        metrics.observe(f"assistant_db.{collection_name}.bytes", byte_count, buckets=metrics.BYTE_BUCKETS)
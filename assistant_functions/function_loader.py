@@ -3,41 +3,80 @@ Function Loader
 Loads and registers all available functions for the AI assistant
 """
 
+import importlib
+import threading
+
 from .function_registry import FunctionRegistry
 # Import your function sections here when you create them
-from .sections.check_user_plan import register_user_plan_functions
-from .sections.campaigns import register_campaign_functions
+from .sections import check_user_plan as user_plan_section
+from .sections import campaigns as campaign_section
+from .sections import email_accounts as email_account_section
+
+# Section modules re-imported by reload_functions()
+SECTION_MODULES = [user_plan_section, campaign_section, email_account_section]
 
 
 def load_all_functions():
-    """Load all available functions into the registry"""
+    """Load all available functions into a new registry"""
     registry = FunctionRegistry()
     
     # Register all function sections here when you create them
-    register_user_plan_functions(registry)
-    register_campaign_functions(registry)
+    user_plan_section.register_user_plan_functions(registry)
+    campaign_section.register_campaign_functions(registry)
+    email_account_section.register_email_account_functions(registry)
+    
+    # Render the AI documentation once - it only changes when sections change
+    registry.build_ai_documentation()
     
     return registry
 
 
-def get_functions_documentation():
-    """Get comprehensive documentation for AI consumption"""
-    registry = load_all_functions()
-    return registry.get_documentation(for_ai=True)
-
-
-def execute_function(function_name, **kwargs):
-    """Execute a function by name with parameters"""
-    registry = load_all_functions()
-    return registry.execute_function(function_name, **kwargs)
-
-
-# For easy access
+# Process-wide registry (built once, rebuilt only by reload_functions)
 _registry = None
+_registry_lock = threading.Lock()
+
 
 def get_registry():
     """Get the function registry (singleton pattern)"""
     global _registry
     if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = load_all_functions()
+    return _registry
+
+
+def reload_functions():
+    """Re-import section modules and rebuild the registry (call after sections change)"""
+    global _registry
+    with _registry_lock:
+        for module in SECTION_MODULES:
+            importlib.reload(module)
         _registry = load_all_functions()
-    return _registry
\ No newline at end of file
+    print(f"DEBUG: Reloaded assistant functions ({len(_registry.functions)} functions)")
+    return _registry
+
+
+def get_functions_documentation():
+    """Get comprehensive documentation for AI consumption"""
+    return get_registry().ai_documentation
+
+
+def get_functions_prompt():
+    """Get the pre-rendered function documentation text for AI prompts"""
+    return get_registry().ai_documentation_text
+
+
+def get_tool_schemas():
+    """Get the chat completions `tools` definitions for all functions"""
+    return get_registry().tool_schemas
+
+
+def execute_function(function_name, loader=None, **kwargs):
+    """Execute a function by name with parameters (loader: optional request-scoped IdentityLoader)"""
+    return get_registry().execute_function(function_name, loader=loader, **kwargs)
+
+
+def execute_function_traced(function_name, loader=None, **kwargs):
+    """Execute a function, returning (result, cache/latency info) - see FunctionRegistry.execute_function_traced"""
+    return get_registry().execute_function_traced(function_name, loader=loader, **kwargs)
@@ -3,17 +3,44 @@ Function Registry for AI Assistant
 Manages available functions organized by sections with documentation
 """
 
+import copy
 import json
 import os
+import inspect
+import threading
+import time
 from typing import Dict, List, Any, Optional
 
+import config
+import metrics
+from .reference_cache import TTLCache
+
+# FunctionDefinition input types -> JSON schema types
+JSON_SCHEMA_TYPES = {
+    "string": "string",
+    "integer": "integer",
+    "int": "integer",
+    "number": "number",
+    "float": "number",
+    "boolean": "boolean",
+    "bool": "boolean",
+    "array": "array",
+    "list": "array",
+    "object": "object",
+    "dict": "object"
+}
+
 
 class FunctionDefinition:
     """Represents a function that the AI assistant can call"""
     
     def __init__(self, name: str, description: str, section: str, 
                  inputs: Dict[str, Any], outputs: Dict[str, Any], 
-                 function_callable, examples: List[str] = None):
+                 function_callable, examples: List[str] = None,
+                 result_fields: Dict[str, Optional[List[str]]] = None,
+                 result_max_items: int = None,
+                 result_max_tokens: int = None,
+                 cache_policy: Dict[str, Any] = None):
         self.name = name
         self.description = description
         self.section = section
@@ -21,6 +48,18 @@ class FunctionDefinition:
         self.outputs = outputs  # Return value definitions
         self.function_callable = function_callable
         self.examples = examples or []
+        
+        # Result serialization for the reasoning context (see result_serializer)
+        self.result_fields = result_fields  # {top-level key: [fields] or None}; None keeps everything
+        self.result_max_items = result_max_items  # list truncation (defaults to config)
+        self.result_max_tokens = result_max_tokens  # token cap (defaults to config)
+        
+        # Result memoization: {"ttl": seconds, "key_params": [...], "read_only": True}
+        # Only read-only functions are cached; key_params default to all inputs
+        self.cache_policy = cache_policy
+        
+        # Functions taking a `loader` share the request-scoped IdentityLoader
+        self.accepts_loader = 'loader' in inspect.signature(function_callable).parameters
     
     def to_dict(self):
         """Convert to dictionary for AI consumption"""
@@ -32,6 +71,35 @@ class FunctionDefinition:
             "outputs": self.outputs,
             "examples": self.examples
         }
+    
+    def to_tool_schema(self):
+        """Convert to a chat completions `tools` entry (JSON schema generated from inputs)"""
+        properties = {}
+        required = []
+        
+        for param, details in self.inputs.items():
+            prop = {"type": JSON_SCHEMA_TYPES.get(details.get('type', 'string'), 'string')}
+            if details.get('description'):
+                prop["description"] = details['description']
+            if details.get('enum'):
+                prop["enum"] = details['enum']
+            properties[param] = prop
+            
+            if details.get('required', False):
+                required.append(param)
+        
+        return {
+            "type": "function",
+            "function": {
+                "name": self.name,
+                "description": self.description,
+                "parameters": {
+                    "type": "object",
+                    "properties": properties,
+                    "required": required
+                }
+            }
+        }
 
 
 class FunctionRegistry:
@@ -42,6 +110,16 @@ class FunctionRegistry:
         self.sections: Dict[str, str] = {}  # section_name -> description
         self.context_info: Dict[str, str] = {}  # section_name -> context text
         
+        # Pre-rendered AI documentation (see build_ai_documentation)
+        self.ai_documentation: Dict[str, Any] = {}
+        self.ai_documentation_text: str = ""
+        self.tool_schemas: List[Dict[str, Any]] = []
+        
+        # Memoized results of functions with a cache_policy
+        self.result_cache = TTLCache("function_results", config.FUNCTION_CACHE_DEFAULT_TTL_SECONDS, config.FUNCTION_CACHE_MAX_SIZE)
+        self._inflight: Dict[Any, threading.Event] = {}  # cache key -> set when the running call finishes
+        self._inflight_lock = threading.Lock()
+        
         # Load any existing function definitions
         self._load_sections()
     
@@ -67,17 +145,96 @@ class FunctionRegistry:
         """Get a specific function by name"""
         return self.functions.get(name)
     
-    def execute_function(self, name: str, **kwargs):
-        """Execute a function by name with parameters"""
+    def execute_function(self, name: str, loader=None, **kwargs):
+        """Execute a function by name with parameters (loader: optional request-scoped IdentityLoader)"""
+        result, _ = self.execute_function_traced(name, loader=loader, **kwargs)
+        return result
+    
+    def execute_function_traced(self, name: str, loader=None, **kwargs):
+        """
+        Execute a function, serving it from the result cache when its cache_policy allows
+        
+        An identical cacheable call already running in another thread (e.g. a prefetch) is
+        joined instead of repeated.
+        
+        Returns:
+            (result, info) - info: {"cache": "hit" | "joined" | "miss" | "off", "latency_ms", "saved_ms"}
+        """
         func_def = self.get_function(name)
         if not func_def:
             raise ValueError(f"Function '{name}' not found")
         
+        cache_key = self._cache_key(func_def, kwargs)
+        owns_inflight = False
+        
+        if cache_key is not None:
+            cached = self._cached_result(cache_key, "hit")
+            if cached:
+                return cached
+            
+            with self._inflight_lock:
+                inflight = self._inflight.get(cache_key)
+                if inflight is None:
+                    self._inflight[cache_key] = threading.Event()
+                    owns_inflight = True
+            
+            if not owns_inflight:
+                wait_start = time.time()
+                inflight.wait(timeout=config.FUNCTION_CACHE_INFLIGHT_WAIT_SECONDS)
+                cached = self._cached_result(cache_key, "joined", waited_ms=(time.time() - wait_start) * 1000)
+                if cached:
+                    return cached
+                # The other call failed or timed out - run it here
+        
+        if loader is not None and func_def.accepts_loader:
+            kwargs['loader'] = loader
+        
+        start_time = time.time()
         try:
-            return func_def.function_callable(**kwargs)
+            result = func_def.function_callable(**kwargs)
         except Exception as e:
             print(f"Error executing function '{name}': {e}")
-            return {"error": str(e)}
+            result = {"error": str(e)}
+        finally:
+            latency_ms = (time.time() - start_time) * 1000
+        
+        try:
+            # Errors are never cached
+            if cache_key is not None and not (isinstance(result, dict) and "error" in result):
+                self.result_cache.set(cache_key, (copy.deepcopy(result), latency_ms), ttl_seconds=func_def.cache_policy.get("ttl"))
+        finally:
+            if owns_inflight:
+                with self._inflight_lock:
+                    self._inflight.pop(cache_key).set()
+        
+        return result, {"cache": "miss" if cache_key is not None else "off", "latency_ms": round(latency_ms), "saved_ms": 0}
+    
+    def _cached_result(self, cache_key, status, waited_ms=0):
+        """(result copy, info) from the result cache, or None on a miss"""
+        found, entry = self.result_cache.get(cache_key)
+        if not found:
+            return None
+        
+        result, original_latency_ms = entry
+        saved_ms = max(round(original_latency_ms - waited_ms), 0)
+        metrics.increment("function_cache.saved_ms", saved_ms)
+        return copy.deepcopy(result), {"cache": status, "latency_ms": round(waited_ms), "saved_ms": saved_ms}
+    
+    def _cache_key(self, func_def: FunctionDefinition, kwargs: Dict[str, Any]):
+        """Cache key for a call, or None when the function isn't cacheable"""
+        policy = func_def.cache_policy
+        if not policy or not policy.get("read_only", False):
+            return None
+        
+        key_params = policy.get("key_params") or sorted(func_def.inputs.keys())
+        key_values = []
+        for param in key_params:
+            value = kwargs.get(param)
+            if isinstance(value, str):
+                value = value.strip().lower() if param.endswith("email") else value.strip()
+            key_values.append((param, str(value) if value is not None else None))
+        
+        return (func_def.name, tuple(key_values))
     
     def get_documentation(self, for_ai: bool = True) -> Dict[str, Any]:
         """Get complete documentation for AI or human consumption"""
@@ -101,6 +258,29 @@ class FunctionRegistry:
                 "functions": {name: func.to_dict() for name, func in self.functions.items()}
             }
     
+    def build_ai_documentation(self):
+        """Precompute the AI documentation, its prompt text and the tool schemas (call after all sections are registered)"""
+        self.ai_documentation = self.get_documentation(for_ai=True)
+        self.ai_documentation_text = self.render_ai_documentation(self.ai_documentation)
+        self.tool_schemas = [func.to_tool_schema() for func in self.functions.values()]
+    
+    def render_ai_documentation(self, documentation: Dict[str, Any]) -> str:
+        """Render AI documentation as prompt text"""
+        sections_text = []
+        
+        for section_name, section_data in documentation.get('sections', {}).items():
+            sections_text.append(f"\n## {section_name.upper()}")
+            
+            for func in section_data.get('functions', []):
+                sections_text.append(f"\n### {func['name']}")
+                sections_text.append(f"Description: {func['description']}")
+                sections_text.append("Inputs:")
+                for param, details in func.get('inputs', {}).items():
+                    required = " (required)" if details.get('required', False) else " (optional)"
+                    sections_text.append(f"  - {param}: {details.get('description', '')}{required}")
+        
+        return "\n".join(sections_text)
+    
     def _load_sections(self):
         """Load predefined sections"""
         # This will be called by individual section modules
@@ -0,0 +1,188 @@
+"""
+Request-scoped identity loader
+Caches users, workspaces, organizations and plans for one Katie command so each document is read at most once
+
+The loader only reads the app DB; its one write is build_account_view(), which stores
+the live view as the user's account snapshot (read-through) in the dashboard DB.
+"""
+
+import threading
+
+from .database import AssistantDB
+from .reference_cache import load_reference_docs
+from .account_snapshot import build_account_view, read_account_snapshot, write_account_snapshot
+
+# Fields read from each collection by the section functions and the workspace resolver
+USER_PROJECTION = {"email": 1, "first_name": 1, "last_name": 1, "role_name": 1, "status": 1, "workspaces": 1}
+WORKSPACE_PROJECTION = {"name": 1, "status": 1, "org_id": 1}
+
+
+class IdentityLoader:
+    """DataLoader-style cache of identity documents, keyed by email or _id"""
+
+    def __init__(self, db=None):
+        self.db = db or AssistantDB()
+
+        self._users_by_email = {}
+        self._docs = {
+            "workspaces": {},
+            "organizations": {},
+            "plans": {}
+        }
+        self._owner_email_by_org = {}
+        self._snapshots_by_email = {}
+
+        # Section functions may run concurrently within one command - the lock guards the
+        # dicts only and is never held across a query (two calls may fetch the same id once each)
+        self._lock = threading.Lock()
+
+        self.queries = 0
+        self.cache_hits = 0
+
+    def load_user(self, email):
+        """Get a user document by email (None if not found)"""
+        if not email:
+            return None
+
+        key = email.lower()
+        with self._lock:
+            if key in self._users_by_email:
+                self.cache_hits += 1
+                return self._users_by_email[key]
+            self.queries += 1
+
+        user_doc = self.db.execute_query("users", "find_one", {"email": key}, USER_PROJECTION)
+
+        with self._lock:
+            return self._users_by_email.setdefault(key, user_doc)
+
+    def load_account_snapshot(self, email):
+        """Get the user's materialized account snapshot if fresh (None if missing or stale)"""
+        if not email:
+            return None
+
+        key = email.lower()
+        with self._lock:
+            if key in self._snapshots_by_email:
+                self.cache_hits += 1
+                return self._snapshots_by_email[key]
+            self.queries += 1
+
+        snapshot = read_account_snapshot(self.db, key)
+
+        with self._lock:
+            return self._snapshots_by_email.setdefault(key, snapshot)
+
+    def build_account_view(self, user_doc):
+        """
+        Build the user's workspace/plan/owner view from the app DB and write it back
+        as their account snapshot (read-through; a failed write is only logged)
+        """
+        view, source_ids = build_account_view(self, user_doc)
+        write_account_snapshot(self.db, view, source_ids, source="read_through")
+        return view
+
+    def load_workspaces(self, workspace_ids):
+        """Get workspace documents as {_id: doc} (missing ids are left out)"""
+        return self._load_many("workspaces", workspace_ids, WORKSPACE_PROJECTION)
+
+    def load_organizations(self, org_ids):
+        """Get organization documents as {_id: doc} (served from the process-wide reference cache)"""
+        return self._load_reference("organizations", org_ids)
+
+    def load_plans(self, plan_ids):
+        """Get plan documents as {_id: doc} (served from the process-wide reference cache)"""
+        return self._load_reference("plans", plan_ids)
+
+    def load_owner_emails(self, org_ids):
+        """Get the OWNER user's email for each organization as {org_id: email}"""
+        org_ids = list(dict.fromkeys(org_id for org_id in org_ids if org_id))  # drop empty and duplicate ids
+
+        with self._lock:
+            missing = [org_id for org_id in org_ids if org_id not in self._owner_email_by_org]
+            self.cache_hits += len(org_ids) - len(missing)
+            if missing:
+                self.queries += 1
+
+        if missing:
+            owner_query = {
+                "workspaces": {
+                    "$elemMatch": {
+                        "org_id": {"$in": missing},
+                        "role_name": "OWNER"
+                    }
+                }
+            }
+            owner_docs = self.db.execute_query(
+                "users", "find", owner_query,
+                {"email": 1, "workspaces.org_id": 1, "workspaces.role_name": 1}
+            ) or []
+
+            # First matching user per organization
+            owner_email_by_org = {}
+            for owner_doc in owner_docs:
+                for ws_info in owner_doc.get("workspaces", []):
+                    org_id = ws_info.get("org_id")
+                    if ws_info.get("role_name") == "OWNER" and org_id in missing:
+                        owner_email_by_org.setdefault(org_id, owner_doc.get("email", "N/A"))
+
+            with self._lock:
+                # Remember organizations without an owner too
+                for org_id in missing:
+                    self._owner_email_by_org.setdefault(org_id, owner_email_by_org.get(org_id))
+
+        with self._lock:
+            return {
+                org_id: self._owner_email_by_org[org_id]
+                for org_id in org_ids
+                if self._owner_email_by_org.get(org_id)
+            }
+
+    def stats(self):
+        """Get query/cache statistics for this request"""
+        return {"queries": self.queries, "cache_hits": self.cache_hits}
+
+    def _load_reference(self, collection_name, ids):
+        """Fetch reference documents through the shared TTL cache (a query only on cache misses)"""
+        ids = list(dict.fromkeys(doc_id for doc_id in ids if doc_id))  # drop empty and duplicate ids
+        cache = self._docs[collection_name]
+
+        with self._lock:
+            missing = [doc_id for doc_id in ids if doc_id not in cache]
+            self.cache_hits += len(ids) - len(missing)
+
+        if missing:
+            docs, queried = load_reference_docs(self.db, collection_name, missing)
+            with self._lock:
+                if queried:
+                    self.queries += 1
+                for doc_id in missing:
+                    cache.setdefault(doc_id, docs.get(doc_id))
+
+        with self._lock:
+            return {doc_id: cache[doc_id] for doc_id in ids if cache.get(doc_id)}
+
+    def _load_many(self, collection_name, ids, projection):
+        """Fetch documents by _id with one $in query for the ids not cached yet"""
+        ids = list(dict.fromkeys(doc_id for doc_id in ids if doc_id))  # drop empty and duplicate ids
+        cache = self._docs[collection_name]
+
+        with self._lock:
+            missing = [doc_id for doc_id in ids if doc_id not in cache]
+            self.cache_hits += len(ids) - len(missing)
+            if missing:
+                self.queries += 1
+
+        if missing:
+            docs = self.db.execute_query(
+                collection_name, "find", {"_id": {"$in": missing}}, projection
+            ) or []
+            docs_by_id = {doc["_id"]: doc for doc in docs}
+
+            with self._lock:
+                # Remember misses too so they aren't queried again
+                for doc_id in missing:
+                    cache.setdefault(doc_id, docs_by_id.get(doc_id))
+
+        with self._lock:
+            return {doc_id: cache[doc_id] for doc_id in ids if cache.get(doc_id)}
@@ -0,0 +1,159 @@
+"""
+Reference Data Cache
+Process-wide TTL caches for rarely-changing collections (plans, organizations)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import threading
+import time
+from collections import OrderedDict
+
+import config
+import metrics
+
+# Fields read from each reference collection by the section functions
+ORGANIZATION_PROJECTION = {"plan_id": 1, "internal_group": 1}
+PLAN_PROJECTION = {"plan_name": 1}
+
+
+class TTLCache:
+    """Thread-safe cache with per-entry expiry and a size bound (oldest entries evicted first)"""
+
+    def __init__(self, name, ttl_seconds, max_size):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Get (found, value) for a key"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.time():
+                self._record(hit=True)
+                return True, entry[1]
+
+            if entry:
+                del self._entries[key]
+            self._record(hit=False)
+            return False, None
+
+    def get_many(self, keys):
+        """Get ({key: value} for cached keys, [missing keys])"""
+        found = {}
+        missing = []
+        for key in keys:
+            hit, value = self.get(key)
+            if hit:
+                found[key] = value
+            else:
+                missing.append(key)
+        return found, missing
+
+    def set(self, key, value, ttl_seconds=None):
+        """Store a value (evicts the oldest entry when full)"""
+        expires_at = time.time() + (ttl_seconds or self.ttl_seconds)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything when key is None"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        """Get size and hit-rate statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+    def _record(self, hit):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        metrics.increment(f"cache.{self.name}.{'hits' if hit else 'misses'}")
+
+
+# Shared caches (per process)
+plans_cache = TTLCache("plans", config.PLANS_CACHE_TTL_SECONDS, config.PLANS_CACHE_MAX_SIZE)
+organizations_cache = TTLCache(
+    "organizations", config.ORGANIZATIONS_CACHE_TTL_SECONDS, config.ORGANIZATIONS_CACHE_MAX_SIZE
+)
+
+REFERENCE_CACHES = {
+    "plans": (plans_cache, PLAN_PROJECTION),
+    "organizations": (organizations_cache, ORGANIZATION_PROJECTION)
+}
+
+# Loaded in full by warm_reference_cache - organizations are too many and fill read-through
+WARMED_COLLECTIONS = ["plans"]
+
+
+def load_reference_docs(db, collection_name, ids):
+    """
+    Read-through lookup: cached documents plus one $in query for the misses
+
+    Returns: ({_id: doc}, queried) - queried is True when the database was hit; the
+    documents are copies, so callers can't change what other requests are served
+    """
+    cache, projection = REFERENCE_CACHES[collection_name]
+    found, missing = cache.get_many(ids)
+
+    if missing:
+        docs = db.execute_query(collection_name, "find", {"_id": {"$in": missing}}, projection) or []
+        for doc in docs:
+            cache.set(doc["_id"], dict(doc))
+            found[doc["_id"]] = doc
+
+    return {doc_id: dict(doc) for doc_id, doc in found.items()}, bool(missing)
+
+
+def warm_reference_cache(db=None):
+    """Load the WARMED_COLLECTIONS (plans) into their caches (call once per server process)"""
+    from .database import AssistantDB
+
+    db = db or AssistantDB()
+    start_time = time.time()
+
+    try:
+        for collection_name in WARMED_COLLECTIONS:
+            cache, projection = REFERENCE_CACHES[collection_name]
+            docs = db.execute_query(collection_name, "find", {}, projection, limit=cache.max_size) or []
+            for doc in docs:
+                cache.set(doc["_id"], doc)
+            print(f"DEBUG: Warmed {collection_name} cache with {len(docs)} documents")
+
+        print(f"DEBUG: Reference cache warm-up took {(time.time() - start_time) * 1000:.0f}ms")
+    except Exception as e:
+        print(f"Error warming reference cache: {e}")
+
+
+def invalidate_reference_cache(collection_name=None, doc_id=None):
+    """Manual invalidation hook (e.g. after a plan or organization change)"""
+    targets = [collection_name] if collection_name else list(REFERENCE_CACHES.keys())
+    for name in targets:
+        REFERENCE_CACHES[name][0].invalidate(doc_id)
+    print(f"DEBUG: Invalidated reference cache: {', '.join(targets)}" + (f" ({doc_id})" if doc_id else ""))
+
+
+def reference_cache_stats():
+    """Get hit-rate statistics for every reference cache"""
+    return {name: cache.stats() for name, (cache, _) in REFERENCE_CACHES.items()}
@@ -0,0 +1,222 @@
+"""
+Function Result Serializer
+Compact, schema-aware rendering of function results for the reasoning context
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import json
+import threading
+
+import config
+import metrics
+from token_budget import count_tokens, truncate_to_tokens
+
+# Tool the model calls to fetch a stored full result by reference
+EXPAND_RESULT_TOOL_NAME = "expand_result"
+EXPAND_RESULT_TOOL = {
+    "type": "function",
+    "function": {
+        "name": EXPAND_RESULT_TOOL_NAME,
+        "description": "Get the full, untruncated data of an earlier function result by its ref (optionally one field, e.g. 'campaigns.0.sequences')",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "ref": {"type": "string", "description": "The _ref value from a compacted result (e.g. 'r1')"},
+                "path": {"type": "string", "description": "Optional dotted path inside the result"}
+            },
+            "required": ["ref"]
+        }
+    }
+}
+
+# Key a top-level list result is wrapped under, so it can carry "_ref" like a dict result
+LIST_RESULT_KEY = "items"
+
+
+def to_json(value):
+    """Minified JSON (ObjectIds, datetimes and other BSON types become strings)"""
+    return json.dumps(value, separators=(",", ":"), default=str, ensure_ascii=False)
+
+
+def compact_result(result, result_fields=None, max_list_items=None):
+    """
+    Reduce a function result to the fields the model needs
+
+    Args:
+        result: Raw function result
+        result_fields: Allow-list {top-level key: [fields to keep] or None (keep whole value)};
+                       keys not listed are dropped. None keeps the whole result.
+        max_list_items: Lists longer than this are cut, with a "...N more" marker
+
+    Returns:
+        (compacted_result, was_reduced)
+    """
+    if isinstance(result, list):
+        return _truncate_lists(result, max_list_items)
+    if not isinstance(result, dict) or "error" in result:
+        return result, False
+
+    reduced = False
+    compacted = {}
+
+    for key, value in result.items():
+        if result_fields is not None:
+            if key not in result_fields:
+                reduced = True
+                continue
+            fields = result_fields[key]
+            if fields is not None:
+                value, pruned = _select_fields(value, fields)
+                reduced = reduced or pruned
+        compacted[key] = value
+
+    compacted, truncated = _truncate_lists(compacted, max_list_items)
+    return compacted, reduced or truncated
+
+
+def serialize_result(result, ref=None, result_fields=None, max_list_items=None, max_tokens=None):
+    """
+    Render a function result as minified JSON within a token cap
+
+    Dict results carry "_ref" so the model can call expand_result for anything dropped
+    (and so the reasoning loop can compact the result later). List results are wrapped
+    as {"_ref": ..., "items": [...]} for the same reason.
+    max_tokens: the function's own cap (defaults to KATIE_RESULT_MAX_TOKENS)
+    """
+    max_list_items = max_list_items or config.KATIE_RESULT_MAX_LIST_ITEMS
+    max_tokens = max_tokens or config.KATIE_RESULT_MAX_TOKENS
+
+    full_tokens = count_tokens(to_json(result))
+
+    # Shrink list limits until the result fits, then fall back to cutting the text
+    text = None
+    for list_limit in _list_limits(max_list_items):
+        compacted, _ = compact_result(result, result_fields, list_limit)
+        if ref and isinstance(compacted, list):
+            compacted = {"_ref": ref, LIST_RESULT_KEY: compacted}
+        elif ref and isinstance(compacted, dict):
+            compacted = {"_ref": ref, **compacted}
+        text = to_json(compacted)
+        if count_tokens(text) <= max_tokens:
+            break
+    else:
+        text = truncate_to_tokens(text, max_tokens)
+        if ref:
+            text = f'{text} [truncated - call {EXPAND_RESULT_TOOL_NAME}(ref="{ref}") for the rest]'
+
+    metrics.observe("katie.result_tokens.full", full_tokens, buckets=metrics.TOKEN_BUCKETS)
+    metrics.observe("katie.result_tokens.serialized", count_tokens(text), buckets=metrics.TOKEN_BUCKETS)
+    return text
+
+
+def summarize_result(result, max_tokens=120):
+    """Short skeleton of a result: scalars kept, lists replaced by their item counts"""
+    summary = _skeleton(result, depth=0)
+    return truncate_to_tokens(to_json(summary), max_tokens)
+
+
+class ResultStore:
+    """Full function payloads for one reasoning session, retrievable by reference"""
+
+    def __init__(self):
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def add(self, func_name, result):
+        """Store a full result, return its ref ("r1", "r2", ...)"""
+        if isinstance(result, list):
+            result = {LIST_RESULT_KEY: result}  # same shape the model saw, so "items.0" paths resolve
+        with self._lock:
+            ref = f"r{len(self._results) + 1}"
+            self._results[ref] = (func_name, result)
+            return ref
+
+    def get(self, ref):
+        """Get (func_name, full result) for a ref, or None"""
+        return self._results.get(ref or "")
+
+    def expand(self, ref, path=None):
+        """Render a stored result (or one field of it) with the larger expansion cap"""
+        entry = self._results.get(ref or "")
+        if not entry:
+            return f"Error: unknown result ref '{ref}'"
+
+        value = entry[1]
+        for part in (path or "").split("."):
+            if not part:
+                continue
+            try:
+                value = value[int(part)] if isinstance(value, list) else value[part]
+            except (KeyError, IndexError, ValueError, TypeError):
+                return f"Error: path '{path}' not found in {ref}"
+
+        metrics.increment("katie.result_expansions")
+        expanded = to_json({"_ref": ref, "path": path or "", "data": value})
+        return truncate_to_tokens(expanded, config.KATIE_EXPANDED_RESULT_MAX_TOKENS)
+
+
+def _skeleton(value, depth):
+    """Scalars as-is, lists as "[N items]", dicts recursed two levels deep"""
+    if isinstance(value, list):
+        return f"[{len(value)} items]"
+    if isinstance(value, dict):
+        if depth >= 2:
+            return f"{{{len(value)} fields}}"
+        return {key: _skeleton(item, depth + 1) for key, item in value.items()}
+    return value
+
+
+def _select_fields(value, fields):
+    """Keep only the allowed fields of a dict or of every dict in a list"""
+    if isinstance(value, dict):
+        selected = {field: value[field] for field in fields if field in value}
+        return selected, len(selected) < len(value)
+
+    if isinstance(value, list):
+        selected = []
+        pruned = False
+        for item in value:
+            item, item_pruned = _select_fields(item, fields)
+            selected.append(item)
+            pruned = pruned or item_pruned
+        return selected, pruned
+
+    return value, False
+
+
+def _truncate_lists(value, max_items):
+    """Cut every list (at any depth) to max_items, recording how many were left out"""
+    if isinstance(value, dict):
+        truncated = False
+        out = {}
+        for key, item in value.items():
+            out[key], item_truncated = _truncate_lists(item, max_items)
+            truncated = truncated or item_truncated
+        return out, truncated
+
+    if isinstance(value, list):
+        truncated = max_items is not None and len(value) > max_items
+        kept = value[:max_items] if truncated else value
+        out = []
+        for item in kept:
+            item, item_truncated = _truncate_lists(item, max_items)
+            out.append(item)
+            truncated = truncated or item_truncated
+        if max_items is not None and len(value) > max_items:
+            out.append(f"...{len(value) - max_items} more")
+        return out, truncated
+
+    return value, False
+
+
+def _list_limits(max_list_items):
+    """Decreasing list limits to try: the configured one, then halves down to 1"""
+    limits = []
+    limit = max_list_items
+    while limit >= 1:
+        limits.append(limit)
+        limit //= 2
+    return limits or [1]
@@ -6,11 +6,160 @@ Functions for getting campaign information, status, and diagnostics
 from ..database import AssistantDB
 from ..function_registry import FunctionDefinition
 from ..workspace_resolver import resolve_workspace_and_org
-from bson import ObjectId
+from ..identity_loader import IdentityLoader
+from bson import ObjectId, json_util
+import base64
 
 # Campaign status constants
 CAMPAIGN_STATUSES = ["ACTIVE", "PAUSED", "ERROR", "INACTIVE", "COMPLETED"]
 
+# get_campaigns page size (default and upper bound)
+CAMPAIGN_DEFAULT_PAGE_SIZE = 10
+CAMPAIGN_MAX_PAGE_SIZE = 100
+
+# Every campaign field get_campaigns can return, with its projection expression
+CAMPAIGN_FIELDS = {
+    "_id": 1,
+    "camp_name": 1,
+    "parent_camp_id": 1,
+    "events": {"$ifNull": ["$events", None]},
+    "first_wait_time": {"$ifNull": ["$first_wait_time", None]},
+    "organization_id": 1,
+    "workspace_id": 1,
+    "status": 1,
+    "lead_count": 1,
+    "tags": {"$ifNull": ["$tags", None]},
+    "email_accounts": 1,
+    "ea_n_tags": {"$ifNull": ["$ea_n_tags", None]},
+    "sent_count": 1,
+    "opened_count": 1,
+    "unique_opened_count": 1,
+    "replied_count": 1,
+    "bounced_count": 1,
+    "unsubscribed_count": 1,
+    "linkclick_count": 1,
+    "unique_linkclick_count": 1,
+    "linkopened_count": 1,
+    "unique_linkopened_count": 1,
+    "lead_contacted_count": {"$ifNull": ["$lead_contacted_count", 0]},
+    "daily_limit": 1,
+    "interval_limit_in_min": 1,
+    "stop_on_lead_replied": 1,
+    "is_link_tracking": 1,
+    "is_emailopened_tracking": 1,
+    "created_at": 1,
+    "modified_at": 1,
+    "created_by": 1,
+    "modified_by": 1,
+    "send_priority": 1,
+    "is_unsubscribed_link": 1,
+    "send_as_txt": 1,
+    "last_lead_sent": 1,
+    "error_desc": {"$ifNull": ["$error_desc", ""]},
+    "camp_st_date": {"$ifNull": ["$camp_st_date", ""]},
+    "camp_end_date": {"$ifNull": ["$camp_end_date", ""]},
+    "email_sent_today": {"$ifNull": ["$email_sent_today", ""]},
+    "positive_reply_count": {"$ifNull": ["$positive_reply_count", 0]},
+    "negative_reply_count": {"$ifNull": ["$negative_reply_count", 0]},
+    "neutral_reply_count": {"$ifNull": ["$neutral_reply_count", 0]},
+    "opportunity_val": {"$ifNull": ["$opportunity_val", 0]},
+    "exclude_ooo": 1,
+    "is_acc_based_sending": 1,
+    "is_pause_on_bouncerate": {"$ifNull": ["$is_pause_on_bouncerate", 0]},
+    "bounce_rate_limit": {"$ifNull": ["$bounce_rate_limit", 5]},
+    "is_paused_at_bounced": {"$ifNull": ["$is_paused_at_bounced", 0]},
+    "last_paused_at_bounced": {"$ifNull": ["$last_paused_at_bounced", ""]},
+    "send_risky_email": {"$ifNull": ["$send_risky_email", 0]},
+    "unsub_blocklist": {"$ifNull": ["$unsub_blocklist", 0]},
+    "other_email_acc": {"$ifNull": ["$other_email_acc", 0]},
+    "err_email_acc": {"$ifNull": ["$err_email_acc", 0]},
+    "is_esp_match": {"$ifNull": ["$is_esp_match", 0]},
+    "ooo_nr_opt": {"$ifNull": ["$ooo_nr_opt", None]},
+    "ooo_nr_ai_d": {"$ifNull": ["$ooo_nr_ai_d", 7]},
+    "ooo_nr_d": {"$ifNull": ["$ooo_nr_d", 7]},
+    "error_time": 1,
+    "new_lead_contacted_today": 1,
+    "monthly_mail_reached": 1,
+    "schedule": {"$ifNull": ["$schedule", {}]},
+    "completed_lead_count": {"$ifNull": ["$completed_lead_count", 0]},
+    "custom_fields": {"$ifNull": ["$custom_fields", ""]},
+    "sequences": {"$ifNull": ["$sequences", []]},
+    "sequence_steps": {"$size": {"$ifNull": ["$sequences", []]}},
+    "sheet_tasks": {"$ifNull": ["$sheet_tasks", []]},
+    "camp_emails": {"$ifNull": ["$camp_emails", []]},
+    "template_id": {"$ifNull": ["$template_id", ""]},
+    "is_ev_processing": {"$ifNull": ["$is_ev_processing", 0]},
+    "open_rate": {
+        "$cond": {
+            "if": {"$eq": ["$lead_contacted_count", 0]},
+            "then": 0,
+            "else": {
+                "$round": [
+                    {
+                        "$multiply": [
+                            {"$divide": ["$unique_opened_count", "$lead_contacted_count"]},
+                            100
+                        ]
+                    }, 1]
+            }
+        }
+    },
+    "replied_rate": {
+        "$cond": {
+            "if": {"$eq": ["$lead_contacted_count", 0]},
+            "then": 0,
+            "else": {
+                "$round": [
+                    {
+                        "$multiply": [
+                            {"$divide": ["$replied_count", "$lead_contacted_count"]},
+                            100
+                        ]
+                    }, 1]
+            }
+        }
+    },
+    "is_replied_email_account_id": {"$ifNull": ["$is_replied_email_account_id", 0]},
+    "is_subseq_add_cc": {"$ifNull": ["$is_subseq_add_cc", 0]},
+    "subseq_add_cc": {"$ifNull": ["$subseq_add_cc", []]}
+}
+
+# Field groups callers can select with `fields`
+CAMPAIGN_FIELD_GROUPS = {
+    "core": ["camp_name", "status", "workspace_id", "organization_id", "parent_camp_id", "modified_at",
+             "created_by", "modified_by", "camp_st_date", "camp_end_date", "template_id"],
+    "stats": ["lead_count", "lead_contacted_count", "completed_lead_count", "new_lead_contacted_today",
+              "sent_count", "opened_count", "unique_opened_count", "replied_count", "bounced_count",
+              "unsubscribed_count", "linkclick_count", "unique_linkclick_count", "linkopened_count",
+              "unique_linkopened_count", "positive_reply_count", "negative_reply_count",
+              "neutral_reply_count", "opportunity_val", "open_rate", "replied_rate"],
+    "sending": ["daily_limit", "email_sent_today", "interval_limit_in_min", "send_priority", "schedule",
+                "last_lead_sent", "monthly_mail_reached", "is_acc_based_sending", "send_as_txt",
+                "send_risky_email", "is_esp_match"],
+    "health": ["error_desc", "error_time", "is_pause_on_bouncerate", "bounce_rate_limit",
+               "is_paused_at_bounced", "last_paused_at_bounced", "err_email_acc", "other_email_acc",
+               "is_ev_processing"],
+    "accounts": ["email_accounts", "ea_n_tags", "camp_emails", "is_replied_email_account_id"],
+    "sequences": ["sequence_steps", "sequences", "first_wait_time", "events", "is_subseq_add_cc", "subseq_add_cc"],
+    "settings": ["tags", "stop_on_lead_replied", "is_link_tracking", "is_emailopened_tracking",
+                 "is_unsubscribed_link", "unsub_blocklist", "exclude_ooo", "ooo_nr_opt", "ooo_nr_ai_d",
+                 "ooo_nr_d", "custom_fields", "sheet_tasks"]
+}
+
+# Fixed field sets for `mode` (used when `fields` is not given)
+CAMPAIGN_MODE_FIELDS = {
+    "BASIC": ["camp_name", "status", "workspace_id", "organization_id", "lead_count", "sent_count",
+              "opened_count", "replied_count", "bounced_count", "lead_contacted_count", "modified_at",
+              "daily_limit", "open_rate", "replied_rate"],
+    "FULL": [name for name in CAMPAIGN_FIELDS if name not in ("_id", "created_at")]
+}
+
+# Campaigns listed by get_campaign_health (counts always cover the whole workspace)
+HEALTH_DEFAULT_LIMIT = 20
+
+# Error messages are cut to this many characters in the health snapshot
+HEALTH_ERROR_MAX_CHARS = 200
+
 
 def register_campaign_functions(registry):
     """Register all campaign-related functions"""
@@ -50,12 +199,22 @@ def register_campaign_functions(registry):
             },
             "limit": {
                 "type": "integer", 
-                "description": "Maximum number of campaigns to return (default: 10)", 
+                "description": f"Campaigns per page (default: {CAMPAIGN_DEFAULT_PAGE_SIZE}, max: {CAMPAIGN_MAX_PAGE_SIZE})", 
                 "required": False
             },
             "mode": {
                 "type": "string", 
-                "description": "Output mode: BASIC (essential info only) or FULL (complete details). Default: BASIC", 
+                "description": "Output mode: BASIC (essential info only) or FULL (complete details). Default: BASIC. Prefer fields", 
+                "required": False
+            },
+            "fields": {
+                "type": "string",
+                "description": "Comma-separated field groups to return instead of mode: " + ", ".join(CAMPAIGN_FIELD_GROUPS) + " (e.g. 'stats,health'; id, created_at always included)",
+                "required": False
+            },
+            "cursor": {
+                "type": "string",
+                "description": "next_cursor from the previous page to get the next page",
                 "required": False
             }
         },
@@ -70,41 +229,107 @@ def register_campaign_functions(registry):
             },
             "summary": {
                 "type": "object",
-                "description": "Summary statistics about the campaigns"
+                "description": "Summary statistics about the campaigns on this page (has_more: another page exists)"
+            },
+            "next_cursor": {
+                "type": "string",
+                "description": "Pass as cursor to get the next page (null on the last page)"
             }
         },
         function_callable=get_campaigns,
+        cache_policy={"ttl": 120, "read_only": True},  # campaign counters move quickly
         examples=[
             "Get user's campaigns: get_campaigns(user_email='user@example.com')",
             "Get campaigns for specific workspace: get_campaigns(workspace_name='Yaro\\'s workspace')",
-            "Get active campaigns only: get_campaigns(user_email='user@example.com', status='ACTIVE')"
+            "Get active campaigns only: get_campaigns(user_email='user@example.com', status='ACTIVE')",
+            "Get error details only: get_campaigns(user_email='user@example.com', fields='health')",
+            "Get the next page: get_campaigns(user_email='user@example.com', fields='stats', cursor='<next_cursor>')"
+        ]
+    ))
+
+    # Campaign health snapshot function
+    registry.register_function(FunctionDefinition(
+        name="get_campaign_health",
+        description="Compact health summary of a workspace's campaigns: status and issue counts, plus the campaigns with problems (errors, bounce-rate pauses, daily limit reached, email account errors, no leads left). Use this first when diagnosing sending problems; use get_campaigns(fields=...) only for settings not covered here",
+        section="campaigns",
+        inputs={
+            "user_email": {
+                "type": "string",
+                "description": "Email of the user (defaults to conversation user if not specified)",
+                "required": False
+            },
+            "workspace_id": {
+                "type": "string",
+                "description": "Specific workspace ID to check",
+                "required": False
+            },
+            "workspace_name": {
+                "type": "string",
+                "description": "Workspace name to search for (e.g., 'Yaro's workspace')",
+                "required": False
+            },
+            "limit": {
+                "type": "integer",
+                "description": f"Maximum number of campaigns to list, campaigns with issues first (default: {HEALTH_DEFAULT_LIMIT})",
+                "required": False
+            }
+        },
+        outputs={
+            "summary": {
+                "type": "object",
+                "description": "Total campaigns, status breakdown and issue breakdown across the whole workspace"
+            },
+            "campaigns": {
+                "type": "array",
+                "description": "Per-campaign health: status, issues, error, bounce pause, daily limit vs sent today, email account errors, last lead sent"
+            },
+            "workspace_info": {
+                "type": "object",
+                "description": "Information about the workspace the campaigns belong to"
+            }
+        },
+        function_callable=get_campaign_health,
+        cache_policy={"ttl": 120, "read_only": True},
+        examples=[
+            "Why are campaigns not sending: get_campaign_health(user_email='user@example.com')",
+            "Health of a specific workspace: get_campaign_health(workspace_name='Yaro\\'s workspace')"
         ]
     ))
 
 
-def get_campaigns(user_email=None, workspace_id=None, workspace_name=None, status=None, limit=10, mode="BASIC"):
+def get_campaigns(user_email=None, workspace_id=None, workspace_name=None, status=None, limit=CAMPAIGN_DEFAULT_PAGE_SIZE,
+                  mode="BASIC", fields=None, cursor=None, loader=None):
     """
-    Get campaigns for a user or workspace
+    Get one page of campaigns for a user or workspace, newest first
+    
+    Pages are keyed on (created_at, _id), so they stay stable while campaigns are
+    added; index {workspace_id: 1, organization_id: 1, created_at: -1, _id: -1}.
     
     Args:
         user_email: User email (if not specified, uses conversation context)
         workspace_id: Explicit workspace ID
         workspace_name: Workspace name to search for (AI should extract this from query)
         status: Filter by campaign status
-        limit: Maximum campaigns to return
+        limit: Page size (at most CAMPAIGN_MAX_PAGE_SIZE)
+        mode: BASIC or FULL field set (ignored when fields is given)
+        fields: Field groups to return (list or comma-separated, see CAMPAIGN_FIELD_GROUPS)
+        cursor: next_cursor from the previous page
+        loader: Request-scoped IdentityLoader shared with other functions in the same command
     
     Returns:
         dict: Campaign list with workspace info and summary
     """
     
-    db = AssistantDB()
+    loader = loader or IdentityLoader(AssistantDB())
+    db = loader.db
     
     try:
         # Resolve workspace and organization IDs
         resolution = resolve_workspace_and_org(
             user_email=user_email,
             workspace_id=workspace_id, 
-            workspace_name=workspace_name
+            workspace_name=workspace_name,
+            loader=loader
         )
         
         if "error" in resolution:
@@ -128,181 +353,46 @@ def get_campaigns(user_email=None, workspace_id=None, workspace_name=None, statu
         print(f"DEBUG: Campaign query: {campaign_query}")
         print(f"DEBUG: Resolved workspace_id: {resolved_workspace_id}")
         print(f"DEBUG: Resolved org_id: {resolved_org_id}")
-        print(f"DEBUG: Mode: {mode}, Limit: {limit}")
+        print(f"DEBUG: Mode: {mode}, Fields: {fields}, Limit: {limit}, Cursor: {bool(cursor)}")
         
-        # Choose projection based on mode
-        if mode.upper() == "BASIC":
-            projection = {
-                "_id": 1,
-                "camp_name": 1,
-                "status": 1,
-                "workspace_id": 1,
-                "organization_id": 1,
-                "lead_count": 1,
-                "sent_count": 1,
-                "opened_count": 1,
-                "replied_count": 1,
-                "bounced_count": 1,
-                "lead_contacted_count": {"$ifNull": ["$lead_contacted_count", 0]},
-                "created_at": 1,
-                "modified_at": 1,
-                "daily_limit": 1,
-                "open_rate": {
-                    "$cond": {
-                        "if": {"$eq": ["$lead_contacted_count", 0]},
-                        "then": 0,
-                        "else": {
-                            "$round": [
-                                {
-                                    "$multiply": [
-                                        {"$divide": ["$unique_opened_count", "$lead_contacted_count"]},
-                                        100
-                                    ]
-                                }, 1]
-                        }
-                    }
-                },
-                "replied_rate": {
-                    "$cond": {
-                        "if": {"$eq": ["$lead_contacted_count", 0]},
-                        "then": 0,
-                        "else": {
-                            "$round": [
-                                {
-                                    "$multiply": [
-                                        {"$divide": ["$replied_count", "$lead_contacted_count"]},
-                                        100
-                                    ]
-                                }, 1]
-                        }
-                    }
-                }
-            }
-        else:
-            # Full projection (your original complex one)
-            projection = {
-                    "_id": 1, 
-                    "camp_name": 1, 
-                    "parent_camp_id": 1, 
-                    "events": {"$ifNull": ["$events", None]}, 
-                    "first_wait_time": {"$ifNull": ["$first_wait_time", None]},
-                    "organization_id": 1, 
-                    "workspace_id": 1, 
-                    "status": 1, 
-                    "lead_count": 1, 
-                    "tags": {"$ifNull": ["$tags", None]},
-                    "email_accounts": 1, 
-                    "ea_n_tags": {"$ifNull": ["$ea_n_tags", None]},
-                    "sent_count": 1, 
-                    "opened_count": 1, 
-                    "unique_opened_count": 1, 
-                    "replied_count": 1, 
-                    "bounced_count": 1, 
-                    "unsubscribed_count": 1, 
-                    "linkclick_count": 1,
-                    "unique_linkclick_count": 1, 
-                    "linkopened_count": 1, 
-                    "unique_linkopened_count": 1, 
-                    "lead_contacted_count": {"$ifNull": ["$lead_contacted_count", 0]},
-                    "daily_limit": 1, 
-                    "interval_limit_in_min": 1, 
-                    "stop_on_lead_replied": 1, 
-                    "is_link_tracking": 1, 
-                    "is_emailopened_tracking": 1,
-                    "created_at": 1, 
-                    "modified_at": 1, 
-                    "created_by": 1, 
-                    "modified_by": 1, 
-                    "send_priority": 1, 
-                    "is_unsubscribed_link": 1, 
-                    "send_as_txt": 1, 
-                    "last_lead_sent": 1,
-                    "error_desc": {"$ifNull": ["$error_desc", ""]},
-                    "camp_st_date": {"$ifNull": ["$camp_st_date", ""]},
-                    "camp_end_date": {"$ifNull": ["$camp_end_date", ""]},
-                    "email_sent_today": {"$ifNull": ["$email_sent_today", ""]},
-                    "positive_reply_count": {"$ifNull": ["$positive_reply_count", 0]},
-                    "negative_reply_count": {"$ifNull": ["$negative_reply_count", 0]},
-                    "neutral_reply_count": {"$ifNull": ["$neutral_reply_count", 0]},
-                    "opportunity_val": {"$ifNull": ["$opportunity_val", 0]},
-                    "exclude_ooo": 1,
-                    "is_acc_based_sending": 1,
-                    "is_pause_on_bouncerate": {"$ifNull": ["$is_pause_on_bouncerate", 0]},
-                    "bounce_rate_limit": {"$ifNull": ["$bounce_rate_limit", 5]},
-                    "is_paused_at_bounced": {"$ifNull": ["$is_paused_at_bounced", 0]},
-                    "last_paused_at_bounced": {"$ifNull": ["$last_paused_at_bounced", ""]},
-                    "send_risky_email": {"$ifNull": ["$send_risky_email", 0]},
-                    "unsub_blocklist": {"$ifNull": ["$unsub_blocklist", 0]},
-                    "other_email_acc": {"$ifNull": ["$other_email_acc", 0]},
-                    "err_email_acc": {"$ifNull": ["$err_email_acc", 0]},
-                    "is_esp_match": {"$ifNull": ["$is_esp_match", 0]},
-                    "ooo_nr_opt": {"$ifNull": ["$ooo_nr_opt", None]},
-                    "ooo_nr_ai_d": {"$ifNull": ["$ooo_nr_ai_d", 7]},
-                    "ooo_nr_d": {"$ifNull": ["$ooo_nr_d", 7]},
-                    "error_time": 1,
-                    "new_lead_contacted_today": 1,
-                    "monthly_mail_reached": 1,
-                    "schedule": {"$ifNull": ["$schedule", {}]},
-                    "completed_lead_count": {"$ifNull": ["$completed_lead_count", 0]},
-                    "custom_fields": {"$ifNull": ["$custom_fields", ""]},
-                    "sequences": {"$ifNull": ["$sequences", []]},
-                    "sequence_steps": {"$size": {"$ifNull": ["$sequences", []]}},
-                    "sheet_tasks": {"$ifNull": ["$sheet_tasks", []]},
-                    "camp_emails": {"$ifNull": ["$camp_emails", []]},
-                    "template_id": {"$ifNull": ["$template_id", ""]},
-                    "is_ev_processing": {"$ifNull": ["$is_ev_processing", 0]},
-                    "open_rate": {
-                        "$cond": {
-                            "if": {"$eq": ["$lead_contacted_count", 0]},
-                            "then": 0,
-                            "else": {
-                                "$round": [
-                                    {
-                                        "$multiply": [
-                                            {"$divide": ["$unique_opened_count", "$lead_contacted_count"]},
-                                            100
-                                        ]
-                                    }, 1]
-                            }
-                        }
-                    },
-                    "replied_rate": {
-                        "$cond": {
-                            "if": {"$eq": ["$lead_contacted_count", 0]},
-                            "then": 0,
-                            "else": {
-                                "$round": [
-                                    {
-                                        "$multiply": [
-                                            {"$divide": ["$replied_count", "$lead_contacted_count"]},
-                                            100
-                                        ]
-                                    }, 1]
-                            }
-                        }
-                    },
-                    "is_replied_email_account_id": {"$ifNull": ["$is_replied_email_account_id", 0]},
-                    "is_subseq_add_cc": {"$ifNull": ["$is_subseq_add_cc", 0]},
-                    "subseq_add_cc": {"$ifNull": ["$subseq_add_cc", []]}
-            }
+        # Choose fields: explicit groups, else the mode's fixed set
+        projection, field_error = _campaign_projection(mode, fields)
+        if field_error:
+            return {"error": field_error}
+        
+        # Resume after the last campaign of the previous page
+        if cursor:
+            after = _decode_cursor(cursor)
+            if after is None:
+                return {"error": "Invalid cursor - pass next_cursor from the previous get_campaigns result unchanged"}
+            campaign_query["$or"] = _after_cursor_match(after)
         
-        # MongoDB aggregation pipeline
+        page_size = max(1, min(int(limit or CAMPAIGN_DEFAULT_PAGE_SIZE), CAMPAIGN_MAX_PAGE_SIZE))
+        
+        # MongoDB aggregation pipeline - one extra campaign tells us whether there is a next page
         pipeline = [
             {"$match": campaign_query},
-            {"$project": projection},
-            {"$sort": {"created_at": -1}},
-            {"$limit": limit}
+            {"$sort": {"created_at": -1, "_id": -1}},
+            {"$limit": page_size + 1},
+            {"$project": projection}
         ]
         
-        # Execute aggregation pipeline
-        campaigns_cursor = db.execute_query("campaigns", "aggregate", pipeline)
+        # Stream the aggregation (capped by documents and bytes)
+        campaigns_cursor = db.iter_query("campaigns", "aggregate", pipeline)
         
         campaigns_list = []
         status_counts = {}
         
         print(f"DEBUG: Processing campaigns from cursor...")
         
-        for campaign in campaigns_cursor:
+        page = list(campaigns_cursor)
+        # A byte-capped page is short but not the end - the cursor resumes after its last campaign
+        truncated = campaigns_cursor.truncated
+        has_more = len(page) > page_size or (truncated and bool(page))
+        page = page[:page_size]
+        next_cursor = _encode_cursor(page[-1]) if has_more else None
+        
+        for campaign in page:
             campaign_status = campaign.get("status", "UNKNOWN")
             status_counts[campaign_status] = status_counts.get(campaign_status, 0) + 1
             
@@ -334,8 +424,11 @@ def get_campaigns(user_email=None, workspace_id=None, workspace_name=None, statu
             "summary": {
                 "total_campaigns": len(campaigns_list),
                 "status_breakdown": status_counts,
-                "filter_applied": {"status": status} if status else None
-            }
+                "filter_applied": {"status": status} if status else None,
+                "has_more": has_more,
+                "truncated": truncated
+            },
+            "next_cursor": next_cursor
         }
         
         print(f"DEBUG: Returning {len(result['campaigns'])} campaigns to Katie")
@@ -350,6 +443,216 @@ def get_campaigns(user_email=None, workspace_id=None, workspace_name=None, statu
         return {"error": f"Failed to get campaigns: {str(e)}"}
 
 
+def _campaign_projection(mode, fields):
+    """
+    Build the $project for get_campaigns
+    
+    Returns:
+        (projection, error) - _id and created_at are always included (they key the cursor)
+    """
+    if fields:
+        groups = [group.strip().lower() for group in (fields.split(",") if isinstance(fields, str) else fields)]
+        unknown = [group for group in groups if group not in CAMPAIGN_FIELD_GROUPS]
+        if unknown:
+            return None, f"Unknown field groups: {', '.join(unknown)}. Available: {', '.join(CAMPAIGN_FIELD_GROUPS)}"
+        names = [name for group in groups for name in CAMPAIGN_FIELD_GROUPS[group]]
+    else:
+        names = CAMPAIGN_MODE_FIELDS.get((mode or "BASIC").upper(), CAMPAIGN_MODE_FIELDS["BASIC"])
+    
+    projection = {"_id": 1, "created_at": 1}
+    for name in names:
+        projection[name] = CAMPAIGN_FIELDS[name]
+    return projection, None
+
+
+def _encode_cursor(campaign):
+    """Opaque resume token for the campaign a page ended on"""
+    position = json_util.dumps({"created_at": campaign.get("created_at"), "_id": campaign["_id"]})
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def _decode_cursor(cursor):
+    """{"created_at", "_id"} from a resume token, or None if it is not one of ours"""
+    try:
+        position = json_util.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        if not isinstance(position.get("_id"), ObjectId):
+            return None
+        return {"created_at": position.get("created_at"), "_id": position["_id"]}
+    except Exception:
+        return None
+
+
+def _after_cursor_match(after):
+    """
+    $or matching the campaigns that sort after the cursor position (created_at -1, _id -1)
+    
+    Campaigns without created_at sort last, so a dated position still has every undated campaign ahead
+    """
+    conditions = [
+        {"created_at": {"$lt": after["created_at"]}},
+        {"created_at": after["created_at"], "_id": {"$lt": after["_id"]}}
+    ]
+    if after["created_at"] is not None:
+        conditions.append({"created_at": None})
+    return conditions
+
+
+def get_campaign_health(user_email=None, workspace_id=None, workspace_name=None, limit=HEALTH_DEFAULT_LIMIT, loader=None):
+    """
+    Get a compact health snapshot of a workspace's campaigns in one aggregation
+    
+    A single $facet pipeline returns the status breakdown, issue breakdown and the
+    per-campaign health rows (campaigns with issues first), instead of shipping full
+    campaign documents and working the health out from them.
+    
+    Args:
+        user_email: User email (if not specified, uses conversation context)
+        workspace_id: Explicit workspace ID
+        workspace_name: Workspace name to search for
+        limit: Maximum campaigns to list (counts always cover every campaign)
+        loader: Request-scoped IdentityLoader shared with other functions in the same command
+    
+    Returns:
+        dict: Health summary, per-campaign health rows and workspace info
+    """
+    
+    loader = loader or IdentityLoader(AssistantDB())
+    db = loader.db
+    
+    try:
+        resolution = resolve_workspace_and_org(
+            user_email=user_email,
+            workspace_id=workspace_id,
+            workspace_name=workspace_name,
+            loader=loader
+        )
+        
+        if "error" in resolution:
+            return {"error": resolution["error"]}
+        
+        resolved_workspace_id = resolution["workspace_id"]
+        resolved_org_id = resolution["organization_id"]
+        
+        campaign_query = {
+            "workspace_id": ObjectId(resolved_workspace_id),
+            "organization_id": ObjectId(resolved_org_id),
+            "status": {"$ne": "DELETED"}
+        }
+        
+        print(f"DEBUG: Campaign health query: {campaign_query}, Limit: {limit}")
+        
+        pipeline = [
+            {"$match": campaign_query},
+            {"$project": _health_projection()},
+            {"$facet": {
+                "status_counts": [
+                    {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+                ],
+                "issue_counts": [
+                    {"$unwind": "$issues"},
+                    {"$group": {"_id": "$issues", "count": {"$sum": 1}}}
+                ],
+                "campaigns": [
+                    {"$addFields": {"issue_count": {"$size": "$issues"}}},
+                    {"$sort": {"issue_count": -1, "created_at": -1}},
+                    {"$limit": int(limit or HEALTH_DEFAULT_LIMIT)},
+                    {"$project": {"issue_count": 0, "created_at": 0}}
+                ]
+            }}
+        ]
+        
+        facets_cursor = db.iter_query("campaigns", "aggregate", pipeline)
+        facets = list(facets_cursor)
+        facet = facets[0] if facets else {}
+        
+        status_counts = {row["_id"] or "UNKNOWN": row["count"] for row in facet.get("status_counts", [])}
+        issue_counts = {row["_id"]: row["count"] for row in facet.get("issue_counts", [])}
+        
+        campaigns_list = facet.get("campaigns", [])
+        for campaign in campaigns_list:
+            campaign["_id"] = str(campaign["_id"])
+        
+        print(f"DEBUG: Campaign health - statuses: {status_counts}, issues: {issue_counts}")
+        
+        return {
+            "summary": {
+                "total_campaigns": sum(status_counts.values()),
+                "status_breakdown": status_counts,
+                "issue_breakdown": issue_counts,
+                "campaigns_listed": len(campaigns_list),
+                "truncated": facets_cursor.truncated
+            },
+            "campaigns": campaigns_list,
+            "workspace_info": {
+                "workspace_id": resolved_workspace_id,
+                "workspace_name": resolution["workspace_name"],
+                "organization_id": resolved_org_id
+            }
+        }
+        
+    except Exception as e:
+        import traceback
+        print(f"Error in get_campaign_health: {e}")
+        print(f"Traceback: {traceback.format_exc()}")
+        return {"error": f"Failed to get campaign health: {str(e)}"}
+
+
+def _health_projection():
+    """Per-campaign health fields, with the issue flags worked out server-side"""
+    
+    def number(field):
+        # Counters are not stored consistently (missing, "" or numeric strings)
+        return {"$convert": {"input": f"${field}", "to": "double", "onError": 0, "onNull": 0}}
+    
+    def issue(name, condition):
+        return {"$cond": [condition, name, None]}
+    
+    error_desc = {"$ifNull": ["$error_desc", ""]}
+    bounce_paused = {"$in": ["$is_paused_at_bounced", [1, True, "1"]]}
+    daily_limit_reached = {"$and": [
+        {"$gt": [number("daily_limit"), 0]},
+        {"$gte": [number("email_sent_today"), number("daily_limit")]}
+    ]}
+    no_leads_left = {"$and": [
+        {"$gt": [number("lead_count"), 0]},
+        {"$gte": [number("lead_contacted_count"), number("lead_count")]}
+    ]}
+    
+    return {
+        "_id": 1,
+        "camp_name": 1,
+        "status": 1,
+        "created_at": 1,
+        "error_desc": {"$substrCP": [error_desc, 0, HEALTH_ERROR_MAX_CHARS]},
+        "error_time": 1,
+        "is_paused_at_bounced": {"$cond": [bounce_paused, 1, 0]},
+        "last_paused_at_bounced": 1,
+        "bounce_rate_limit": {"$ifNull": ["$bounce_rate_limit", 5]},
+        "bounced_count": {"$ifNull": ["$bounced_count", 0]},
+        "daily_limit": 1,
+        "email_sent_today": {"$ifNull": ["$email_sent_today", 0]},
+        "err_email_acc": {"$ifNull": ["$err_email_acc", 0]},
+        "email_accounts_count": {"$size": {"$ifNull": ["$email_accounts", []]}},
+        "leads_remaining": {"$max": [{"$subtract": [number("lead_count"), number("lead_contacted_count")]}, 0]},
+        "last_lead_sent": 1,
+        "issues": {"$filter": {
+            "input": [
+                issue("error", {"$or": [
+                    {"$eq": ["$status", "ERROR"]},
+                    {"$gt": [{"$strLenCP": error_desc}, 0]}
+                ]}),
+                issue("paused_bounce_rate", bounce_paused),
+                issue("daily_limit_reached", daily_limit_reached),
+                issue("email_account_errors", {"$gt": [number("err_email_acc"), 0]}),
+                issue("no_email_accounts", {"$eq": [{"$size": {"$ifNull": ["$email_accounts", []]}}, 0]}),
+                issue("no_leads_left", no_leads_left)
+            ],
+            "as": "issue",
+            "cond": {"$ne": ["$$issue", None]}
+        }}
+    }
+
+
 # Additional campaign functions can be added here
 def get_campaign_details(campaign_id, user_email=None):
     """Get detailed information about a specific campaign"""
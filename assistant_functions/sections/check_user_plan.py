@@ -5,6 +5,11 @@ Functions for checking user plans, workspace membership, and billing information
 
 from ..database import AssistantDB
 from ..function_registry import FunctionDefinition
+from ..identity_loader import IdentityLoader
+
+# check_user_plan result caps: every workspace (~70 tokens each) plus user info
+USER_PLAN_MAX_WORKSPACES = 50
+USER_PLAN_RESULT_MAX_TOKENS = 3600
 
 
 def register_user_plan_functions(registry):
@@ -54,6 +59,9 @@ def register_user_plan_functions(registry):
             }
         },
         function_callable=check_user_plan,
+        result_max_items=USER_PLAN_MAX_WORKSPACES,  # the model needs to see every workspace,
+        result_max_tokens=USER_PLAN_RESULT_MAX_TOKENS,  # which the default token cap can't hold
+        cache_policy={"ttl": 300, "key_params": ["user_email", "workspace_id", "workspace_name"], "read_only": True},
         examples=[
             "Check current user: check_user_plan()",
             "Check specific user: check_user_plan(user_email='user@example.com')",
@@ -64,15 +72,14 @@ def register_user_plan_functions(registry):
 
 
 # Function implementation - BASED ON YOUR WORKING CODE
-def check_user_plan(user_email=None, workspace_id=None, workspace_name=None):
+def check_user_plan(user_email=None, workspace_id=None, workspace_name=None, loader=None):
     """
     Check user plan and associated workspace information.
     Returns ALL workspaces the user has access to with names, plans, owners.
     If workspace_name is provided, resolves it to workspace_id first.
+    loader: request-scoped IdentityLoader shared with other functions in the same command
     """
-    from bson import ObjectId
-    
-    db = AssistantDB()
+    loader = loader or IdentityLoader(AssistantDB())
     
     try:
         # If workspace_name is provided, resolve it to workspace_id first
@@ -80,7 +87,8 @@ def check_user_plan(user_email=None, workspace_id=None, workspace_name=None):
             from ..workspace_resolver import resolve_workspace_and_org
             resolution = resolve_workspace_and_org(
                 user_email=user_email,
-                workspace_name=workspace_name
+                workspace_name=workspace_name,
+                loader=loader
             )
             if "error" in resolution:
                 return {"error": f"Could not resolve workspace '{workspace_name}': {resolution['error']}"}
@@ -89,90 +97,29 @@ def check_user_plan(user_email=None, workspace_id=None, workspace_name=None):
         if not user_email:
             return {"error": "No user email provided. Please specify user_email parameter."}
         
+        # Fresh materialized snapshot: one indexed read in the dashboard DB
+        snapshot = loader.load_account_snapshot(user_email)
+        if snapshot:
+            return {
+                "user_info": snapshot["user_info"],
+                "workspaces": snapshot["workspaces"],
+                "workspace_summary": snapshot["workspace_summary"],
+                "data_source": {
+                    "type": "snapshot",
+                    "refreshed_at": snapshot["refreshed_at"],
+                    "age_seconds": snapshot["age_seconds"]
+                }
+            }
+        
         # 1) Find user by email
-        user_doc = db.execute_query("users", "find_one", {"email": user_email.lower()})
+        user_doc = loader.load_user(user_email)
         if not user_doc:
             return {"error": f"User not found: {user_email}"}
         
-        workspace_info_list = []
-        user_workspaces = user_doc.get("workspaces", [])
-        
-        for idx, ws_info in enumerate(user_workspaces, start=1):
-            ws_id_obj = ws_info.get("workspace_id")
-            if not ws_id_obj:
-                continue
-                
-            role_name = ws_info.get("role_name", "N/A")
-            
-            # Get workspace document
-            ws_doc = db.execute_query("workspaces", "find_one", {"_id": ws_id_obj})
-            if not ws_doc:
-                continue
-                
-            workspace_name = ws_doc.get("name", f"Workspace {str(ws_id_obj)}")
-            workspace_status = ws_doc.get("status", "Unknown")
-            
-            # Get organization and plan details
-            org_id = ws_doc.get("org_id")
-            plan_name = "N/A"
-            owner_email = "N/A"
-            internal_group = "N/A"
-            
-            if org_id:
-                # Get organization document
-                org_doc = db.execute_query("organizations", "find_one", {"_id": org_id})
-                if org_doc:
-                    # Get plan name
-                    plan_id = org_doc.get("plan_id")
-                    if plan_id:
-                        plan_doc = db.execute_query("plans", "find_one", {"_id": plan_id})
-                        if plan_doc:
-                            plan_name = plan_doc.get("plan_name", "N/A")
-                    
-                    # Find workspace owner
-                    owner_query = {
-                        "workspaces": {
-                            "$elemMatch": {
-                                "org_id": org_id,
-                                "role_name": "OWNER"
-                            }
-                        }
-                    }
-                    owner_doc = db.execute_query("users", "find_one", owner_query)
-                    if owner_doc:
-                        owner_email = owner_doc.get("email", "N/A")
-                    
-                    internal_group = org_doc.get("internal_group", "N/A")
-            
-            workspace_info_list.append({
-                "workspace_id": str(ws_id_obj),
-                "workspace_name": workspace_name,
-                "role_name": role_name,
-                "plan_name": plan_name,
-                "owner_email": owner_email,
-                "status": workspace_status,
-                "internal_group": internal_group
-            })
+        # 2) Build the workspace/plan/owner view (the loader keeps it as the user's snapshot)
+        view = loader.build_account_view(user_doc)
         
-        # Count active/inactive workspaces
-        active_workspaces = sum(1 for ws in workspace_info_list if ws["status"] == "ACTIVE")
-        inactive_workspaces = sum(1 for ws in workspace_info_list if ws["status"] == "INACTIVE")
-        
-        return {
-            "user_info": {
-                "email": user_doc.get("email"),
-                "first_name": user_doc.get("first_name"),
-                "last_name": user_doc.get("last_name"),
-                "role_name": user_doc.get("role_name"),
-                "status": user_doc.get("status")
-            },
-            "workspaces": workspace_info_list,
-            "workspace_summary": {
-                "total_workspaces": len(workspace_info_list),
-                "active_workspaces": active_workspaces,
-                "inactive_workspaces": inactive_workspaces
-            }
-        }
+        return {**view, "data_source": {"type": "live"}}
         
     except Exception as e:
         import traceback
@@ -0,0 +1,401 @@
+"""
+Email Account Functions
+Functions for listing email (sending) accounts and checking their health
+
+Both functions run one bounded aggregation over the email_accounts collection:
+$match on the workspace (uses the index below), $project of the summary fields
+only, then $facet for server-side counts and the capped account list.
+
+Required index (app DB):
+    db.email_accounts.createIndex({"workspace_id": 1, "organization_id": 1, "status": 1})
+"""
+
+from ..database import AssistantDB
+from ..function_registry import FunctionDefinition
+from ..workspace_resolver import resolve_workspace_and_org
+from ..identity_loader import IdentityLoader
+from bson import ObjectId
+
+# Email account status constants
+EMAIL_ACCOUNT_STATUSES = ["ACTIVE", "PAUSED", "ERROR", "INACTIVE"]
+
+# Index the workspace $match relies on (see module docstring and context/email_accounts_info.txt)
+EMAIL_ACCOUNTS_INDEX = [("workspace_id", 1), ("organization_id", 1), ("status", 1)]
+
+# Accounts listed per call (counts always cover the whole workspace)
+ACCOUNTS_DEFAULT_LIMIT = 20
+
+# Warmup shorter than this is reported as an issue
+WARMUP_MIN_DAYS = 14
+
+# Error messages are cut to this many characters
+ACCOUNT_ERROR_MAX_CHARS = 200
+
+
+def register_email_account_functions(registry):
+    """Register all email account-related functions"""
+
+    # Register the section
+    registry.register_section(
+        "email_accounts",
+        "Email (sending) accounts - list accounts, their status, errors, sending limits and warmup",
+        "email_accounts_info"  # Will load from context/email_accounts_info.txt
+    )
+
+    workspace_inputs = {
+        "user_email": {
+            "type": "string",
+            "description": "Email of the user (defaults to conversation user if not specified)",
+            "required": False
+        },
+        "workspace_id": {
+            "type": "string",
+            "description": "Specific workspace ID",
+            "required": False
+        },
+        "workspace_name": {
+            "type": "string",
+            "description": "Workspace name to search for (e.g., 'Yaro's workspace')",
+            "required": False
+        }
+    }
+
+    workspace_info_output = {
+        "type": "object",
+        "description": "Information about the workspace the accounts belong to"
+    }
+
+    # Get email accounts function
+    registry.register_function(FunctionDefinition(
+        name="get_email_accounts",
+        description="List the email (sending) accounts of a user's workspace with status, errors, daily limit and warmup",
+        section="email_accounts",
+        inputs={
+            **workspace_inputs,
+            "status": {
+                "type": "string",
+                "description": "Filter by account status (ACTIVE, PAUSED, ERROR, INACTIVE)",
+                "required": False
+            },
+            "limit": {
+                "type": "integer",
+                "description": f"Maximum number of accounts to list (default: {ACCOUNTS_DEFAULT_LIMIT})",
+                "required": False
+            }
+        },
+        outputs={
+            "accounts": {
+                "type": "array",
+                "description": "Email accounts with email, status, error, daily limit, sent today and warmup"
+            },
+            "summary": {
+                "type": "object",
+                "description": "Total accounts and status breakdown across the whole workspace"
+            },
+            "workspace_info": workspace_info_output
+        },
+        function_callable=get_email_accounts,
+        cache_policy={"ttl": 120, "read_only": True},
+        examples=[
+            "Get user's email accounts: get_email_accounts(user_email='user@example.com')",
+            "Get accounts in error: get_email_accounts(user_email='user@example.com', status='ERROR')"
+        ]
+    ))
+
+    # Check account health function
+    registry.register_function(FunctionDefinition(
+        name="check_account_health",
+        description="Health check of a workspace's email accounts: issue counts plus the accounts with problems (errors, paused, daily limit reached, warmup under 14 days). Pass email to check one account",
+        section="email_accounts",
+        inputs={
+            **workspace_inputs,
+            "email": {
+                "type": "string",
+                "description": "Check only this email account (e.g., 'sales@company.com')",
+                "required": False
+            },
+            "limit": {
+                "type": "integer",
+                "description": f"Maximum number of accounts to list, accounts with issues first (default: {ACCOUNTS_DEFAULT_LIMIT})",
+                "required": False
+            }
+        },
+        outputs={
+            "summary": {
+                "type": "object",
+                "description": "Total accounts, status breakdown and issue breakdown"
+            },
+            "accounts": {
+                "type": "array",
+                "description": "Per-account health with the list of issues found"
+            },
+            "workspace_info": workspace_info_output
+        },
+        function_callable=check_account_health,
+        cache_policy={"ttl": 120, "read_only": True},
+        examples=[
+            "Check all accounts: check_account_health(user_email='user@example.com')",
+            "Check one account: check_account_health(user_email='user@example.com', email='sales@company.com')"
+        ]
+    ))
+
+
+def get_email_accounts(user_email=None, workspace_id=None, workspace_name=None, status=None, limit=ACCOUNTS_DEFAULT_LIMIT, loader=None):
+    """
+    Get the email accounts of a user's workspace
+
+    Args:
+        user_email: User email (if not specified, uses conversation context)
+        workspace_id: Explicit workspace ID
+        workspace_name: Workspace name to search for
+        status: Filter by account status
+        limit: Maximum accounts to list (counts always cover every account)
+        loader: Request-scoped IdentityLoader shared with other functions in the same command
+
+    Returns:
+        dict: Account list with status breakdown and workspace info
+    """
+
+    loader = loader or IdentityLoader(AssistantDB())
+
+    try:
+        resolution = resolve_workspace_and_org(
+            user_email=user_email,
+            workspace_id=workspace_id,
+            workspace_name=workspace_name,
+            loader=loader
+        )
+
+        if "error" in resolution:
+            return {"error": resolution["error"]}
+
+        account_query = _workspace_match(resolution)
+        if status:
+            account_query["status"] = status.upper()
+
+        facet = _run_account_facets(loader.db, account_query, {
+            "accounts": [
+                {"$sort": {"email": 1}},
+                {"$limit": int(limit or ACCOUNTS_DEFAULT_LIMIT)},
+                {"$project": {"issues": 0}}
+            ]
+        })
+
+        accounts = facet.get("accounts", [])
+        status_counts = facet["status_counts"]
+
+        print(f"DEBUG: Email accounts - {len(accounts)} listed, statuses: {status_counts}")
+
+        return {
+            "accounts": accounts,
+            "summary": {
+                "total_accounts": sum(status_counts.values()),
+                "status_breakdown": status_counts,
+                "accounts_listed": len(accounts),
+                "filter_applied": {"status": status} if status else None,
+                "truncated": facet["truncated"]
+            },
+            "workspace_info": _workspace_info(resolution)
+        }
+
+    except Exception as e:
+        import traceback
+        print(f"Error in get_email_accounts: {e}")
+        print(f"Traceback: {traceback.format_exc()}")
+        return {"error": f"Failed to get email accounts: {str(e)}"}
+
+
+def check_account_health(user_email=None, workspace_id=None, workspace_name=None, email=None, limit=ACCOUNTS_DEFAULT_LIMIT, loader=None):
+    """
+    Check the health of a workspace's email accounts
+
+    Args:
+        user_email: User email (if not specified, uses conversation context)
+        workspace_id: Explicit workspace ID
+        workspace_name: Workspace name to search for
+        email: Check only this account
+        limit: Maximum accounts to list (accounts with issues first)
+        loader: Request-scoped IdentityLoader shared with other functions in the same command
+
+    Returns:
+        dict: Issue/status breakdown, per-account health and workspace info
+    """
+
+    loader = loader or IdentityLoader(AssistantDB())
+
+    try:
+        resolution = resolve_workspace_and_org(
+            user_email=user_email,
+            workspace_id=workspace_id,
+            workspace_name=workspace_name,
+            loader=loader
+        )
+
+        if "error" in resolution:
+            return {"error": resolution["error"]}
+
+        account_query = _workspace_match(resolution)
+        if email:
+            account_query["email"] = email.strip().lower()
+
+        facet = _run_account_facets(loader.db, account_query, {
+            "issue_counts": [
+                {"$unwind": "$issues"},
+                {"$group": {"_id": "$issues", "count": {"$sum": 1}}}
+            ],
+            "healthy_count": [
+                {"$match": {"issues": {"$size": 0}}},
+                {"$count": "count"}
+            ],
+            "accounts": [
+                {"$addFields": {"issue_count": {"$size": "$issues"}}},
+                {"$sort": {"issue_count": -1, "email": 1}},
+                {"$limit": int(limit or ACCOUNTS_DEFAULT_LIMIT)},
+                {"$project": {"issue_count": 0}}
+            ]
+        })
+
+        accounts = facet.get("accounts", [])
+        status_counts = facet["status_counts"]
+        issue_counts = {row["_id"]: row["count"] for row in facet.get("issue_counts", [])}
+        healthy_count = sum(row["count"] for row in facet.get("healthy_count", []))
+
+        if email and not accounts:
+            return {"error": f"Email account not found in this workspace: {email}"}
+
+        print(f"DEBUG: Account health - statuses: {status_counts}, issues: {issue_counts}")
+
+        return {
+            "summary": {
+                "total_accounts": sum(status_counts.values()),
+                "status_breakdown": status_counts,
+                "issue_breakdown": issue_counts,
+                "healthy_accounts": healthy_count,
+                "accounts_listed": len(accounts),
+                "truncated": facet["truncated"]
+            },
+            "accounts": accounts,
+            "workspace_info": _workspace_info(resolution)
+        }
+
+    except Exception as e:
+        import traceback
+        print(f"Error in check_account_health: {e}")
+        print(f"Traceback: {traceback.format_exc()}")
+        return {"error": f"Failed to check account health: {str(e)}"}
+
+
+def _workspace_match(resolution):
+    """$match on the resolved workspace (prefix of EMAIL_ACCOUNTS_INDEX)"""
+    return {
+        "workspace_id": ObjectId(resolution["workspace_id"]),
+        "organization_id": ObjectId(resolution["organization_id"]),
+        "status": {"$ne": "DELETED"}
+    }
+
+
+def _workspace_info(resolution):
+    """Workspace block returned with every result"""
+    return {
+        "workspace_id": resolution["workspace_id"],
+        "workspace_name": resolution["workspace_name"],
+        "organization_id": resolution["organization_id"]
+    }
+
+
+def _run_account_facets(db, account_query, facets):
+    """
+    Run $match -> $project -> $facet with a status breakdown plus the given facets
+
+    Returns:
+        dict: facet results, with status_counts as {status: count} and truncated from iter_query
+    """
+    pipeline = [
+        {"$match": account_query},
+        {"$project": _account_projection()},
+        {"$facet": {
+            "status_counts": [
+                {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+            ],
+            **facets
+        }}
+    ]
+
+    print(f"DEBUG: Email account query: {account_query}")
+
+    results_cursor = db.iter_query("email_accounts", "aggregate", pipeline)
+    results = list(results_cursor)
+    facet = results[0] if results else {}
+    facet["truncated"] = results_cursor.truncated
+
+    for account in facet.get("accounts", []):
+        account["_id"] = str(account["_id"])
+
+    facet["status_counts"] = {row["_id"] or "UNKNOWN": row["count"] for row in facet.get("status_counts", [])}
+    return facet
+
+
+def _account_projection():
+    """Per-account summary fields, with the issue flags worked out server-side"""
+
+    def number(field):
+        # Counters are not stored consistently (missing, "" or numeric strings)
+        return {"$convert": {"input": f"${field}", "to": "double", "onError": 0, "onNull": 0}}
+
+    def issue(name, condition):
+        return {"$cond": [condition, name, None]}
+
+    def date(field):
+        return {"$convert": {"input": f"${field}", "to": "date", "onError": None, "onNull": None}}
+
+    error_desc = {"$ifNull": ["$error_desc", ""]}
+    # Active accounts keep the last error_desc after recovering - it only counts if nothing was sent since
+    error_time = date("error_time")
+    last_sent = date("last_sent_at")
+    error_is_current = {"$or": [
+        {"$ne": ["$status", "ACTIVE"]},
+        {"$and": [
+            {"$ne": [error_time, None]},
+            {"$or": [{"$eq": [last_sent, None]}, {"$gt": [error_time, last_sent]}]}
+        ]}
+    ]}
+    warmup_started = {"$convert": {"input": "$warmup_started_at", "to": "date", "onError": None, "onNull": None}}
+    warmup_days = {"$cond": [
+        {"$eq": [warmup_started, None]},
+        None,
+        {"$floor": {"$divide": [{"$subtract": ["$$NOW", warmup_started]}, 86400000]}}
+    ]}
+    daily_limit_reached = {"$and": [
+        {"$gt": [number("daily_limit"), 0]},
+        {"$gte": [number("email_sent_today"), number("daily_limit")]}
+    ]}
+
+    return {
+        "_id": 1,
+        "email": 1,
+        "status": 1,
+        "provider": 1,
+        "error_desc": {"$substrCP": [error_desc, 0, ACCOUNT_ERROR_MAX_CHARS]},
+        "error_time": 1,
+        "daily_limit": 1,
+        "email_sent_today": {"$ifNull": ["$email_sent_today", 0]},
+        "warmup_status": 1,
+        "warmup_days": warmup_days,
+        "last_sent_at": 1,
+        "issues": {"$filter": {
+            "input": [
+                issue("error", {"$or": [
+                    {"$eq": ["$status", "ERROR"]},
+                    {"$and": [{"$gt": [{"$strLenCP": error_desc}, 0]}, error_is_current]}
+                ]}),
+                issue("paused", {"$eq": ["$status", "PAUSED"]}),
+                issue("daily_limit_reached", daily_limit_reached),
+                issue("warmup_incomplete", {"$and": [
+                    {"$ne": [warmup_days, None]},
+                    {"$lt": [warmup_days, WARMUP_MIN_DAYS]}
+                ]})
+            ],
+            "as": "issue",
+            "cond": {"$ne": ["$$issue", None]}
+        }}
+    }
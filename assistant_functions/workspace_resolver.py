@@ -4,11 +4,23 @@ Handles workspace/organization resolution logic used across all functions
 """
 
 from .database import AssistantDB
+from .identity_loader import IdentityLoader
 from bson import ObjectId
+import difflib
 import re
+import metrics
 
+# Local workspace-name matching: the top candidate is accepted without an LLM call when its
+# normalized tokens equal the query's, or when it scores at least LOCAL_MATCH_MIN_SCORE, beats
+# the runner-up by LOCAL_MATCH_MIN_MARGIN and has exactly the query's distinguishing tokens
+LOCAL_MATCH_MIN_SCORE = 0.8
+LOCAL_MATCH_MIN_MARGIN = 0.15
 
-def resolve_workspace_and_org(user_email=None, workspace_id=None, workspace_name=None):
+# Words that don't help tell workspaces apart
+WORKSPACE_NAME_STOPWORDS = {"workspace", "workspaces", "ws", "the", "my"}
+
+
+def resolve_workspace_and_org(user_email=None, workspace_id=None, workspace_name=None, loader=None):
     """
     Shared function to resolve workspace_id and organization_id
     
@@ -16,6 +28,7 @@ def resolve_workspace_and_org(user_email=None, workspace_id=None, workspace_name
         user_email: User's email (required if no workspace_id specified)
         workspace_id: Explicit workspace ID (if provided, use this)
         workspace_name: Workspace name to search for (AI should extract this from query)
+        loader: Request-scoped IdentityLoader (documents already read in this command are reused)
     
     Returns:
         dict: {
@@ -26,20 +39,20 @@ def resolve_workspace_and_org(user_email=None, workspace_id=None, workspace_name
         }
     """
     
-    db = AssistantDB()
+    loader = loader or IdentityLoader(AssistantDB())
     
     try:
         # Case 1: Explicit workspace_id provided
         if workspace_id:
-            return _resolve_from_workspace_id(db, workspace_id)
+            return _resolve_from_workspace_id(loader, workspace_id)
         
         # Case 2: Workspace name provided (AI should determine this from query context)
         if workspace_name:
-            return _resolve_from_workspace_name(db, user_email, workspace_name)
+            return _resolve_from_workspace_name(loader, user_email, workspace_name)
         
         # Case 3: Default to user's primary workspace
         if user_email:
-            return _resolve_user_primary_workspace(db, user_email)
+            return _resolve_user_primary_workspace(loader, user_email)
         
         return {"error": "No user email or workspace identifier provided"}
         
@@ -47,13 +60,13 @@ def resolve_workspace_and_org(user_email=None, workspace_id=None, workspace_name
         return {"error": f"Failed to resolve workspace: {str(e)}"}
 
 
-def _resolve_from_workspace_id(db, workspace_id):
+def _resolve_from_workspace_id(loader, workspace_id):
     """Resolve organization from explicit workspace ID"""
     try:
         ws_id_obj = ObjectId(workspace_id) if isinstance(workspace_id, str) else workspace_id
         
         # Get workspace document
-        ws_doc = db.execute_query("workspaces", "find_one", {"_id": ws_id_obj})
+        ws_doc = loader.load_workspaces([ws_id_obj]).get(ws_id_obj)
         if not ws_doc:
             return {"error": f"Workspace not found: {workspace_id}"}
         
@@ -71,46 +84,42 @@ def _resolve_from_workspace_id(db, workspace_id):
         return {"error": f"Invalid workspace ID format: {workspace_id}"}
 
 
-def _resolve_from_workspace_name(db, user_email, workspace_name):
+def _resolve_from_workspace_name(loader, user_email, workspace_name):
     """Resolve workspace by name using AI to match against user's accessible workspaces"""
     if not user_email:
         return {"error": "User email required for workspace name lookup"}
     
     # Get user's workspaces
-    user_doc = db.execute_query("users", "find_one", {"email": user_email.lower()})
-    if not user_doc:
-        return {"error": f"User not found: {user_email}"}
-    
-    user_workspaces = user_doc.get("workspaces", [])
+    user_workspaces = _user_workspaces(loader, user_email)
+    if isinstance(user_workspaces, dict):
+        return user_workspaces
     
     # Get all workspace names
     available_workspaces = []
     workspace_map = {}
     
-    for ws_info in user_workspaces:
-        ws_id_obj = ws_info.get("workspace_id")
-        if not ws_id_obj:
-            continue
-        
-        # Get workspace document
-        ws_doc = db.execute_query("workspaces", "find_one", {"_id": ws_id_obj})
-        if not ws_doc:
-            continue
-        
-        ws_name = ws_doc.get("name", "")
-        org_id = ws_doc.get("org_id")
-        
-        if ws_name and org_id:
+    for workspace_data in user_workspaces:
+        ws_name = workspace_data["workspace_name"]
+        if ws_name and ws_name not in workspace_map:
             available_workspaces.append(ws_name)
             workspace_map[ws_name] = {
-                "workspace_id": str(ws_id_obj),
-                "organization_id": str(org_id),
+                "workspace_id": workspace_data["workspace_id"],
+                "organization_id": workspace_data["organization_id"],
                 "workspace_name": ws_name
             }
     
     if not available_workspaces:
         return {"error": f"No valid workspaces found for user: {user_email}"}
     
+    # Try a deterministic local match first - only ambiguous names need the model
+    local_match = match_workspace_name_locally(workspace_name, available_workspaces)
+    if local_match:
+        metrics.increment("workspace_match.local")
+        print(f"DEBUG: Locally matched '{workspace_name}' -> '{local_match}'")
+        return workspace_map[local_match]
+    
+    metrics.increment("workspace_match.llm")
+    
     # Use AI to find the best match
     import openai_utils
     import config
@@ -129,7 +138,8 @@ Best match:"""
             messages=[{"role": "user", "content": match_prompt}],
             max_completion_tokens=50,
             temperature=0.1,
-            model=config.NANO
+            model=config.NANO,
+            label="workspace_match"
         )
         
         if response_obj and response_obj.choices:
@@ -152,9 +162,105 @@ Best match:"""
     return {"error": f"Could not match workspace '{workspace_name}' to any available workspace"}
 
 
-def _resolve_user_primary_workspace(db, user_email):
-    """Get user's primary workspace (preference: OWNER > first active > first any)"""
-    user_doc = db.execute_query("users", "find_one", {"email": user_email.lower()})
+def match_workspace_name_locally(workspace_name, candidates):
+    """
+    Match a workspace name against candidates with normalized token-set and edit-distance scoring
+    
+    Returns the confident best candidate, or None when the best score is too low, the
+    top two candidates are too close to call, or the names differ in a number or a short
+    token ("Client A" vs "Client B", "Acme 2" vs "Acme 1") - the caller then asks the model
+    """
+    scored = sorted(
+        ((_workspace_name_score(workspace_name, candidate), candidate) for candidate in candidates),
+        key=lambda item: item[0],
+        reverse=True
+    )
+    if not scored:
+        return None
+    
+    best_score, best_name = scored[0]
+    second_score = scored[1][0] if len(scored) > 1 else 0.0
+    
+    print(f"DEBUG: Local workspace match for '{workspace_name}': best '{best_name}' ({best_score:.2f}), runner-up {second_score:.2f}")
+    
+    query_tokens = _normalize_workspace_name(workspace_name)
+    best_tokens = _normalize_workspace_name(best_name)
+    if query_tokens == best_tokens or set(query_tokens) == set(best_tokens):
+        return best_name
+    
+    if best_score < LOCAL_MATCH_MIN_SCORE or best_score - second_score < LOCAL_MATCH_MIN_MARGIN:
+        return None
+    
+    # Edit distance can't tell "2023" from "2024" - numbers and short tokens must match exactly
+    if _distinguishing_tokens(query_tokens) != _distinguishing_tokens(best_tokens):
+        print(f"DEBUG: Local workspace match rejected, '{workspace_name}' and '{best_name}' differ in numbers/short tokens")
+        return None
+    return best_name
+
+
+def _normalize_workspace_name(name):
+    """Lowercase, drop possessives/punctuation and filler words; returns a list of tokens"""
+    text = name.lower().replace("’", "'")
+    text = re.sub(r"'s\b", "", text)
+    text = re.sub(r"[^a-z0-9]+", " ", text)
+    tokens = [token for token in text.split() if token not in WORKSPACE_NAME_STOPWORDS]
+    
+    # A name made only of filler words ("My Workspace") keeps its words
+    return tokens or text.split()
+
+
+def _distinguishing_tokens(tokens):
+    """Tokens that carry a number or are at most 2 characters long (suffixes like "2", "A", "EU")"""
+    return {token for token in tokens if len(token) <= 2 or any(char.isdigit() for char in token)}
+
+
+def _workspace_name_score(query, candidate):
+    """Similarity between 0 and 1 (max of token-set overlap and edit-distance ratios)"""
+    query_tokens = _normalize_workspace_name(query)
+    candidate_tokens = _normalize_workspace_name(candidate)
+    if not query_tokens or not candidate_tokens:
+        return 0.0
+    
+    if query_tokens == candidate_tokens:
+        return 1.0
+    
+    # Token-set overlap (Dice coefficient) - ignores word order
+    query_set = set(query_tokens)
+    candidate_set = set(candidate_tokens)
+    token_score = 2 * len(query_set & candidate_set) / (len(query_set) + len(candidate_set))
+    
+    # Edit-distance ratios on the joined and the sorted tokens - tolerates typos
+    edit_score = difflib.SequenceMatcher(None, " ".join(query_tokens), " ".join(candidate_tokens)).ratio()
+    sorted_score = difflib.SequenceMatcher(
+        None, " ".join(sorted(query_set)), " ".join(sorted(candidate_set))
+    ).ratio()
+    
+    return max(token_score, edit_score, sorted_score)
+
+
+def _user_workspaces(loader, user_email):
+    """
+    User's workspaces that have an organization, as
+    [{"workspace_id", "organization_id", "workspace_name", "role", "status"}]
+    
+    Read from the user's account snapshot when it is fresh, otherwise from the app DB.
+    Returns {"error": ...} when the user doesn't exist or has no workspaces.
+    """
+    snapshot = loader.load_account_snapshot(user_email)
+    if snapshot:
+        return [
+            {
+                "workspace_id": ws["workspace_id"],
+                "organization_id": ws["organization_id"],
+                "workspace_name": ws.get("workspace_name", "Unknown"),
+                "role": ws.get("role_name", ""),
+                "status": ws.get("status", "Unknown")
+            }
+            for ws in snapshot.get("workspaces", [])
+            if ws.get("organization_id")
+        ]
+    
+    user_doc = loader.load_user(user_email)
     if not user_doc:
         return {"error": f"User not found: {user_email}"}
     
@@ -162,19 +268,16 @@ def _resolve_user_primary_workspace(db, user_email):
     if not user_workspaces:
         return {"error": f"User has no accessible workspaces: {user_email}"}
     
-    owner_workspaces = []
-    active_workspaces = []
-    all_workspaces = []
+    workspaces_by_id = loader.load_workspaces([ws_info.get("workspace_id") for ws_info in user_workspaces])
     
+    workspaces = []
     for ws_info in user_workspaces:
         ws_id_obj = ws_info.get("workspace_id")
-        role_name = ws_info.get("role_name", "")
-        
         if not ws_id_obj:
             continue
         
         # Get workspace document
-        ws_doc = db.execute_query("workspaces", "find_one", {"_id": ws_id_obj})
+        ws_doc = workspaces_by_id.get(ws_id_obj)
         if not ws_doc:
             continue
         
@@ -182,21 +285,25 @@ def _resolve_user_primary_workspace(db, user_email):
         if not org_id:
             continue
         
-        workspace_data = {
+        workspaces.append({
             "workspace_id": str(ws_id_obj),
             "organization_id": str(org_id),
             "workspace_name": ws_doc.get("name", "Unknown"),
-            "role": role_name,
+            "role": ws_info.get("role_name", ""),
             "status": ws_doc.get("status", "Unknown")
-        }
-        
-        all_workspaces.append(workspace_data)
-        
-        if role_name == "OWNER":
-            owner_workspaces.append(workspace_data)
-        
-        if ws_doc.get("status") == "ACTIVE":
-            active_workspaces.append(workspace_data)
+        })
+    
+    return workspaces
+
+
+def _resolve_user_primary_workspace(loader, user_email):
+    """Get user's primary workspace (preference: OWNER > first active > first any)"""
+    all_workspaces = _user_workspaces(loader, user_email)
+    if isinstance(all_workspaces, dict):
+        return all_workspaces
+    
+    owner_workspaces = [ws for ws in all_workspaces if ws["role"] == "OWNER"]
+    active_workspaces = [ws for ws in all_workspaces if ws["status"] == "ACTIVE"]
     
     if not all_workspaces:
         return {"error": f"No valid workspaces found for user: {user_email}"}
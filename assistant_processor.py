@@ -6,8 +6,10 @@ Handles admin notes that start with the configured assistant name and performs A
 import re
 import config
 import openai_utils
+from token_budget import pack_newest_first, elision_marker
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 # Add worker directory to path for intercom_api import
 sys.path.append(os.path.join(os.path.dirname(__file__), 'worker'))
@@ -16,6 +18,13 @@ from intercom_api import intercom_api
 # Import function library
 from assistant_functions import get_functions_documentation, execute_function
 from reasoning_engine import reasoning_engine
+from playbooks import get_playbook, list_playbooks
+
+# "playbook <name> [question]" runs a predefined playbook instead of open-ended reasoning
+PLAYBOOK_COMMAND_PATTERN = re.compile(r'^playbook\s+(\w+)[\s:,-]*(.*)$', re.IGNORECASE | re.DOTALL)
+
+# Background pool for account data prefetched while the command is prepared
+_prefetch_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="katie-prefetch")
 
 
 class AssistantProcessor:
@@ -44,20 +53,36 @@ class AssistantProcessor:
             if not command:
                 return f"Hi! I'm {self.assistant_name.title()}, your AI assistant. What would you like me to help with?"
             
+            playbook_name, command = self._parse_playbook_command(command)
+            playbook = None
+            if playbook_name:
+                playbook = get_playbook(playbook_name.lower())
+                if not playbook:
+                    return f"Unknown playbook '{playbook_name}'. Available playbooks: {', '.join(list_playbooks())}"
+                print(f"DEBUG: Running playbook {playbook_name}")
+                command = command or playbook["description"]
+            
             # Get conversation context for better responses
             conversation_data = intercom_api.get_conversation(conversation_id)
             context = ""
             user_email = None
             
+            prefetched = []
+            
             if conversation_data:
-                history = intercom_api.extract_conversation_history(conversation_data, limit_messages=10)
-                context = self._format_conversation_context(history)
-                
                 # Extract user email from conversation
                 user_email = self._extract_user_email(conversation_data)
+                
+                # The first tool call is almost always check_user_plan - start it now
+                # (playbooks gather their own data)
+                if not playbook:
+                    prefetched = self._prefetch_account_data(user_email)
+                
+                history = intercom_api.extract_conversation_history(conversation_data, limit_messages=10)
+                context = self._format_conversation_context(history)
             
             # Generate AI response based on the command and context
-            response = self._generate_assistant_response(command, context, conversation_id, user_email)
+            response = self._generate_assistant_response(command, context, conversation_id, user_email, prefetched, playbook)
             
             return response
             
@@ -65,6 +90,23 @@ class AssistantProcessor:
             print(f"Error processing {self.assistant_name} command: {e}")
             return f"Sorry, I encountered an error processing your request: {str(e)}"
     
+    def _parse_playbook_command(self, command):
+        """Split "playbook <name> [question]" into (name, question); (None, command) for other commands"""
+        match = PLAYBOOK_COMMAND_PATTERN.match(command)
+        if not match:
+            return None, command
+        return match.group(1), match.group(2).strip()
+    
+    def _prefetch_account_data(self, user_email):
+        """Start check_user_plan in the background (its result also lands in the function cache)"""
+        if not user_email or not config.KATIE_PREFETCH_USER_PLAN:
+            return []
+        
+        params = {"user_email": user_email}
+        print(f"DEBUG: Prefetching check_user_plan for {user_email}")
+        future = _prefetch_executor.submit(execute_function, "check_user_plan", **params)
+        return [("check_user_plan", params, future)]
+    
     def _format_conversation_context(self, history):
         """Format conversation history for AI context"""
         if not history:
@@ -73,8 +115,16 @@ class AssistantProcessor:
         context_lines = []
         for msg in history[-5:]:  # Last 5 messages for context
             role = msg['role'].upper()
-            message = msg['message'][:200] + "..." if len(msg['message']) > 200 else msg['message']
-            context_lines.append(f"{role}: {message}")
+            context_lines.append(f"{role}: {msg['message']}")
+        
+        # Pack newest messages first within the token budget instead of cutting each at 200 chars
+        context_lines, omitted = pack_newest_first(
+            context_lines,
+            config.TOKEN_BUDGETS["katie"],
+            config.MAX_MESSAGE_TOKENS
+        )
+        if omitted:
+            context_lines.insert(0, elision_marker(omitted))
         
         return "\n".join(context_lines)
     
@@ -106,8 +156,8 @@ class AssistantProcessor:
             print(f"Error extracting user email: {e}")
             return None
     
-    def _generate_assistant_response(self, command, context, conversation_id, user_email=None):
-        """Generate AI response using shared reasoning engine"""
+    def _generate_assistant_response(self, command, context, conversation_id, user_email=None, prefetched=None, playbook=None):
+        """Generate AI response using shared reasoning engine (playbook mode when a playbook was selected)"""
         
         # Prepare context data for reasoning engine
         context_data = {
@@ -116,12 +166,14 @@ class AssistantProcessor:
             "conversation_context": context
         }
         
-        # Use shared reasoning engine in self-thinking mode
+        # Use shared reasoning engine: the selected playbook, otherwise self-thinking mode
         result = reasoning_engine.execute_reasoning(
             query=command,
             context_data=context_data,
-            mode="self_thinking",
-            max_iterations=5
+            playbook=playbook,
+            mode="playbook" if playbook else "self_thinking",
+            max_iterations=5,
+            prefetched=prefetched
         )
         
         return result.get("answer", "I couldn't complete the reasoning process.")
@@ -14,6 +14,9 @@ DELAY_MAX_SECONDS = 50      # maximum delay after the LAST user message
 INTERCOM_ACCESS_TOKEN = os.getenv('INTERCOM_TOKEN')
 INTERCOM_WEBHOOK_SECRET = os.getenv('INTERCOM_WEBHOOK_SECRET')
 
+# /metrics on the webhook server: requests must send this in the X-Metrics-Token header (unset = endpoint disabled)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
 # Azure OpenAI
 AZURE_OPENAI_ENDPOINT = os.getenv('AZURE_OPENAI_ENDPOINT')
 AZURE_OPENAI_KEY = os.getenv('AZURE_OPENAI_KEY')
@@ -26,10 +29,90 @@ NORMAL = 'gpt-5-chat'
 FAST = 'gpt4omini'
 NANO = 'gpt-5-nano'
 
+# Step 0 model cascade: ask the cheap model first, escalate to DEFAULT_MODEL on low confidence
+CATEGORIZATION_CASCADE = os.getenv('CATEGORIZATION_CASCADE', 'True') == 'True'
+CATEGORIZATION_CHEAP_MODEL = os.getenv('CATEGORIZATION_CHEAP_MODEL', FAST)
+
+# Prompt token budgets for the conversation history portion of each prompt
+TOKEN_BUDGETS = {
+    "step0": 2000,
+    "step1": 2000,
+    "katie": 600
+}
+MAX_MESSAGE_TOKENS = 500  # cap for any single message (pasted logs, long emails)
+
+# Katie reasoning engine
+KATIE_NATIVE_TOOLS = os.getenv('KATIE_NATIVE_TOOLS', 'True') == 'True'  # chat completions tool calling instead of FUNCTION_CALL text
+KATIE_MAX_PARALLEL_FUNCTIONS = int(os.getenv('KATIE_MAX_PARALLEL_FUNCTIONS', 4))
+KATIE_GOAL_CHECKS = os.getenv('KATIE_GOAL_CHECKS', 'False') == 'True'  # separate goal extraction/completion calls on FAST
+KATIE_RESULT_MAX_TOKENS = 800             # cap for one function result in the reasoning context
+KATIE_RESULT_MAX_LIST_ITEMS = 10          # default list truncation for function results
+KATIE_EXPANDED_RESULT_MAX_TOKENS = 3000   # cap for expand_result (full payload by reference)
+KATIE_CONTEXT_COMPACTION = os.getenv('KATIE_CONTEXT_COMPACTION', 'True') == 'True'  # summarize results once consumed
+KATIE_COMPACT_MIN_TOKENS = 150            # smaller results stay verbatim
+KATIE_PREFETCH_USER_PLAN = os.getenv('KATIE_PREFETCH_USER_PLAN', 'True') == 'True'  # start check_user_plan when a command arrives
+KATIE_PREFETCH_WAIT_SECONDS = 0.15        # grace period for the prefetch before the first reasoning call (unfinished ones aren't waited for)
+
+# Rolling conversation summaries for long threads
+CONVERSATION_SUMMARY_ENABLED = os.getenv('CONVERSATION_SUMMARY_ENABLED', 'True') == 'True'
+SUMMARY_MIN_MESSAGES = 10           # only summarize threads longer than this
+SUMMARY_KEEP_RECENT_MESSAGES = 6    # always sent verbatim
+SUMMARY_MODEL = FAST
+
+# Reply engine
+SPECULATIVE_FAQ_MATCH = os.getenv('SPECULATIVE_FAQ_MATCH', 'True') == 'True'  # run step 1 in parallel with step 0
+
 # MongoDB
 DASHBOARD_DB_URI = os.getenv('DASHBOARD_DB_URI')
 APP_DB_URI = os.getenv('APP_DB_URI')
 
+# MongoDB connection pools (shared per process) and query limits
+MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', 20))
+MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', 0))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv('MONGO_MAX_IDLE_TIME_MS', 60000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000))
+MONGO_MAX_TIME_MS = int(os.getenv('MONGO_MAX_TIME_MS', 10000))  # default server-side limit for assistant queries
+MONGO_BATCH_SIZE = int(os.getenv('MONGO_BATCH_SIZE', 100))
+MONGO_DEFAULT_LIMIT = int(os.getenv('MONGO_DEFAULT_LIMIT', 1000))  # applied to assistant find/aggregate without a limit
+MONGO_MAX_RESULT_BYTES = int(os.getenv('MONGO_MAX_RESULT_BYTES', 5 * 1024 * 1024))  # stop reading a result past this size
+MONGO_REQUIRE_PROJECTION = os.getenv('MONGO_REQUIRE_PROJECTION', 'False') == 'True'  # reject unprojected reads (logged otherwise)
+
+# Production app DB reads (assistant functions): prefer secondaries so support lookups stay off the primary
+MONGO_APP_READ_PREFERENCE = os.getenv('MONGO_APP_READ_PREFERENCE', 'secondaryPreferred')
+MONGO_APP_MAX_STALENESS_SECONDS = int(os.getenv('MONGO_APP_MAX_STALENESS_SECONDS', 120))  # -1 = no limit, else >= 90
+
+# Command monitoring for every MongoClient (latency histograms, slow commands - see mongo_monitoring.py)
+MONGO_COMMAND_MONITORING = os.getenv('MONGO_COMMAND_MONITORING', 'True') == 'True'
+MONGO_SLOW_QUERY_MS = int(os.getenv('MONGO_SLOW_QUERY_MS', 500))
+MONGO_SLOW_QUERY_LOG = os.getenv('MONGO_SLOW_QUERY_LOG', 'False') == 'True'  # also print each slow command
+MONGO_SLOW_COMMANDS_KEPT = 50  # recent slow commands shown by /metrics and the worker's metrics dump
+WORKER_METRICS_DUMP_SECONDS = int(os.getenv('WORKER_METRICS_DUMP_SECONDS', 300))  # worker prints its metrics at least this often
+
+# Reference-data caches (plans / organizations) for assistant functions
+REFERENCE_CACHE_WARMUP = os.getenv('REFERENCE_CACHE_WARMUP', 'True') == 'True'  # load plans when a server process starts (organizations fill on demand)
+PLANS_CACHE_TTL_SECONDS = int(os.getenv('PLANS_CACHE_TTL_SECONDS', 3600))
+PLANS_CACHE_MAX_SIZE = int(os.getenv('PLANS_CACHE_MAX_SIZE', 1000))
+ORGANIZATIONS_CACHE_TTL_SECONDS = int(os.getenv('ORGANIZATIONS_CACHE_TTL_SECONDS', 300))  # plan changes show up within 5 min
+ORGANIZATIONS_CACHE_MAX_SIZE = int(os.getenv('ORGANIZATIONS_CACHE_MAX_SIZE', 20000))
+
+# Assistant function result cache (functions opt in with a cache_policy)
+FUNCTION_CACHE_DEFAULT_TTL_SECONDS = int(os.getenv('FUNCTION_CACHE_DEFAULT_TTL_SECONDS', 120))
+FUNCTION_CACHE_MAX_SIZE = int(os.getenv('FUNCTION_CACHE_MAX_SIZE', 500))
+FUNCTION_CACHE_INFLIGHT_WAIT_SECONDS = 15  # max wait when joining an identical running call
+
+# Materialized account snapshots in the dashboard DB (see assistant_functions/account_snapshot.py)
+ACCOUNT_SNAPSHOT_ENABLED = os.getenv('ACCOUNT_SNAPSHOT_ENABLED', 'True') == 'True'
+ACCOUNT_SNAPSHOT_COLLECTION = os.getenv('ACCOUNT_SNAPSHOT_COLLECTION', 'account_snapshots')
+ACCOUNT_SNAPSHOT_MAX_AGE_SECONDS = int(os.getenv('ACCOUNT_SNAPSHOT_MAX_AGE_SECONDS', 900))  # without a running refresher, older snapshots are rebuilt live
+ACCOUNT_SNAPSHOT_READ_THROUGH_MAX_AGE_SECONDS = int(os.getenv('ACCOUNT_SNAPSHOT_READ_THROUGH_MAX_AGE_SECONDS', 120))  # snapshots written on read (secondary + cached reference data)
+ACCOUNT_SNAPSHOT_REFRESHER_HEALTHY_SECONDS = int(os.getenv('ACCOUNT_SNAPSHOT_REFRESHER_HEALTHY_SECONDS', 180))  # refresher counts as running if it reported within this
+ACCOUNT_SNAPSHOT_STATE_CACHE_SECONDS = 15  # how long readers reuse the refresher state
+ACCOUNT_SNAPSHOT_DELTA_INTERVAL_SECONDS = int(os.getenv('ACCOUNT_SNAPSHOT_DELTA_INTERVAL_SECONDS', 60))
+ACCOUNT_SNAPSHOT_DELETE_SWEEP_INTERVAL_SECONDS = int(os.getenv('ACCOUNT_SNAPSHOT_DELETE_SWEEP_INTERVAL_SECONDS', 6 * 3600))  # delta mode: drop snapshots of deleted users
+ACCOUNT_SNAPSHOT_DELTA_FIELD = os.getenv('ACCOUNT_SNAPSHOT_DELTA_FIELD', 'modified_at')  # app DB last-modified field
+ACCOUNT_SNAPSHOT_QUERY_MAX_TIME_MS = int(os.getenv('ACCOUNT_SNAPSHOT_QUERY_MAX_TIME_MS', 60000))
+ACCOUNT_SNAPSHOT_APP_READ_PREFERENCE = os.getenv('ACCOUNT_SNAPSHOT_APP_READ_PREFERENCE', 'primary')  # refresher reads must not lag the changes it applies
+
 # Flask
 FLASK_PORT = int(os.getenv('PORT', 5003))
 FLASK_DEBUG = os.getenv('FLASK_DEBUG', 'False') == 'True'
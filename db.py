@@ -1,9 +1,10 @@
 from pymongo import MongoClient
 from datetime import datetime, timezone
 import config
+from mongo_monitoring import command_listeners
 
-# MongoDB client setup
-mongo_client = MongoClient(config.DASHBOARD_DB_URI)
+# MongoDB client setup (command latencies recorded under mongo.dashboard.*)
+mongo_client = MongoClient(config.DASHBOARD_DB_URI, event_listeners=command_listeners("dashboard"))
 db = mongo_client.get_default_database()
 
 # Collections
@@ -80,6 +81,28 @@ def mark_bot_replied(conversation_id):
         }
     )
 
+def update_conversation_summary(conversation_id, summary_text, covered_until_ts, covered_messages, model):
+    """Store the rolling conversation summary (covers messages up to covered_until_ts)"""
+    return intercom_conversations.update_one(
+        {"conversation_id": conversation_id},
+        {
+            "$set": {
+                "summary.text": summary_text,
+                "summary.covered_until_ts": covered_until_ts,
+                "summary.covered_messages": covered_messages,
+                "summary.model": model,
+                "summary.updated_at": utc_now()
+            }
+        }
+    )
+
+def add_summary_tokens_saved(conversation_id, tokens_saved):
+    """Accumulate prompt tokens saved by using the summary instead of the full thread"""
+    return intercom_conversations.update_one(
+        {"conversation_id": conversation_id},
+        {"$inc": {"summary.tokens_saved": tokens_saved}}
+    )
+
 def get_pending_conversations(delay_seconds):
     """Get conversations that need bot replies"""
     from datetime import timedelta
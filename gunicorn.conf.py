@@ -0,0 +1,9 @@
+"""
+Gunicorn hooks (loaded automatically when gunicorn starts from this directory, see start.sh)
+"""
+
+
+def post_worker_init(worker):
+    """Per-worker startup work that must not run on import (or before the fork)"""
+    from app import start_reference_cache_warmup
+    start_reference_cache_warmup()
@@ -0,0 +1,112 @@
+"""
+In-process metrics
+Thread-safe counters and latency observations shared by the worker, webhook server and Katie
+"""
+
+import threading
+
+# Histogram bucket upper bounds, per unit (observe() defaults to latency)
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+TOKEN_BUCKETS = [50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000]
+BYTE_BUCKETS = [1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216]
+
+_lock = threading.Lock()
+_counters = {}
+_observations = {}
+
+
+def increment(name, value=1):
+    """Increment a named counter"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def observe(name, value, buckets=LATENCY_BUCKETS_MS):
+    """
+    Record a numeric observation
+
+    Args:
+        buckets: Histogram upper bounds in the value's unit - LATENCY_BUCKETS_MS (default),
+            TOKEN_BUCKETS, BYTE_BUCKETS, or None for count/total/min/max only.
+            A metric keeps the buckets of its first observation.
+    """
+    with _lock:
+        stats = _observations.get(name)
+        if stats is None:
+            stats = {
+                "count": 0,
+                "total": 0.0,
+                "min": value,
+                "max": value,
+                "bounds": buckets,
+                "buckets": [0] * (len(buckets) + 1) if buckets else None
+            }
+            _observations[name] = stats
+
+        stats["count"] += 1
+        stats["total"] += value
+        stats["min"] = min(stats["min"], value)
+        stats["max"] = max(stats["max"], value)
+
+        if stats["bounds"]:
+            for i, upper in enumerate(stats["bounds"]):
+                if value <= upper:
+                    stats["buckets"][i] += 1
+                    break
+            else:
+                stats["buckets"][-1] += 1
+
+
+def get_counter(name):
+    """Get the current value of a counter"""
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def snapshot():
+    """Get a copy of all counters and observation summaries"""
+    with _lock:
+        observations = {}
+        for name, stats in _observations.items():
+            observations[name] = {
+                "count": stats["count"],
+                "avg": round(stats["total"] / stats["count"], 2) if stats["count"] else 0,
+                "min": stats["min"],
+                "max": stats["max"],
+                "total": round(stats["total"], 2)
+            }
+            if stats["bounds"]:
+                observations[name]["buckets"] = {
+                    (f"le_{upper}" if upper is not None else "inf"): stats["buckets"][i]
+                    for i, upper in enumerate(stats["bounds"] + [None])
+                }
+
+        return {
+            "counters": dict(_counters),
+            "observations": observations
+        }
+
+
+def format_snapshot():
+    """Format the current metrics as log lines (histograms show their non-empty buckets)"""
+    data = snapshot()
+    lines = []
+
+    for name, value in sorted(data["counters"].items()):
+        lines.append(f"  {name}: {value}")
+
+    for name, stats in sorted(data["observations"].items()):
+        line = f"  {name}: count={stats['count']} avg={stats['avg']} min={stats['min']} max={stats['max']}"
+        buckets = [f"{bucket}={count}" for bucket, count in stats.get("buckets", {}).items() if count]
+        if buckets:
+            line += f" [{' '.join(buckets)}]"
+        lines.append(line)
+
+    return "\n".join(lines)
+
+
+def reset():
+    """Clear all metrics (used by tests and benchmarks)"""
+    with _lock:
+        _counters.clear()
+        _observations.clear()
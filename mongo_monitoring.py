@@ -0,0 +1,143 @@
+"""
+MongoDB command monitoring
+pymongo CommandListener recording per-command and per-collection latency histograms,
+and flagging slow commands with the shape of their filter
+"""
+
+import threading
+from collections import deque
+from datetime import datetime, timezone
+
+from pymongo import monitoring
+
+import config
+import metrics
+
+# Driver housekeeping commands - not worth a histogram
+IGNORED_COMMANDS = {
+    "hello", "isMaster", "ismaster", "ping", "buildInfo", "buildinfo", "endSessions",
+    "saslStart", "saslContinue", "authenticate", "getnonce", "killCursors"
+}
+
+# Most recent slow commands, newest last (exposed by /metrics)
+_slow_commands = deque(maxlen=config.MONGO_SLOW_COMMANDS_KEPT)
+_slow_lock = threading.Lock()
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """Latency histograms per command name and per collection, plus slow command flags"""
+
+    def __init__(self, client_name, slow_ms=None):
+        self.client_name = client_name
+        self.slow_ms = slow_ms or config.MONGO_SLOW_QUERY_MS
+
+        # In-flight commands: (connection, request_id) -> (collection, command document)
+        self._started = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        with self._lock:
+            self._started[(event.connection_id, event.request_id)] = (
+                _collection_name(event.command_name, event.command),
+                event.command
+            )
+
+    def succeeded(self, event):
+        self._finished(event, "ok")
+
+    def failed(self, event):
+        self._finished(event, "failed")
+
+    def _finished(self, event, outcome):
+        with self._lock:
+            started = self._started.pop((event.connection_id, event.request_id), None)
+        if started is None:
+            return
+
+        collection, command = started
+        duration_ms = event.duration_micros / 1000
+        prefix = f"mongo.{self.client_name}"
+
+        metrics.observe(f"{prefix}.command.{event.command_name}.latency_ms", duration_ms)
+        if collection:
+            metrics.observe(f"{prefix}.collection.{collection}.latency_ms", duration_ms)
+        if outcome == "failed":
+            metrics.increment(f"{prefix}.command.{event.command_name}.failed")
+
+        if duration_ms < self.slow_ms:
+            return
+
+        shape = command_shape(command)
+        metrics.increment(f"{prefix}.slow_commands")
+        if collection:
+            metrics.increment(f"{prefix}.collection.{collection}.slow_commands")
+
+        with _slow_lock:
+            _slow_commands.append({
+                "client": self.client_name,
+                "command": event.command_name,
+                "collection": collection,
+                "duration_ms": round(duration_ms, 1),
+                "outcome": outcome,
+                "shape": shape,
+                "at": datetime.now(timezone.utc).isoformat()
+            })
+
+        if config.MONGO_SLOW_QUERY_LOG:
+            print(f"SLOW MONGO [{self.client_name}] {event.command_name} on {collection or '-'} "
+                  f"took {duration_ms:.0f}ms ({outcome}): {shape or '-'}")
+
+
+def command_listeners(client_name):
+    """event_listeners for a MongoClient (empty when monitoring is off)"""
+    if not config.MONGO_COMMAND_MONITORING:
+        return []
+    return [CommandMetricsListener(client_name)]
+
+
+def recent_slow_commands():
+    """Copy of the most recent slow commands, newest first"""
+    with _slow_lock:
+        return list(reversed(_slow_commands))
+
+
+def format_slow_commands():
+    """Format the recent slow commands as log lines, newest first"""
+    return "\n".join(
+        f"  [{slow['client']}] {slow['command']} on {slow['collection'] or '-'} "
+        f"{slow['duration_ms']}ms ({slow['outcome']}) at {slow['at']}: {slow['shape'] or '-'}"
+        for slow in recent_slow_commands()
+    )
+
+
+def command_shape(command):
+    """The filter/pipeline/sort of a command with every value replaced by its type"""
+    shape = {}
+    for key in ("filter", "query", "pipeline", "sort", "q"):
+        if key in command:
+            shape[key] = _shape(command[key])
+    for key in ("updates", "deletes"):
+        if key in command:
+            shape[key] = [_shape(statement.get("q")) for statement in command[key][:1]]
+    return shape
+
+
+def _collection_name(command_name, command):
+    """Collection a command targets (getMore names it separately; None for database commands)"""
+    if command_name == "getMore":
+        return command.get("collection")
+    value = command.get(command_name)
+    return value if isinstance(value, str) else None
+
+
+def _shape(value):
+    """Keep keys and operators, replace values with type names ($in lists with their length)"""
+    if isinstance(value, dict):
+        return {key: _shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if value and all(isinstance(item, dict) for item in value):
+            return [_shape(item) for item in value]
+        return f"[{len(value)}]"
+    return type(value).__name__
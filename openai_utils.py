@@ -4,6 +4,7 @@ OpenAI utility functions with retry logic
 
 import openai
 import config
+import metrics
 import time
 import random
 
@@ -14,7 +15,7 @@ openai_client = openai.AzureOpenAI(
     azure_endpoint=config.AZURE_OPENAI_ENDPOINT
 )
 
-def call_openai_with_retry(messages, max_completion_tokens=300, temperature=0.7, response_format=None, max_retries=3, model=None):
+def call_openai_with_retry(messages, max_completion_tokens=300, temperature=0.7, response_format=None, max_retries=3, model=None, label=None, tools=None, tool_choice=None):
     """
     Call OpenAI API with retry logic
     
@@ -25,6 +26,9 @@ def call_openai_with_retry(messages, max_completion_tokens=300, temperature=0.7,
         response_format: Optional response format (e.g., {"type": "json_object"})
         max_retries: Maximum number of retry attempts
         model: Model to use (defaults to config.DEFAULT_MODEL)
+        label: Metric label for usage accounting (e.g. "step0", "katie")
+        tools: Optional function tool definitions (chat completions `tools`)
+        tool_choice: Optional tool choice ("auto", "required", "none" or a specific function)
     
     Returns:
         OpenAI response object or None if all retries failed
@@ -53,10 +57,19 @@ def call_openai_with_retry(messages, max_completion_tokens=300, temperature=0.7,
             if response_format:
                 api_params["response_format"] = response_format
             
+            # Add native tool calling if specified
+            if tools:
+                api_params["tools"] = tools
+                if tool_choice:
+                    api_params["tool_choice"] = tool_choice
+            
             # Make the API call
+            start_time = time.time()
             response = openai_client.chat.completions.create(**api_params)
+            latency_ms = (time.time() - start_time) * 1000
             
             print(f"DEBUG: OpenAI API call successful on attempt {attempt + 1}")
+            _record_usage(label or "unlabeled", selected_model, response, latency_ms)
             return response
             
         except openai.RateLimitError as e:
@@ -111,4 +124,30 @@ def call_openai_with_retry(messages, max_completion_tokens=300, temperature=0.7,
                 print(f"ERROR: Unexpected error after {max_retries} attempts")
                 return None
     
-    return None 
\ No newline at end of file
+    return None
+
+
+def _record_usage(label, model, response, latency_ms):
+    """Record latency and token usage (including prompt cache hits) for a call"""
+    try:
+        metrics.increment(f"openai.{label}.calls")
+        metrics.observe(f"openai.{label}.latency_ms", latency_ms)
+        
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = (getattr(details, "cached_tokens", 0) or 0) if details else 0
+        
+        metrics.observe(f"openai.{label}.prompt_tokens", prompt_tokens, buckets=metrics.TOKEN_BUCKETS)
+        metrics.observe(f"openai.{label}.completion_tokens", completion_tokens, buckets=metrics.TOKEN_BUCKETS)
+        metrics.observe(f"openai.{label}.cached_tokens", cached_tokens, buckets=metrics.TOKEN_BUCKETS)
+        if cached_tokens:
+            metrics.increment(f"openai.{label}.cache_hits")
+        
+        print(f"DEBUG: OpenAI usage [{label}/{model}] - prompt: {prompt_tokens} (cached: {cached_tokens}), completion: {completion_tokens}, latency: {latency_ms:.0f}ms")
+    except Exception as e:
+        print(f"Error recording OpenAI usage: {e}")
@@ -0,0 +1,117 @@
+"""
+Playbook Executor
+Runs a playbook's declared data-gathering steps without the LLM, in dependency waves
+"""
+
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+import metrics
+from assistant_functions import execute_function, IdentityLoader
+
+# Placeholders in step params: "{context.user_email}", "{steps.plan.workspaces.0.workspace_id}"
+PLACEHOLDER_PATTERN = re.compile(r'^\{([\w.]+)\}$')
+
+# Pool for running independent data steps concurrently
+_step_executor = ThreadPoolExecutor(
+    max_workers=config.KATIE_MAX_PARALLEL_FUNCTIONS,
+    thread_name_prefix="playbook-steps"
+)
+
+
+def run_data_steps(data_steps, context_data=None, loader=None):
+    """
+    Execute playbook data steps; steps whose dependencies are done run in parallel
+
+    Args:
+        data_steps: [{"id", "function", "params", "depends_on"}]
+        context_data: Values for {context.*} placeholders (user_email, ...)
+        loader: Request-scoped IdentityLoader shared by all steps
+
+    Returns:
+        {step_id: result} - skipped steps get {"error": ...}
+    """
+    loader = loader or IdentityLoader()
+    context_data = context_data or {}
+    results = {}
+    pending = list(data_steps)
+    wave = 0
+
+    start_time = time.time()
+
+    while pending:
+        ready = [step for step in pending if all(dep in results for dep in step.get("depends_on", []))]
+        if not ready:
+            # Unknown or circular dependencies - report instead of looping forever
+            for step in pending:
+                results[step["id"]] = {"error": f"Unresolved dependencies: {step.get('depends_on')}"}
+            break
+
+        wave += 1
+        print(f"DEBUG: Playbook wave {wave}: {[step['id'] for step in ready]}")
+
+        futures = {
+            step["id"]: _step_executor.submit(_run_step, step, context_data, results, loader)
+            for step in ready
+        }
+        for step_id, future in futures.items():
+            results[step_id] = future.result()
+
+        pending = [step for step in pending if step["id"] not in results]
+
+    elapsed_ms = (time.time() - start_time) * 1000
+    metrics.observe("playbook.data_steps_ms", elapsed_ms)
+    print(f"DEBUG: Playbook data steps done in {elapsed_ms:.0f}ms ({len(results)} steps, {wave} waves)")
+
+    return results
+
+
+def _run_step(step, context_data, results, loader):
+    """Resolve a step's params and execute its function"""
+    failed_deps = [dep for dep in step.get("depends_on", []) if "error" in (results.get(dep) or {})]
+    if failed_deps:
+        return {"error": f"Skipped - dependency failed: {', '.join(failed_deps)}"}
+
+    params = {}
+    for name, value in step.get("params", {}).items():
+        resolved = _resolve_value(value, context_data, results)
+        if resolved is not None:
+            params[name] = resolved
+
+    try:
+        print(f"DEBUG: Playbook step {step['id']}: {step['function']}({params})")
+        step_start = time.time()
+        result = execute_function(step["function"], loader=loader, **params)
+        metrics.observe(f"playbook.step.{step['function']}.latency_ms", (time.time() - step_start) * 1000)
+        return result
+    except Exception as e:
+        print(f"Error in playbook step {step['id']}: {e}")
+        return {"error": str(e)}
+
+
+def _resolve_value(value, context_data, results):
+    """Replace a "{context.x}" / "{steps.id.path}" placeholder with its value (None if missing)"""
+    if not isinstance(value, str):
+        return value
+
+    match = PLACEHOLDER_PATTERN.match(value)
+    if not match:
+        return value
+
+    source, *path = match.group(1).split(".")
+    if source == "context":
+        current = context_data
+    elif source == "steps":
+        current = results
+    else:
+        return value
+
+    for part in path:
+        try:
+            current = current[int(part)] if isinstance(current, list) else current[part]
+        except (KeyError, IndexError, ValueError, TypeError):
+            return None
+
+    return current
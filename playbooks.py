@@ -1,6 +1,10 @@
 """
 Playbook Definitions
 Predefined step-by-step guides for common troubleshooting scenarios
+
+Playbooks with "data_steps" gather their data without the LLM (see playbook_executor):
+each step is a function call whose params may reference the context ("{context.user_email}")
+or an earlier step's result ("{steps.campaign_health.workspace_info.workspace_id}", listed in depends_on).
 """
 
 # Campaign diagnosis playbook
@@ -15,6 +19,23 @@ CAMPAIGN_DIAGNOSIS_PLAYBOOK = {
         "Check for rate limiting or delivery issues",
         "Examine recent error logs and bounce rates",
         "Identify specific bottleneck or failure point"
+    ],
+    "data_steps": [
+        {
+            "id": "plan",
+            "function": "check_user_plan",
+            "params": {"user_email": "{context.user_email}"}
+        },
+        {
+            "id": "campaign_health",
+            "function": "get_campaign_health",
+            "params": {"user_email": "{context.user_email}"}
+        },
+        {
+            "id": "account_health",
+            "function": "check_account_health",
+            "params": {"user_email": "{context.user_email}"}
+        }
     ]
 }
 
@@ -28,6 +49,13 @@ USER_PLAN_DIAGNOSIS_PLAYBOOK = {
         "Verify plan limits and current usage",
         "Check billing and subscription status",
         "Identify specific access limitation or issue"
+    ],
+    "data_steps": [
+        {
+            "id": "plan",
+            "function": "check_user_plan",
+            "params": {"user_email": "{context.user_email}"}
+        }
     ]
 }
 
@@ -42,6 +70,23 @@ EMAIL_HEALTH_PLAYBOOK = {
         "Check sending limits and current usage",
         "Verify SMTP/IMAP connection health",
         "Identify accounts needing attention"
+    ],
+    "data_steps": [
+        {
+            "id": "plan",
+            "function": "check_user_plan",
+            "params": {"user_email": "{context.user_email}"}
+        },
+        {
+            "id": "account_health",
+            "function": "check_account_health",
+            "params": {"user_email": "{context.user_email}"}
+        },
+        {
+            "id": "campaign_health",
+            "function": "get_campaign_health",
+            "params": {"user_email": "{context.user_email}"}
+        }
     ]
 }
 
@@ -3,9 +3,46 @@ Shared Reasoning Engine
 Supports both playbook-driven and self-thinking step-by-step reasoning
 """
 
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
 import openai_utils
 import config
-from assistant_functions import get_functions_documentation, execute_function
+import metrics
+from assistant_functions import execute_function_traced, get_functions_prompt, get_tool_schemas, get_registry, IdentityLoader
+from assistant_functions.result_serializer import (
+    ResultStore, serialize_result, summarize_result, to_json, EXPAND_RESULT_TOOL, EXPAND_RESULT_TOOL_NAME
+)
+from token_budget import count_tokens
+from playbook_executor import run_data_steps
+
+# Pool for running several function calls from one model turn concurrently
+_function_executor = ThreadPoolExecutor(
+    max_workers=config.KATIE_MAX_PARALLEL_FUNCTIONS,
+    thread_name_prefix="katie-functions"
+)
+
+# Serialized function results start with their result-store ref
+RESULT_REF_PATTERN = re.compile(r'^\{"_ref":"(r\d+)"')
+
+# Completion tool for native tool calling: the main model ends the session itself
+FINAL_ANSWER_TOOL_NAME = "final_answer"
+FINAL_ANSWER_TOOL = {
+    "type": "function",
+    "function": {
+        "name": FINAL_ANSWER_TOOL_NAME,
+        "description": "Finish the task: return the complete answer for the user once you have everything you need",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "answer": {"type": "string", "description": "The complete final answer"}
+            },
+            "required": ["answer"]
+        }
+    }
+}
 
 
 class ReasoningEngine:
@@ -13,14 +50,15 @@ class ReasoningEngine:
     
     def __init__(self, assistant_name="Assistant"):
         self.assistant_name = assistant_name
-        self.functions_doc = get_functions_documentation()
     
     def execute_reasoning(self, 
                          query, 
                          context_data=None,
                          playbook=None, 
                          max_iterations=5,
-                         mode="self_thinking"):
+                         mode="self_thinking",
+                         goal_checks=None,
+                         prefetched=None):
         """
         Execute reasoning process with explicit goal tracking
         
@@ -30,22 +68,43 @@ class ReasoningEngine:
             playbook: Optional predefined steps (for playbook mode)
             max_iterations: Max reasoning iterations
             mode: "playbook" or "self_thinking"
+            goal_checks: Extract a goal and check completion with separate FAST model calls
+                         (defaults to config.KATIE_GOAL_CHECKS; otherwise the main model signals completion)
+            prefetched: Function calls already started by the caller, as [(func_name, params, future)];
+                        finished ones are added to the context as completed calls (self-thinking mode)
         
         Returns:
-            Final answer and reasoning trace
+            Final answer, reasoning trace, token usage and elapsed time
         """
         
-        # Define explicit goal from the query
-        goal_definition = self._extract_goal_from_query(query)
+        start_time = time.time()
+        usage = {"llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "prompt_tokens_per_iteration": []}
+        
+        if goal_checks is None:
+            goal_checks = config.KATIE_GOAL_CHECKS
+        
+        # Define explicit goal from the query (None = the main model signals completion itself)
+        goal_definition = self._extract_goal_from_query(query, usage) if goal_checks else None
         
         if mode == "playbook" and playbook:
-            return self._execute_playbook_reasoning(query, context_data, playbook, max_iterations, goal_definition)
+            result = self._execute_playbook_reasoning(query, context_data, playbook, max_iterations, goal_definition, usage)
         else:
-            return self._execute_self_thinking_reasoning(query, context_data, max_iterations, goal_definition)
+            result = self._execute_self_thinking_reasoning(query, context_data, max_iterations, goal_definition, usage, prefetched)
+        
+        result["usage"] = usage
+        result["elapsed_ms"] = round((time.time() - start_time) * 1000)
+        metrics.observe("katie.session_ms", result["elapsed_ms"])
+        metrics.observe("katie.session_llm_calls", usage["llm_calls"], buckets=None)
+        print(f"DEBUG: Reasoning finished in {result['elapsed_ms']}ms - usage: {usage}")
+        return result
     
-    def _execute_playbook_reasoning(self, query, context_data, playbook, max_iterations, goal_definition):
+    def _execute_playbook_reasoning(self, query, context_data, playbook, max_iterations, goal_definition, usage):
         """Execute reasoning following a predefined playbook"""
         
+        # Declared data steps: gather everything up front, then one interpretation call
+        if isinstance(playbook, dict) and playbook.get("data_steps"):
+            return self._execute_deterministic_playbook(query, context_data, playbook, usage)
+        
         system_prompt = f"""You are {self.assistant_name}, following a step-by-step playbook to solve problems.
 
 PLAYBOOK STEPS:
@@ -58,6 +117,7 @@ INSTRUCTIONS:
 - Mark each step as COMPLETED when done
 - If a step reveals the problem, you can stop early
 - Provide clear reasoning for each step
+- {self._completion_rule(goal_definition)}
 
 AVAILABLE FUNCTIONS:
 {self._format_functions_for_ai()}
@@ -65,18 +125,75 @@ AVAILABLE FUNCTIONS:
 Context: {context_data or 'None'}
 """
         
-        return self._reasoning_loop(query, system_prompt, max_iterations, goal_definition, playbook_mode=True)
+        return self._reasoning_loop(query, system_prompt, max_iterations, goal_definition, usage, playbook_mode=True)
+    
+    def _execute_deterministic_playbook(self, query, context_data, playbook, usage):
+        """Run the playbook's data steps without the LLM, then interpret the gathered data in a single call"""
+        
+        data_steps = playbook["data_steps"]
+        step_results = run_data_steps(data_steps, context_data)
+        
+        result_store = ResultStore()
+        data_lines = [
+            f"{step['id']} ({step['function']}): "
+            f"{self._format_function_result(step['function'], step_results[step['id']], result_store)}"
+            for step in data_steps
+        ]
+        reasoning_trace = [f"Data step {line}" for line in data_lines]
+        
+        system_prompt = f"""You are {self.assistant_name}, diagnosing a support case with a playbook.
+
+PLAYBOOK: {playbook.get('name', '')}
+{self._format_playbook_steps(playbook)}
+
+INSTRUCTIONS:
+- The data for every step was already gathered - do not ask for more function calls
+- Work through the playbook steps using ONLY the gathered data
+- Give a concise diagnosis and the recommended next action
+- If the data can't answer a step, say what is missing
+
+Context: {context_data or 'None'}
+"""
+        
+        response_obj = openai_utils.call_openai_with_retry(
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": f"Task: {query}\n\nGATHERED DATA:\n" + "\n".join(data_lines)}
+            ],
+            max_completion_tokens=1000,
+            temperature=0.3,
+            label="katie_playbook"
+        )
+        prompt_tokens = self._add_usage(usage, response_obj)
+        usage["prompt_tokens_per_iteration"].append(prompt_tokens)
+        
+        if not response_obj or not response_obj.choices:
+            return {
+                "answer": "I'm having trouble connecting to the AI service.",
+                "reasoning_trace": reasoning_trace,
+                "success": False
+            }
+        
+        answer = response_obj.choices[0].message.content or ""
+        reasoning_trace.append(f"Interpretation: {answer}")
+        
+        return {
+            "answer": answer,
+            "reasoning_trace": reasoning_trace,
+            "success": True,
+            "iterations_used": 1
+        }
     
-    def _execute_self_thinking_reasoning(self, query, context_data, max_iterations, goal_definition):
+    def _execute_self_thinking_reasoning(self, query, context_data, max_iterations, goal_definition, usage, prefetched=None):
         """Execute reasoning where AI creates its own steps"""
         
         system_prompt = f"""You are {self.assistant_name}, solving problems step-by-step with immediate action.
 
 CRITICAL RULES:
-- When you need data, call functions IMMEDIATELY using: FUNCTION_CALL: function_name(param="value")
+- {self._function_call_rule()}
 - Don't just talk about calling functions - ACTUALLY CALL THEM
 - Be concise - take action, don't write essays
-- Stop when you have the answer
+- {self._completion_rule(goal_definition)}
 
 AVAILABLE FUNCTIONS:
 {self._format_functions_for_ai()}
@@ -85,17 +202,17 @@ Context: {context_data or 'None'}
 
 Example of CORRECT behavior:
 User: "What's the workspace ID?"
-You: "I'll check the user plan to get the workspace ID. FUNCTION_CALL: check_user_plan(user_email="user@example.com")"
+You: {self._function_call_example()}
 [After getting results]: "The workspace ID is 12345."
 
 Example of WRONG behavior:
 You: "STEP 1: I need to check the user plan. STEP 2: I will call the function..." (TOO VERBOSE - JUST DO IT!)
 """
         
-        return self._reasoning_loop(query, system_prompt, max_iterations, goal_definition, playbook_mode=False)
+        return self._reasoning_loop(query, system_prompt, max_iterations, goal_definition, usage, playbook_mode=False, prefetched=prefetched)
     
-    def _reasoning_loop(self, query, system_prompt, max_iterations, goal_definition, playbook_mode=False):
-        """Core reasoning loop with goal tracking"""
+    def _reasoning_loop(self, query, system_prompt, max_iterations, goal_definition, usage, playbook_mode=False, prefetched=None):
+        """Core reasoning loop with goal tracking (goal_definition None: the model's own final answer ends it)"""
         
         conversation_history = [
             {"role": "system", "content": system_prompt},
@@ -103,21 +220,57 @@ You: "STEP 1: I need to check the user plan. STEP 2: I will call the function...
         ]
         
         reasoning_trace = []
+        response = ""
+        
+        # Request-scoped cache: each user/workspace/org/plan is read at most once per command
+        loader = IdentityLoader()
+        
+        # Full function payloads - the context only gets compact JSON with a ref to these
+        result_store = ResultStore()
+        
+        # Calls started before reasoning (e.g. check_user_plan) skip their tool round trip
+        if prefetched:
+            self._add_prefetched_results(prefetched, conversation_history, result_store, reasoning_trace)
+        
+        # Native tool calling (FUNCTION_CALL text is still parsed as a fallback)
+        tools = get_tool_schemas() + [EXPAND_RESULT_TOOL] if config.KATIE_NATIVE_TOOLS else None
+        
+        # Without goal checks the model finishes by calling final_answer
+        use_final_answer_tool = tools is not None and goal_definition is None
+        if use_final_answer_tool:
+            tools = tools + [FINAL_ANSWER_TOOL]
+        
+        # Context compaction: results the model has already seen are replaced by summaries
+        seen_until = 0
+        compacted_indexes = set()
         
         try:
             for iteration in range(max_iterations):
                 print(f"DEBUG: Reasoning iteration {iteration + 1}/{max_iterations}")
                 
+                if config.KATIE_CONTEXT_COMPACTION:
+                    self._compact_consumed_results(conversation_history, seen_until, result_store, compacted_indexes)
+                seen_until = len(conversation_history)
+                
                 # Safety check - if we're on last iteration, force a conclusion
+                tool_choice = None
                 if iteration == max_iterations - 1:
                     print("DEBUG: Final iteration - forcing conclusion")
+                    if use_final_answer_tool:
+                        tool_choice = {"type": "function", "function": {"name": FINAL_ANSWER_TOOL_NAME}}
                 
                 # Call OpenAI
                 response_obj = openai_utils.call_openai_with_retry(
                     messages=conversation_history,
                     max_completion_tokens=1000,
-                    temperature=0.7
+                    temperature=0.7,
+                    label="katie",
+                    tools=tools,
+                    tool_choice=tool_choice
                 )
+                prompt_tokens = self._add_usage(usage, response_obj)
+                usage["prompt_tokens_per_iteration"].append(prompt_tokens)
+                metrics.observe(f"katie.prompt_tokens.iteration_{iteration + 1}", prompt_tokens, buckets=metrics.TOKEN_BUCKETS)
                 
                 if not response_obj or not response_obj.choices:
                     return {
@@ -126,39 +279,56 @@ You: "STEP 1: I need to check the user plan. STEP 2: I will call the function...
                         "success": False
                     }
                 
-                response = response_obj.choices[0].message.content
-                reasoning_trace.append(f"Iteration {iteration + 1}: {response}")
+                message = response_obj.choices[0].message
+                response = message.content or ""
+                tool_calls = getattr(message, "tool_calls", None) or []
+                
+                if tool_calls:
+                    called = ", ".join(call.function.name for call in tool_calls)
+                    reasoning_trace.append(f"Iteration {iteration + 1}: {response} [tool calls: {called}]")
+                else:
+                    reasoning_trace.append(f"Iteration {iteration + 1}: {response}")
                 
                 print(f"DEBUG: AI Response: {response[:200]}...")
                 
-                # Extract and execute function calls
+                final_call = next((call for call in tool_calls if call.function.name == FINAL_ANSWER_TOOL_NAME), None)
+                if final_call:
+                    final_args = self._parse_tool_arguments(final_call.function.arguments) or {}
+                    print(f"DEBUG: Final answer in iteration {iteration + 1}")
+                    return {
+                        "answer": final_args.get("answer") or response,
+                        "reasoning_trace": reasoning_trace,
+                        "success": True,
+                        "iterations_used": iteration + 1
+                    }
+                
+                if tool_calls:
+                    # Native tool calls - results go back as tool messages
+                    self._handle_tool_calls(message, tool_calls, conversation_history, loader, result_store, reasoning_trace)
+                    continue
+                
+                # Extract and execute function calls written as text
                 function_calls = self._extract_function_calls(response)
                 
                 if function_calls:
                     # Execute functions
-                    function_results = {}
-                    
-                    for func_name, params in function_calls:
-                        try:
-                            print(f"DEBUG: Executing function: {func_name}({params})")
-                            result = execute_function(func_name, **params)
-                            formatted_result = self._format_function_result(func_name, result)
-                            function_results[func_name] = formatted_result
-                        except Exception as e:
-                            function_results[func_name] = f"Error: {str(e)}"
+                    function_results = self._execute_function_calls(function_calls, loader, result_store, reasoning_trace)
                     
                     # Continue conversation
                     conversation_history.append({"role": "assistant", "content": response})
                     
-                    results_text = "\n".join([f"{func}: {result}" for func, result in function_results.items()])
+                    results_text = "\n".join([
+                        f"{func_name}: {result}"
+                        for (func_name, _), result in zip(function_calls, function_results)
+                    ])
                     conversation_history.append({
                         "role": "user", 
                         "content": f"Function results:\n{results_text}\n\nContinue with next step or provide final answer."
                     })
                     
                 else:
-                    # No function calls = check goal completion
-                    if self._check_goal_completion(goal_definition, response, conversation_history):
+                    # No function calls = final answer (or check goal completion when goal checks are on)
+                    if goal_definition is None or self._check_goal_completion(goal_definition, response, conversation_history, usage):
                         print(f"DEBUG: Goal completed in iteration {iteration + 1}")
                         return {
                             "answer": response,
@@ -189,6 +359,139 @@ You: "STEP 1: I need to check the user plan. STEP 2: I will call the function...
                 "reasoning_trace": reasoning_trace,
                 "success": False
             }
+        finally:
+            print(f"DEBUG: Identity loader stats: {loader.stats()}")
+    
+    def _add_prefetched_results(self, prefetched, conversation_history, result_store, reasoning_trace):
+        """Add finished prefetched calls to the context as if the model had already made them"""
+        # Only a short grace period: the first LLM call shouldn't wait on a slow lookup
+        wait([future for _, _, future in prefetched], timeout=config.KATIE_PREFETCH_WAIT_SECONDS)
+        
+        completed = []
+        for func_name, params, future in prefetched:
+            if not future.done():
+                # Still running - if the model asks for it, the call joins it through the function cache
+                print(f"DEBUG: Prefetched {func_name} not ready, leaving it to the model")
+                metrics.increment("katie.prefetch_not_ready")
+                continue
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"DEBUG: Prefetched {func_name} failed: {e!r}")
+                continue
+            
+            if isinstance(result, dict) and "error" in result:
+                continue
+            
+            completed.append((func_name, params, self._format_function_result(func_name, result, result_store)))
+            reasoning_trace.append(f"Function {func_name}: prefetched")
+        
+        if not completed:
+            return
+        
+        metrics.increment("katie.prefetch_used", len(completed))
+        
+        if config.KATIE_NATIVE_TOOLS:
+            tool_calls = [
+                {
+                    "id": f"prefetch_{i}",
+                    "type": "function",
+                    "function": {"name": func_name, "arguments": json.dumps(params)}
+                }
+                for i, (func_name, params, _) in enumerate(completed)
+            ]
+            conversation_history.append({"role": "assistant", "content": None, "tool_calls": tool_calls})
+            for call, (_, _, result_text) in zip(tool_calls, completed):
+                conversation_history.append({"role": "tool", "tool_call_id": call["id"], "content": result_text})
+        else:
+            calls_text = " ".join(
+                "FUNCTION_CALL: {}({})".format(func_name, ", ".join(f'{k}="{v}"' for k, v in params.items()))
+                for func_name, params, _ in completed
+            )
+            results_text = "\n".join(f"{func_name}: {result_text}" for func_name, _, result_text in completed)
+            conversation_history.append({"role": "assistant", "content": calls_text})
+            conversation_history.append({
+                "role": "user",
+                "content": f"Function results:\n{results_text}\n\nContinue with next step or provide final answer."
+            })
+    
+    def _handle_tool_calls(self, message, tool_calls, conversation_history, loader, result_store, reasoning_trace):
+        """Execute native tool calls and append the assistant turn plus one tool message per call"""
+        conversation_history.append({
+            "role": "assistant",
+            "content": message.content,
+            "tool_calls": [
+                {
+                    "id": call.id,
+                    "type": "function",
+                    "function": {"name": call.function.name, "arguments": call.function.arguments}
+                }
+                for call in tool_calls
+            ]
+        })
+        
+        function_calls = [
+            (call.function.name, self._parse_tool_arguments(call.function.arguments))
+            for call in tool_calls
+        ]
+        function_results = self._execute_function_calls(function_calls, loader, result_store, reasoning_trace)
+        
+        for call, result in zip(tool_calls, function_results):
+            conversation_history.append({
+                "role": "tool",
+                "tool_call_id": call.id,
+                "content": result
+            })
+    
+    def _parse_tool_arguments(self, arguments):
+        """Parse a tool call's JSON arguments (None if malformed)"""
+        try:
+            params = json.loads(arguments or "{}")
+            return params if isinstance(params, dict) else None
+        except json.JSONDecodeError as e:
+            print(f"Error parsing tool arguments {arguments!r}: {e}")
+            return None
+    
+    def _execute_function_calls(self, function_calls, loader, result_store, reasoning_trace):
+        """Execute (func_name, params) calls - concurrently when there are several - and return formatted results in call order"""
+        if len(function_calls) == 1:
+            func_name, params = function_calls[0]
+            return [self._run_function(func_name, params, loader, result_store, reasoning_trace)]
+        
+        print(f"DEBUG: Executing {len(function_calls)} functions in parallel")
+        metrics.increment("katie.parallel_batches")
+        futures = [
+            _function_executor.submit(self._run_function, func_name, params, loader, result_store, reasoning_trace)
+            for func_name, params in function_calls
+        ]
+        return [future.result() for future in futures]
+    
+    def _run_function(self, func_name, params, loader, result_store, reasoning_trace):
+        """Execute one function call and format its result"""
+        if params is None:
+            return "Error: arguments were not valid JSON"
+        
+        # Full payload of an earlier result (handled here - the store is per session)
+        if func_name == EXPAND_RESULT_TOOL_NAME:
+            return result_store.expand(params.get("ref"), params.get("path"))
+        
+        try:
+            print(f"DEBUG: Executing function: {func_name}({params})")
+            params = dict(params)
+            params.pop("loader", None)  # never let the model supply the loader
+            
+            result, call_info = execute_function_traced(func_name, loader=loader, **params)
+            metrics.increment("katie.function_calls")
+            metrics.observe(f"katie.function.{func_name}.latency_ms", call_info["latency_ms"])
+            
+            if call_info["cache"] in ("hit", "joined"):
+                reasoning_trace.append(f"Function {func_name}: cache {call_info['cache']} (saved {call_info['saved_ms']}ms)")
+            elif call_info["cache"] == "miss":
+                reasoning_trace.append(f"Function {func_name}: cache miss ({call_info['latency_ms']}ms)")
+            
+            return self._format_function_result(func_name, result, result_store)
+        except Exception as e:
+            return f"Error: {str(e)}"
     
     def _extract_function_calls(self, response_text):
         """Extract function calls from AI response"""
@@ -217,7 +520,7 @@ You: "STEP 1: I need to check the user plan. STEP 2: I will call the function...
         
         for func_name, params_str in code_matches:
             # Only process known function names
-            known_functions = ['check_user_plan', 'get_campaigns', 'get_email_accounts', 'check_account_health']
+            known_functions = ['check_user_plan', 'get_campaigns', 'get_campaign_health', 'get_email_accounts', 'check_account_health']
             if func_name in known_functions:
                 try:
                     params = {}
@@ -234,7 +537,7 @@ You: "STEP 1: I need to check the user plan. STEP 2: I will call the function...
         
         return function_calls
     
-    def _extract_goal_from_query(self, query):
+    def _extract_goal_from_query(self, query, usage=None):
         """Extract explicit goal definition from user query using fast model"""
         try:
             goal_prompt = f"""Extract the specific goal/objective from this query in a clear, measurable format.
@@ -255,8 +558,10 @@ Goal:"""
                 messages=[{"role": "user", "content": goal_prompt}],
                 max_completion_tokens=100,
                 temperature=0.1,
-                model=config.FAST  # Use fast model for goal extraction
+                model=config.FAST,  # Use fast model for goal extraction
+                label="katie_goal"
             )
+            self._add_usage(usage, response_obj)
             
             if response_obj and response_obj.choices:
                 goal = response_obj.choices[0].message.content.strip()
@@ -273,7 +578,7 @@ Goal:"""
         print(f"DEBUG: Using fallback goal: '{query}'")
         return query
     
-    def _check_goal_completion(self, goal_definition, current_response, conversation_history):
+    def _check_goal_completion(self, goal_definition, current_response, conversation_history, usage=None):
         """Check if the goal has been achieved using fast model"""
         try:
             # Build context from conversation
@@ -284,7 +589,8 @@ Goal:"""
                 context_lines = []
                 for msg in recent_context:
                     role = msg['role'].upper()
-                    content = msg['content'][:200] + "..." if len(msg['content']) > 200 else msg['content']
+                    content = msg.get('content') or ""
+                    content = content[:200] + "..." if len(content) > 200 else content
                     context_lines.append(f"{role}: {content}")
                 context_summary = "\n".join(context_lines)
             
@@ -309,8 +615,10 @@ Answer:"""
                 messages=[{"role": "user", "content": completion_prompt}],
                 max_completion_tokens=50,
                 temperature=0.1,
-                model=config.FAST  # Use fast model for goal completion
+                model=config.FAST,  # Use fast model for goal completion
+                label="katie_goal_check"
             )
+            self._add_usage(usage, response_obj)
             
             if response_obj and response_obj.choices:
                 result = response_obj.choices[0].message.content.strip().lower()
@@ -327,47 +635,135 @@ Answer:"""
         # Fallback: not complete
         return False
     
+    def _add_usage(self, usage, response_obj):
+        """Accumulate one LLM call's token usage into the session totals, return its prompt tokens"""
+        if usage is None or response_obj is None:
+            return 0
+        usage["llm_calls"] += 1
+        response_usage = getattr(response_obj, "usage", None)
+        if not response_usage:
+            return 0
+        prompt_tokens = getattr(response_usage, "prompt_tokens", 0) or 0
+        usage["prompt_tokens"] += prompt_tokens
+        usage["completion_tokens"] += getattr(response_usage, "completion_tokens", 0) or 0
+        return prompt_tokens
+    
+    def _compact_consumed_results(self, conversation_history, seen_until, result_store, compacted_indexes):
+        """Replace function results the model has already seen (messages before seen_until) with summaries and refs"""
+        tokens_before = 0
+        tokens_after = 0
+        
+        for index in range(2, seen_until):
+            msg = conversation_history[index]
+            if index in compacted_indexes:
+                continue
+            compacted_indexes.add(index)
+            
+            if msg["role"] == "tool":
+                new_content = self._compact_result_text(msg["content"], result_store)
+            elif msg["role"] == "user" and msg["content"].startswith("Function results:"):
+                # Text-mode results: one "func_name: result" line per call
+                new_content = "\n".join(
+                    self._compact_result_line(line, result_store) for line in msg["content"].split("\n")
+                )
+            else:
+                continue
+            
+            if new_content != msg["content"]:
+                tokens_before += count_tokens(msg["content"])
+                tokens_after += count_tokens(new_content)
+                msg["content"] = new_content
+        
+        if tokens_before:
+            metrics.observe("katie.compaction.tokens_saved", tokens_before - tokens_after, buckets=metrics.TOKEN_BUCKETS)
+            print(f"DEBUG: Compacted consumed function results: {tokens_before} -> {tokens_after} tokens")
+    
+    def _compact_result_line(self, line, result_store):
+        """Compact the result part of a "func_name: result" line"""
+        func_name, sep, text = line.partition(": ")
+        if not sep:
+            return line
+        return f"{func_name}: {self._compact_result_text(text, result_store)}"
+    
+    def _compact_result_text(self, text, result_store):
+        """Short summary plus ref for a large serialized result (small or unknown results are kept)"""
+        match = RESULT_REF_PATTERN.match(text or "")
+        if not match or count_tokens(text) < config.KATIE_COMPACT_MIN_TOKENS:
+            return text
+        
+        ref = match.group(1)
+        entry = result_store.get(ref)
+        if not entry:
+            return text
+        
+        func_name, result = entry
+        return (
+            f'{{"_ref":"{ref}","compacted":true,"function":"{func_name}",'
+            f'"summary":{summarize_result(result)}}}'
+        )
+    
+    def _completion_rule(self, goal_definition):
+        """Instruction for how to finish"""
+        if goal_definition is None and config.KATIE_NATIVE_TOOLS:
+            return f"When you have the answer, call {FINAL_ANSWER_TOOL_NAME} with your complete reply"
+        return "Stop when you have the answer"
+    
     def _format_playbook_steps(self, playbook):
         """Format playbook steps for AI"""
         if isinstance(playbook, list):
             return "\n".join([f"STEP {i+1}: {step}" for i, step in enumerate(playbook)])
         elif isinstance(playbook, dict):
-            return "\n".join([f"STEP {i+1}: {step['description']}" for i, step in enumerate(playbook.get('steps', []))])
+            return "\n".join([
+                f"STEP {i+1}: {step['description'] if isinstance(step, dict) else step}"
+                for i, step in enumerate(playbook.get('steps', []))
+            ])
         else:
             return str(playbook)
     
     def _format_functions_for_ai(self):
-        """Format available functions for AI"""
-        sections_text = []
-        
-        for section_name, section_data in self.functions_doc.get('sections', {}).items():
-            sections_text.append(f"\n## {section_name.upper()}")
-            
-            for func in section_data.get('functions', []):
-                sections_text.append(f"\n### {func['name']}")
-                sections_text.append(f"Description: {func['description']}")
-                sections_text.append("Inputs:")
-                for param, details in func.get('inputs', {}).items():
-                    required = " (required)" if details.get('required', False) else " (optional)"
-                    sections_text.append(f"  - {param}: {details.get('description', '')}{required}")
-        
-        return "\n".join(sections_text)
+        """Format available functions for AI (pre-rendered once per registry build)"""
+        if config.KATIE_NATIVE_TOOLS:
+            # Names, descriptions and parameters travel as tool schemas
+            return "Provided as tools - call them directly (several independent calls can be made in one turn)"
+        return get_functions_prompt() + (
+            f"\n\n### {EXPAND_RESULT_TOOL_NAME}\n"
+            "Description: Get the full data of a compacted function result\n"
+            "Inputs:\n  - ref: The _ref value from the result (required)\n  - path: Dotted path inside the result (optional)"
+        )
+    
+    def _function_call_rule(self):
+        """Instruction for how to call functions"""
+        if config.KATIE_NATIVE_TOOLS:
+            return "When you need data, call the tools IMMEDIATELY - request independent calls together in one turn"
+        return 'When you need data, call functions IMMEDIATELY using: FUNCTION_CALL: function_name(param="value")'
     
-    def _format_function_result(self, func_name, result):
-        """Format function results"""
-        # Import the existing formatter from assistant processor
+    def _function_call_example(self):
+        """Example of a correct function call for the prompt"""
+        if config.KATIE_NATIVE_TOOLS:
+            return '[calls check_user_plan with user_email="user@example.com"]'
+        return '"I\'ll check the user plan to get the workspace ID. FUNCTION_CALL: check_user_plan(user_email="user@example.com")"'
+    
+    def _format_function_result(self, func_name, result, result_store):
+        """Format a function result as compact JSON (full payload kept in the result store)"""
+        if isinstance(result, dict) and 'error' in result:
+            return f"Error: {result['error']}"
+        
+        # Reuse the assistant processor's HTML cleanup (owner emails come as mailto links)
         try:
             from assistant_processor import assistant_processor
-            return assistant_processor._format_function_result(func_name, result)
-        except:
-            # Fallback formatting - NO TRIMMING for check_user_plan
-            if isinstance(result, dict) and 'error' in result:
-                return f"Error: {result['error']}"
-            elif func_name == "check_user_plan":
-                # Never trim user plan results
-                return str(result)
-            else:
-                return str(result)[:200] + "..." if len(str(result)) > 200 else str(result)
+            result = assistant_processor._clean_html_from_result(result)
+        except Exception as e:
+            print(f"Error cleaning function result: {e}")
+        
+        func_def = get_registry().get_function(func_name)
+        ref = result_store.add(func_name, result)
+        return serialize_result(
+            result,
+            ref=ref,
+            result_fields=func_def.result_fields if func_def else None,
+            max_list_items=func_def.result_max_items if func_def else None,
+            max_tokens=func_def.result_max_tokens if func_def else None
+        )
 
 
 # Global instance
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Keep the materialized account snapshots (dashboard DB) up to date
+
+Usage: python run_snapshot_refresher.py [watch|delta|once]
+  watch  - follow app DB change streams, falling back to delta polling if unavailable (default)
+  delta  - refresh from documents modified since the last run, every ACCOUNT_SNAPSHOT_DELTA_INTERVAL_SECONDS
+  once   - run a single delta refresh and exit
+"""
+import sys
+import time
+
+import config
+from assistant_functions.account_snapshot import ensure_snapshot_indexes, run_delta_refresh, watch_app_changes
+
+
+def delta_loop():
+    """Run delta refreshes forever"""
+    while True:
+        try:
+            run_delta_refresh()
+        except Exception as e:
+            print(f"Error in account snapshot delta refresh: {e}")
+        time.sleep(config.ACCOUNT_SNAPSHOT_DELTA_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    mode = sys.argv[1] if len(sys.argv) > 1 else "watch"
+    ensure_snapshot_indexes()
+
+    if mode == "once":
+        run_delta_refresh()
+    elif mode == "delta":
+        delta_loop()
+    elif mode == "watch":
+        try:
+            watch_app_changes()
+        except Exception as e:
+            print(f"Change streams unavailable ({e}) - falling back to delta refresh")
+            delta_loop()
+    else:
+        print(__doc__)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark get_campaign_health (one $facet pipeline) vs get_campaigns(mode="FULL")
+
+Usage: python temp/benchmark_campaign_health.py user1@example.com user2@example.com ...
+For each user's default workspace compares latency, bytes returned by MongoDB and
+tokens the result costs in the reasoning context.
+"""
+
+import sys
+import os
+import time
+
+# Add parent directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from assistant_functions import get_registry
+from assistant_functions.result_serializer import serialize_result, to_json
+from assistant_functions.sections.campaigns import get_campaigns, get_campaign_health
+from token_budget import count_tokens
+
+RUNS = 3
+FULL_LIMIT = 10
+
+
+def _db_bytes():
+    """Total bytes the campaigns collection has returned so far"""
+    return metrics.snapshot()["observations"].get("assistant_db.campaigns.bytes", {}).get("total", 0)
+
+
+def measure(func, user_email):
+    """Run func RUNS times, return (result, MongoDB bytes per run, best latency in ms)"""
+    best_ms = None
+    result = None
+    db_bytes = 0
+
+    for _ in range(RUNS):
+        before = _db_bytes()
+        start = time.time()
+        result = func(user_email)
+        elapsed_ms = (time.time() - start) * 1000
+        db_bytes = _db_bytes() - before
+        best_ms = elapsed_ms if best_ms is None else min(best_ms, elapsed_ms)
+
+    return result, db_bytes, best_ms
+
+
+def main():
+    emails = sys.argv[1:]
+    if not emails:
+        print(__doc__)
+        return
+
+    variants = [
+        ("full", "get_campaigns", lambda e: get_campaigns(user_email=e, mode="FULL", limit=FULL_LIMIT)),
+        ("health", "get_campaign_health", lambda e: get_campaign_health(user_email=e))
+    ]
+    functions = get_registry().functions
+
+    print(f"{'user':<35} {'variant':<8} {'campaigns':>10} {'ms':>8} {'db bytes':>10} {'json bytes':>11} {'raw tok':>8} {'ctx tok':>8}")
+    print("-" * 104)
+
+    for email in emails:
+        for name, func_name, func in variants:
+            result, db_bytes, best_ms = measure(func, email)
+            if "error" in result:
+                print(f"{email:<35} {name:<8} error: {result['error']}")
+                continue
+
+            raw_json = to_json(result)
+            context_text = serialize_result(result, ref="r1", result_fields=functions[func_name].result_fields,
+                                            max_list_items=functions[func_name].result_max_items)
+            print(f"{email:<35} {name:<8} {len(result.get('campaigns', [])):>10} {best_ms:>8.1f} {db_bytes:>10.0f} {len(raw_json):>11} {count_tokens(raw_json):>8} {count_tokens(context_text):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark get_campaigns field groups and cursor paging
+
+Usage: python temp/benchmark_campaign_pages.py user@example.com [page_size]
+Pages through the user's default workspace with each field selection and compares
+pages, bytes returned by MongoDB and context tokens per page.
+"""
+
+import sys
+import os
+import time
+
+# Add parent directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from assistant_functions import get_registry
+from assistant_functions.result_serializer import serialize_result
+from assistant_functions.sections.campaigns import get_campaigns
+from token_budget import count_tokens
+
+MAX_PAGES = 50
+
+SELECTIONS = [
+    ("mode=FULL", {"mode": "FULL"}),
+    ("mode=BASIC", {"mode": "BASIC"}),
+    ("fields=stats", {"fields": "stats"}),
+    ("fields=health", {"fields": "health"}),
+    ("fields=core,sending", {"fields": "core,sending"})
+]
+
+
+def _db_bytes():
+    """Total bytes the campaigns collection has returned so far"""
+    return metrics.snapshot()["observations"].get("assistant_db.campaigns.bytes", {}).get("total", 0)
+
+
+def page_through(user_email, page_size, params):
+    """Follow next_cursor to the end, return (campaigns, pages, ms, db bytes, context tokens)"""
+    definition = get_registry().functions["get_campaigns"]
+    campaigns = pages = tokens = 0
+    cursor = None
+
+    before = _db_bytes()
+    start = time.time()
+    while pages < MAX_PAGES:
+        result = get_campaigns(user_email=user_email, limit=page_size, cursor=cursor, **params)
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        pages += 1
+        campaigns += len(result["campaigns"])
+        tokens += count_tokens(serialize_result(result, ref="r1", result_fields=definition.result_fields,
+                                                max_list_items=page_size))
+        cursor = result["next_cursor"]
+        if not cursor:
+            break
+
+    return campaigns, pages, (time.time() - start) * 1000, _db_bytes() - before, tokens
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return
+
+    user_email = sys.argv[1]
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+
+    print(f"{'selection':<22} {'campaigns':>10} {'pages':>6} {'ms':>9} {'db bytes':>11} {'ctx tok':>9} {'tok/page':>9}")
+    print("-" * 82)
+
+    for name, params in SELECTIONS:
+        campaigns, pages, elapsed_ms, db_bytes, tokens = page_through(user_email, page_size, params)
+        print(f"{name:<22} {campaigns:>10} {pages:>6} {elapsed_ms:>9.1f} {db_bytes:>11.0f} {tokens:>9} {tokens / pages:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark check_user_plan: batched $in lookups vs the previous per-workspace N+1 queries,
+and the materialized account snapshot read
+
+Usage: python temp/benchmark_check_user_plan.py user1@example.com user2@example.com ...
+Pick users with different workspace counts to see round trips and latency vs workspace count.
+"""
+
+import sys
+import os
+import time
+
+import config
+
+# Add parent directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assistant_functions.database import AssistantDB
+from assistant_functions.sections.check_user_plan import check_user_plan
+
+RUNS = 3
+
+
+class CountingDB(AssistantDB):
+    """AssistantDB that counts round trips"""
+
+    round_trips = 0
+
+    def execute_query(self, *args, **kwargs):
+        CountingDB.round_trips += 1
+        return super().execute_query(*args, **kwargs)
+
+
+def legacy_check_user_plan(user_email):
+    """Reference copy of the previous N+1 implementation (4 queries per workspace)"""
+    db = CountingDB()
+
+    user_doc = db.execute_query("users", "find_one", {"email": user_email.lower()})
+    if not user_doc:
+        return {"error": f"User not found: {user_email}"}
+
+    workspace_info_list = []
+    for ws_info in user_doc.get("workspaces", []):
+        ws_id_obj = ws_info.get("workspace_id")
+        if not ws_id_obj:
+            continue
+
+        ws_doc = db.execute_query("workspaces", "find_one", {"_id": ws_id_obj})
+        if not ws_doc:
+            continue
+
+        org_id = ws_doc.get("org_id")
+        plan_name = "N/A"
+        owner_email = "N/A"
+        internal_group = "N/A"
+
+        if org_id:
+            org_doc = db.execute_query("organizations", "find_one", {"_id": org_id})
+            if org_doc:
+                plan_id = org_doc.get("plan_id")
+                if plan_id:
+                    plan_doc = db.execute_query("plans", "find_one", {"_id": plan_id})
+                    if plan_doc:
+                        plan_name = plan_doc.get("plan_name", "N/A")
+
+                owner_query = {"workspaces": {"$elemMatch": {"org_id": org_id, "role_name": "OWNER"}}}
+                owner_doc = db.execute_query("users", "find_one", owner_query)
+                if owner_doc:
+                    owner_email = owner_doc.get("email", "N/A")
+
+                internal_group = org_doc.get("internal_group", "N/A")
+
+        workspace_info_list.append({
+            "workspace_id": str(ws_id_obj),
+            "organization_id": str(org_id) if org_id else None,
+            "workspace_name": ws_doc.get("name", f"Workspace {str(ws_id_obj)}"),
+            "role_name": ws_info.get("role_name", "N/A"),
+            "plan_name": plan_name,
+            "owner_email": owner_email,
+            "status": ws_doc.get("status", "Unknown"),
+            "internal_group": internal_group
+        })
+
+    return {"workspaces": workspace_info_list}
+
+
+def measure(func, user_email):
+    """Run func RUNS times, return (result, round trips per run, best latency in ms)"""
+    best_ms = None
+    result = None
+
+    for _ in range(RUNS):
+        CountingDB.round_trips = 0
+        start = time.time()
+        result = func(user_email)
+        elapsed_ms = (time.time() - start) * 1000
+        best_ms = elapsed_ms if best_ms is None else min(best_ms, elapsed_ms)
+
+    return result, CountingDB.round_trips, best_ms
+
+
+def main():
+    emails = sys.argv[1:]
+    if not emails:
+        print(__doc__)
+        return
+
+    # Route the batched implementation through the counting DB as well
+    import assistant_functions.sections.check_user_plan as section
+    section.AssistantDB = CountingDB
+
+    print(f"{'user':<35} {'workspaces':>10} {'legacy trips':>13} {'legacy ms':>10} {'batched trips':>14} {'batched ms':>11} {'snapshot trips':>15} {'snapshot ms':>12} {'same output':>12}")
+    print("-" * 140)
+
+    for email in emails:
+        legacy_result, legacy_trips, legacy_ms = measure(legacy_check_user_plan, email)
+
+        # Live path (snapshots off), then write a snapshot and measure reading it
+        config.ACCOUNT_SNAPSHOT_ENABLED = False
+        batched_result, batched_trips, batched_ms = measure(lambda e: check_user_plan(user_email=e), email)
+        config.ACCOUNT_SNAPSHOT_ENABLED = True
+        check_user_plan(user_email=email)
+        snapshot_result, snapshot_trips, snapshot_ms = measure(lambda e: check_user_plan(user_email=e), email)
+
+        same = legacy_result.get("workspaces") == batched_result.get("workspaces") == snapshot_result.get("workspaces")
+        workspace_count = len(batched_result.get("workspaces", []))
+
+        print(f"{email:<35} {workspace_count:>10} {legacy_trips:>13} {legacy_ms:>10.1f} {batched_trips:>14} {batched_ms:>11.1f} {snapshot_trips:>15} {snapshot_ms:>12.1f} {str(same):>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark get_email_accounts / check_account_health vs pulling the raw account documents
+
+Usage: python temp/benchmark_email_accounts.py user1@example.com user2@example.com ...
+For each user's default workspace compares latency and bytes returned, and reports
+whether the workspace $match uses the email_accounts index (IXSCAN) or scans (COLLSCAN).
+"""
+
+import sys
+import os
+import time
+
+# Add parent directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bson
+from bson import ObjectId
+
+from assistant_functions.database import AssistantDB
+from assistant_functions.result_serializer import to_json
+from assistant_functions.sections.email_accounts import get_email_accounts, check_account_health
+from assistant_functions.workspace_resolver import resolve_workspace_and_org
+
+RUNS = 3
+
+
+def raw_accounts(db, resolution):
+    """Previous approach: every account document of the workspace, unprojected"""
+    query = {
+        "workspace_id": ObjectId(resolution["workspace_id"]),
+        "organization_id": ObjectId(resolution["organization_id"])
+    }
+    return list(db.get_collection("email_accounts").find(query))
+
+
+def winning_plan_stages(db, resolution):
+    """Stage names of the winning plan for the workspace $match"""
+    query = {
+        "workspace_id": ObjectId(resolution["workspace_id"]),
+        "organization_id": ObjectId(resolution["organization_id"]),
+        "status": {"$ne": "DELETED"}
+    }
+    plan = db.get_collection("email_accounts").find(query).explain()["queryPlanner"]["winningPlan"]
+
+    stages = []
+    while plan:
+        stages.append(plan.get("stage"))
+        plan = plan.get("inputStage")
+    return stages
+
+
+def best_of(func):
+    """Run func RUNS times, return (result, best latency in ms)"""
+    best_ms = None
+    result = None
+    for _ in range(RUNS):
+        start = time.time()
+        result = func()
+        elapsed_ms = (time.time() - start) * 1000
+        best_ms = elapsed_ms if best_ms is None else min(best_ms, elapsed_ms)
+    return result, best_ms
+
+
+def main():
+    emails = sys.argv[1:]
+    if not emails:
+        print(__doc__)
+        return
+
+    db = AssistantDB()
+
+    print(f"{'user':<35} {'variant':<22} {'accounts':>9} {'ms':>8} {'bytes':>10}")
+    print("-" * 88)
+
+    for email in emails:
+        resolution = resolve_workspace_and_org(user_email=email)
+        if "error" in resolution:
+            print(f"{email:<35} error: {resolution['error']}")
+            continue
+
+        docs, raw_ms = best_of(lambda: raw_accounts(db, resolution))
+        raw_bytes = sum(len(bson.encode(doc)) for doc in docs)
+        print(f"{email:<35} {'raw documents':<22} {len(docs):>9} {raw_ms:>8.1f} {raw_bytes:>10}")
+
+        for name, func in [
+            ("get_email_accounts", lambda: get_email_accounts(workspace_id=resolution["workspace_id"])),
+            ("check_account_health", lambda: check_account_health(workspace_id=resolution["workspace_id"]))
+        ]:
+            result, best_ms = best_of(func)
+            if "error" in result:
+                print(f"{email:<35} {name:<22} error: {result['error']}")
+                continue
+            print(f"{email:<35} {name:<22} {result['summary']['total_accounts']:>9} {best_ms:>8.1f} {len(to_json(result)):>10}")
+
+        stages = winning_plan_stages(db, resolution)
+        print(f"{'':<35} plan: {' <- '.join(stages)}{'' if 'IXSCAN' in stages else '  (missing index - see email_accounts_info.txt)'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark Katie completion modes: final-answer (main model signals completion) vs separate goal checks
+
+Usage: python temp/benchmark_reasoning_modes.py user@example.com ["query" ...]
+Runs each query in both modes against the live services and compares
+time-to-answer, LLM calls and tokens.
+"""
+
+import sys
+import os
+
+# Add parent directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reasoning_engine import reasoning_engine
+
+DEFAULT_QUERIES = [
+    "What plan is this user on?",
+    "List the workspace IDs this user has access to",
+    "Why are this user's campaigns not sending emails?"
+]
+
+MODES = [
+    ("final_answer", False),
+    ("goal_checks", True)
+]
+
+
+def run(query, user_email, goal_checks):
+    """Run one Katie session, return (elapsed ms, usage, iterations, success)"""
+    result = reasoning_engine.execute_reasoning(
+        query=query,
+        context_data={"user_email": user_email},
+        mode="self_thinking",
+        max_iterations=5,
+        goal_checks=goal_checks
+    )
+    return result["elapsed_ms"], result["usage"], result.get("iterations_used", "-"), result.get("success", False)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return
+
+    user_email = sys.argv[1]
+    queries = sys.argv[2:] or DEFAULT_QUERIES
+
+    rows = []
+    for query in queries:
+        for mode_name, goal_checks in MODES:
+            elapsed_ms, usage, iterations, success = run(query, user_email, goal_checks)
+            rows.append((query, mode_name, elapsed_ms, usage, iterations, success))
+
+    print()
+    print(f"{'query':<50} {'mode':<13} {'ms':>7} {'llm calls':>10} {'prompt tok':>11} {'compl tok':>10} {'iters':>6} {'ok':>6}")
+    print("-" * 120)
+    for query, mode_name, elapsed_ms, usage, iterations, success in rows:
+        print(f"{query[:50]:<50} {mode_name:<13} {elapsed_ms:>7} {usage['llm_calls']:>10} {usage['prompt_tokens']:>11} {usage['completion_tokens']:>10} {str(iterations):>6} {str(success):>6}")
+
+    print()
+    for mode_name, _ in MODES:
+        mode_rows = [row for row in rows if row[1] == mode_name]
+        avg_ms = sum(row[2] for row in mode_rows) / len(mode_rows)
+        avg_calls = sum(row[3]['llm_calls'] for row in mode_rows) / len(mode_rows)
+        avg_tokens = sum(row[3]['prompt_tokens'] + row[3]['completion_tokens'] for row in mode_rows) / len(mode_rows)
+        print(f"{mode_name:<13} avg {avg_ms:.0f}ms, {avg_calls:.1f} LLM calls, {avg_tokens:.0f} tokens per query")
+
+
+if __name__ == "__main__":
+    main()
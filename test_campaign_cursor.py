@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test script for get_campaigns cursor paging (assistant_functions/sections/campaigns.py)
+"""
+import sys
+import os
+from datetime import datetime
+
+sys.path.append(os.path.dirname(__file__))
+
+# assistant_functions builds its AssistantDB at import - give it placeholder URIs
+# (MongoClient connects lazily, and these tests never query)
+os.environ.setdefault("APP_DB_URI", "mongodb://localhost:27017/app")
+os.environ.setdefault("DASHBOARD_DB_URI", "mongodb://localhost:27017/dashboard")
+
+from bson import ObjectId
+from assistant_functions.sections.campaigns import _encode_cursor, _decode_cursor, _after_cursor_match
+
+def test_campaign_cursor():
+    """Test resume token encoding and the match for the campaigns after it"""
+
+    print("=" * 60)
+    print("TESTING CAMPAIGN CURSOR")
+    print("=" * 60)
+
+    passed = 0
+    total = 0
+
+    def check(name, condition):
+        nonlocal passed, total
+        total += 1
+        if condition:
+            passed += 1
+            print(f"✅ PASS {name}")
+        else:
+            print(f"❌ FAIL {name}")
+
+    campaign_id = ObjectId()
+    created_at = datetime(2025, 1, 25, 8, 20, 36)
+
+    # Encode/decode
+    cursor = _encode_cursor({"_id": campaign_id, "created_at": created_at, "camp_name": "Q1 outreach"})
+    after = _decode_cursor(cursor)
+    check("cursor is url-safe", all(char.isalnum() or char in "-_=" for char in cursor))
+    check("cursor keeps _id", after is not None and after["_id"] == campaign_id)
+    check("cursor keeps created_at", after is not None and after["created_at"] == created_at)
+
+    undated = _decode_cursor(_encode_cursor({"_id": campaign_id}))
+    check("undated cursor decodes", undated is not None and undated["created_at"] is None)
+
+    check("garbage cursor rejected", _decode_cursor("not-a-cursor") is None)
+    check("cursor without ObjectId rejected", _decode_cursor(_encode_cursor({"_id": "abc"})) is None)
+
+    # Campaigns after a dated position: older, same time with lower _id, and every undated one
+    conditions = _after_cursor_match(after)
+    check("older campaigns follow", {"created_at": {"$lt": created_at}} in conditions)
+    check("same created_at pages on _id", {"created_at": created_at, "_id": {"$lt": campaign_id}} in conditions)
+    check("undated campaigns follow a dated position", {"created_at": None} in conditions)
+
+    # After an undated position only lower _ids of undated campaigns remain
+    conditions = _after_cursor_match(undated)
+    check("undated position pages on _id", {"created_at": None, "_id": {"$lt": campaign_id}} in conditions)
+    check("undated position doesn't restart undated campaigns", {"created_at": None} not in conditions)
+
+    print("\n" + "=" * 60)
+    print(f"TEST COMPLETE: {passed}/{total} tests passed")
+    print("=" * 60)
+
+    assert passed == total
+
+if __name__ == "__main__":
+    test_campaign_cursor()
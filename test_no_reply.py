@@ -11,7 +11,13 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'worker', 'steps'))
 
 # Mock the dependencies
 class MockConfig:
-    pass
+    TESTING = False
+    CONVERSATION_SUMMARY_ENABLED = False
+    SPECULATIVE_FAQ_MATCH = False
+    CATEGORIZATION_CASCADE = False
+    TOKEN_BUDGETS = {"step0": 2000, "step1": 2000, "katie": 600}
+    MAX_MESSAGE_TOKENS = 500
+    DEFAULT_MODEL = "gpt-5-chat"
 
 class MockDB:
     @staticmethod
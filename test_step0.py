@@ -10,7 +10,11 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'worker', 'steps'))
 
 # Mock the dependencies that step0 needs
 class MockConfig:
-    pass
+    DEFAULT_MODEL = 'default-model'
+    CATEGORIZATION_CASCADE = True
+    CATEGORIZATION_CHEAP_MODEL = 'cheap-model'
+    TOKEN_BUDGETS = {"step0": 2000, "step1": 2000, "katie": 600}
+    MAX_MESSAGE_TOKENS = 500
 
 class MockOpenAIUtils:
     @staticmethod
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared token budget utilities
+"""
+import sys
+import os
+
+sys.path.append(os.path.dirname(__file__))
+
+from token_budget import count_tokens, truncate_to_tokens, pack_newest_first, elision_marker
+
+def test_token_budget():
+    """Test token counting, truncation and newest-first packing"""
+    
+    print("=" * 60)
+    print("TESTING TOKEN BUDGET")
+    print("=" * 60)
+    
+    passed = 0
+    total = 0
+    
+    def check(name, condition):
+        nonlocal passed, total
+        total += 1
+        if condition:
+            passed += 1
+            print(f"✅ PASS {name}")
+        else:
+            print(f"❌ FAIL {name}")
+    
+    check("empty text has no tokens", count_tokens("") == 0)
+    check("short text has tokens", count_tokens("how do I reset my password?") > 0)
+    
+    pasted_log = "ERROR smtp timeout at line 42\n" * 500
+    truncated = truncate_to_tokens(pasted_log, 100)
+    check("long text is truncated", count_tokens(truncated) < count_tokens(pasted_log))
+    check("truncation keeps the head", truncated.startswith("ERROR smtp timeout"))
+    check("truncation marks the elision", "tokens elided" in truncated)
+    check("short text is unchanged", truncate_to_tokens("hello", 100) == "hello")
+    
+    lines = [f"Customer: message number {i} " + "word " * 40 for i in range(20)]
+    kept, omitted = pack_newest_first(lines, 300)
+    check("packing drops older lines", omitted > 0 and len(kept) + omitted == len(lines))
+    check("packing keeps the newest line", kept[-1] == lines[-1])
+    check("packing keeps chronological order", kept == lines[-len(kept):])
+    check("packing stays within budget", sum(count_tokens(line) for line in kept) <= 300)
+    
+    kept, omitted = pack_newest_first([pasted_log], 200)
+    check("oversized newest line is kept truncated", len(kept) == 1 and omitted == 0)
+    
+    kept, omitted = pack_newest_first(["Customer: " + pasted_log, "Customer: hi"], 2000, max_line_tokens=100)
+    check("per-line cap lets both lines fit", omitted == 0 and len(kept) == 2)
+    
+    check("elision marker mentions count", "3 earlier" in elision_marker(3))
+    
+    print("\n" + "=" * 60)
+    print(f"TEST COMPLETE: {passed}/{total} tests passed")
+    print("=" * 60)
+    
+    assert passed == total
+
+if __name__ == "__main__":
+    test_token_budget()
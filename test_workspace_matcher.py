@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test script for local workspace-name matching (assistant_functions/workspace_resolver.py)
+"""
+import sys
+import os
+
+sys.path.append(os.path.dirname(__file__))
+
+# assistant_functions builds its AssistantDB at import - give it placeholder URIs
+# (MongoClient connects lazily, and these tests never query)
+os.environ.setdefault("APP_DB_URI", "mongodb://localhost:27017/app")
+os.environ.setdefault("DASHBOARD_DB_URI", "mongodb://localhost:27017/dashboard")
+
+from assistant_functions.workspace_resolver import match_workspace_name_locally
+
+def test_workspace_matcher():
+    """Test which workspace names are matched locally and which are left to the model"""
+
+    print("=" * 60)
+    print("TESTING WORKSPACE MATCHER")
+    print("=" * 60)
+
+    passed = 0
+    total = 0
+
+    def check(name, condition):
+        nonlocal passed, total
+        total += 1
+        if condition:
+            passed += 1
+            print(f"✅ PASS {name}")
+        else:
+            print(f"❌ FAIL {name}")
+
+    # Exact normalized names
+    check("possessive and filler words ignored",
+          match_workspace_name_locally("Yaro's workspace", ["Yaro", "Sales"]) == "Yaro")
+    check("case ignored",
+          match_workspace_name_locally("client a", ["Client A", "Client B"]) == "Client A")
+    check("word order ignored",
+          match_workspace_name_locally("team marketing", ["Marketing Team", "Sales"]) == "Marketing Team")
+    check("exact numbered name picked among siblings",
+          match_workspace_name_locally("Acme 2", ["Acme 1", "Acme 2"]) == "Acme 2")
+
+    # Typos
+    check("typo matched",
+          match_workspace_name_locally("Marketng Team", ["Marketing Team", "Sales"]) == "Marketing Team")
+
+    # Names that differ in a letter or number are left to the model
+    check("different letter suffix not matched",
+          match_workspace_name_locally("Client A", ["Client B", "Marketing Team"]) is None)
+    check("different number not matched",
+          match_workspace_name_locally("Acme 2", ["Acme 1", "Sales"]) is None)
+    check("different year not matched",
+          match_workspace_name_locally("Agency 2024", ["Agency 2023", "Personal"]) is None)
+
+    # Unrelated or ambiguous names are left to the model
+    check("unrelated name not matched",
+          match_workspace_name_locally("Finance", ["Marketing Team", "Sales"]) is None)
+    check("no candidates",
+          match_workspace_name_locally("Sales", []) is None)
+
+    print("\n" + "=" * 60)
+    print(f"TEST COMPLETE: {passed}/{total} tests passed")
+    print("=" * 60)
+
+    assert passed == total
+
+if __name__ == "__main__":
+    test_workspace_matcher()
@@ -0,0 +1,110 @@
+"""
+Token budget utilities
+Token counting, newest-first packing of conversation messages and per-section prompt accounting
+"""
+
+import metrics
+
+# Use a local tokenizer when available, otherwise fall back to a fast estimate
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:
+    _encoding = None
+
+# Rough characters-per-token ratio for English text (used by the estimator)
+CHARS_PER_TOKEN = 4
+
+
+def count_tokens(text):
+    """Count (or estimate) the number of tokens in a text"""
+    if not text:
+        return 0
+
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Shorten a text to roughly max_tokens, keeping its head and tail and eliding the middle"""
+    if not text:
+        return text
+
+    total_tokens = count_tokens(text)
+    if total_tokens <= max_tokens:
+        return text
+
+    keep_chars = max(max_tokens, 0) * CHARS_PER_TOKEN
+    head_chars = keep_chars * 2 // 3
+    tail_chars = keep_chars - head_chars
+    omitted_tokens = total_tokens - max_tokens
+
+    tail = text[-tail_chars:] if tail_chars else ""
+    return f"{text[:head_chars]} ...[{omitted_tokens} tokens elided]... {tail}"
+
+
+def pack_newest_first(lines, budget, max_line_tokens=None):
+    """
+    Pack rendered message lines into a token budget, newest first
+
+    Args:
+        lines: Rendered messages, oldest first
+        budget: Total token budget for the packed lines
+        max_line_tokens: Optional cap for any single line (long pasted logs etc.)
+
+    Returns:
+        (kept_lines, omitted_count) - kept lines are oldest first; omitted_count
+        is the number of older lines that did not fit
+    """
+    kept = []
+    used = 0
+
+    for line in reversed(lines):
+        if max_line_tokens:
+            line = truncate_to_tokens(line, max_line_tokens)
+
+        tokens = count_tokens(line)
+        if used + tokens > budget:
+            # Always keep the newest message, shortened to fit
+            if not kept:
+                kept.append(truncate_to_tokens(line, budget))
+            break
+
+        kept.append(line)
+        used += tokens
+
+    kept.reverse()
+    return kept, len(lines) - len(kept)
+
+
+def elision_marker(omitted_count):
+    """Placeholder line for older messages dropped by the budget"""
+    return f"[{omitted_count} earlier message(s) omitted to fit the token budget]"
+
+
+def report_prompt_sections(step_name, sections):
+    """
+    Log and record token counts for each section of a prompt
+
+    Args:
+        step_name: Metric prefix (e.g. "step0", "step1", "katie")
+        sections: Ordered dict of section name -> text
+
+    Returns:
+        Total tokens across all sections
+    """
+    total = 0
+    parts = []
+
+    for name, text in sections.items():
+        tokens = count_tokens(text)
+        total += tokens
+        metrics.observe(f"prompt_tokens.{step_name}.{name}", tokens, buckets=metrics.TOKEN_BUCKETS)
+        parts.append(f"{name}={tokens}")
+
+    metrics.observe(f"prompt_tokens.{step_name}.total", total, buckets=metrics.TOKEN_BUCKETS)
+    print(f"DEBUG: {step_name} prompt tokens - {', '.join(parts)}, total={total}")
+
+    return total
@@ -1,13 +1,20 @@
 import sys
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Add steps directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'steps'))
 
 from step0_categorize import categorize_message
 from step1_strict_faq import strict_faq_match
+from conversation_summary import get_summarized_history
 import db
 import config
+import metrics
+
+# Background pool for speculative step 1 calls (overlaps FAQ matching with step 0)
+_speculative_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="speculative-faq")
 
 class ReplyEngine:
     def __init__(self):
@@ -50,12 +57,31 @@ class ReplyEngine:
             
             print(f"Processing user message: {last_user_msg}")
             
+            # Long threads: send the rolling summary plus only the recent messages verbatim
+            conversation_summary = ""
+            prompt_history = conversation_history
+            if config.CONVERSATION_SUMMARY_ENABLED:
+                conversation_summary, prompt_history = get_summarized_history(conv_doc, conversation_history)
+            
+            # Launch step 1 speculatively so it runs while step 0 categorizes
+            faq_future = None
+            if config.SPECULATIVE_FAQ_MATCH:
+                print("SPECULATIVE: Starting Step 1 FAQ matching in parallel with Step 0")
+                faq_future = _speculative_executor.submit(strict_faq_match, last_user_msg, prompt_history, conversation_summary)
+                metrics.increment("reply_engine.speculative_faq.started")
+            
             # STEP 0: Categorize the message (ALWAYS RUNS - ignores testing flag)
             print("=" * 50)
             print("STEP 0: Message Categorization (LIVE - ignores testing flag)")
             print("=" * 50)
             
-            category, action, reply_text, next_step = categorize_message(last_user_msg, conversation_history)
+            step0_start = time.time()
+            category, action, reply_text, next_step = categorize_message(last_user_msg, prompt_history, conversation_summary)
+            metrics.observe("reply_engine.step0_ms", (time.time() - step0_start) * 1000)
+            
+            # Step 0 routed away from step 1 - the speculative FAQ result is not needed
+            if faq_future and next_step != 1:
+                self._discard_speculative_faq(faq_future, category)
             
             # If step 0 provides a direct reply, return it
             if reply_text and next_step is None:
@@ -89,7 +115,15 @@ class ReplyEngine:
                 print("STEP 1: Strict FAQ Matching (LIVE - ignores testing flag)")
                 print("=" * 50)
                 
-                confidence, faq_answer = strict_faq_match(last_user_msg, conversation_history)
+                if faq_future:
+                    wait_start = time.time()
+                    confidence, faq_answer = faq_future.result()
+                    wait_ms = (time.time() - wait_start) * 1000
+                    metrics.increment("reply_engine.speculative_faq.used")
+                    metrics.observe("reply_engine.speculative_faq.wait_ms", wait_ms)
+                    print(f"SPECULATIVE: Used speculative Step 1 result (waited {wait_ms:.0f}ms after Step 0)")
+                else:
+                    confidence, faq_answer = strict_faq_match(last_user_msg, prompt_history, conversation_summary)
                 if confidence >= 0.95 and faq_answer:
                     print(f"SUCCESS: Step 1 matched with confidence {confidence}")
                     return faq_answer
@@ -117,6 +151,17 @@ class ReplyEngine:
             print(f"Traceback: {traceback.format_exc()}")
             return "I'm having trouble processing your request right now. Please try again in a moment."
     
+    def _discard_speculative_faq(self, faq_future, category):
+        """Drop a speculative step 1 call that step 0 made unnecessary"""
+        if faq_future.cancel():
+            # Never started - no LLM call was spent
+            metrics.increment("reply_engine.speculative_faq.cancelled")
+            print(f"SPECULATIVE: Step 1 cancelled before starting (category '{category}')")
+        else:
+            # Already running or finished - the LLM call is wasted
+            metrics.increment("reply_engine.speculative_faq.wasted")
+            print(f"SPECULATIVE: Discarding Step 1 result (category '{category}' does not need FAQ matching)")
+    
     def _get_last_user_message(self, history):
         """Extract the last user message from conversation history"""
         for msg in reversed(history):
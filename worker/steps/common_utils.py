@@ -1,6 +1,8 @@
 import random
 import re
 
+from token_budget import pack_newest_first, elision_marker
+
 def get_random_reply(replies_list):
     """Get a random reply from a list of possible replies"""
     if replies_list:
@@ -48,16 +50,30 @@ def clean_html(text):
     
     return clean_text.strip()
 
-def build_conversation_context(conversation_history, limit_messages=10):
-    """Build conversation context string from history"""
+def build_summary_context(summary):
+    """Summary block placed before the verbatim history ("" without a summary)"""
+    if not summary:
+        return ""
+    return f"\n=== EARLIER CONVERSATION SUMMARY ===\n{summary}\n"
+
+def build_conversation_context(conversation_history, limit_messages=10, token_budget=None, max_message_tokens=None, summary=None):
+    """
+    Build conversation context string from history
+    
+    When token_budget is given, the newest messages are packed first and older
+    ones that don't fit are replaced by an elision marker. A rolling summary of
+    earlier messages is placed before the verbatim history when provided.
+    """
     if not conversation_history:
         return ""
     
-    context = "\n=== FULL CONVERSATION HISTORY ===\n"
+    context = build_summary_context(summary)
+    context += "\n=== FULL CONVERSATION HISTORY ===\n"
     
     # Use the most recent messages, but show them in chronological order
     recent_messages = conversation_history[-limit_messages:]
     
+    lines = []
     for i, msg in enumerate(recent_messages):
         if msg['message'].strip():
             clean_msg = clean_html(msg['message'])
@@ -74,8 +90,17 @@ def build_conversation_context(conversation_history, limit_messages=10):
                     pass
             
             # Add message number for easier reference
-            context += f"[{i+1}] {role}{timestamp_info}: {clean_msg}\n"
+            lines.append(f"[{i+1}] {role}{timestamp_info}: {clean_msg}")
+    
+    if token_budget:
+        lines, omitted = pack_newest_first(lines, token_budget, max_message_tokens)
+        if omitted:
+            print(f"DEBUG: Token budget ({token_budget}) elided {omitted} older messages")
+            lines.insert(0, elision_marker(omitted))
+    
+    for line in lines:
+        context += f"{line}\n"
     
     context += "=== END CONVERSATION HISTORY ===\n"
     
-    return context 
\ No newline at end of file
+    return context
@@ -0,0 +1,152 @@
+import sys
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import config
+import db
+import metrics
+from openai_utils import call_openai_with_retry
+from common_utils import clean_html
+from token_budget import count_tokens
+
+# Prompt for folding new messages into the running summary
+SUMMARY_PROMPT = """You maintain a running summary of a PlusVibe.ai (formerly pipl.ai) customer support conversation.
+
+Update the existing summary with the new messages. Keep:
+- What the customer asked or reported (products, features, error messages, IDs)
+- What support already answered, tried or promised
+- Anything still unresolved
+
+Write at most 150 words in plain sentences. Return ONLY the updated summary."""
+
+# Background pool for summary refreshes (kept off the reply critical path)
+_summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="conversation-summary")
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def get_summarized_history(conv_doc, conversation_history):
+    """
+    Split a conversation into the stored rolling summary plus messages to send verbatim
+
+    Messages already folded into the summary are dropped from the verbatim part.
+    Older messages not yet covered are kept verbatim for this reply and folded into
+    the summary in the background, so the next reply carries a bounded prompt.
+
+    Returns: (summary_text, verbatim_history)
+    """
+    if not conversation_history or len(conversation_history) <= config.SUMMARY_MIN_MESSAGES:
+        return "", conversation_history
+
+    summary = (conv_doc or {}).get("summary") or {}
+    summary_text = summary.get("text", "")
+    covered_until_ts = summary.get("covered_until_ts") or 0
+
+    keep_recent = config.SUMMARY_KEEP_RECENT_MESSAGES
+    older = conversation_history[:-keep_recent]
+    recent = conversation_history[-keep_recent:]
+
+    covered = [msg for msg in older if _is_covered(msg, covered_until_ts)]
+    uncovered = [msg for msg in older if not _is_covered(msg, covered_until_ts)]
+
+    if not summary_text:
+        covered = []
+        uncovered = older
+
+    if covered:
+        tokens_saved = count_tokens(_render_messages(covered)) - count_tokens(summary_text)
+        metrics.observe("conversation_summary.tokens_saved", tokens_saved, buckets=metrics.TOKEN_BUCKETS)
+        print(f"DEBUG: Conversation summary replaces {len(covered)} messages (saves {tokens_saved} tokens)")
+        if tokens_saved > 0 and conv_doc and conv_doc.get("conversation_id"):
+            db.add_summary_tokens_saved(conv_doc["conversation_id"], tokens_saved)
+
+    if uncovered:
+        print(f"DEBUG: {len(uncovered)} older messages not yet summarized - sending verbatim and refreshing summary")
+        _schedule_refresh(conv_doc, summary_text, uncovered)
+
+    return summary_text, uncovered + recent
+
+
+def _is_covered(msg, covered_until_ts):
+    """Check if a message was already folded into the summary"""
+    timestamp = msg.get("timestamp")
+    return bool(timestamp) and timestamp <= covered_until_ts
+
+
+def _render_messages(messages):
+    """Render messages the same way the step prompts do"""
+    lines = []
+    for msg in messages:
+        if msg['message'].strip():
+            role = "Customer" if msg['role'] == 'user' else "Support"
+            lines.append(f"{role}: {clean_html(msg['message'])}")
+    return "\n".join(lines)
+
+
+def _schedule_refresh(conv_doc, summary_text, new_messages):
+    """Fold new messages into the summary in the background (one refresh per conversation at a time)"""
+    conversation_id = (conv_doc or {}).get("conversation_id")
+    if not conversation_id:
+        return
+
+    with _refreshing_lock:
+        if conversation_id in _refreshing:
+            return
+        _refreshing.add(conversation_id)
+    _summary_executor.submit(_refresh_summary, conv_doc, summary_text, new_messages)
+
+
+def _refresh_summary(conv_doc, summary_text, new_messages):
+    """Update the stored summary with only the messages added since the last summary"""
+    conversation_id = conv_doc["conversation_id"]
+
+    try:
+        summary = conv_doc.get("summary") or {}
+        user_content = f"""CURRENT SUMMARY:
+{summary_text or "(none yet)"}
+
+NEW MESSAGES:
+{_render_messages(new_messages)}"""
+
+        start_time = time.time()
+        response = call_openai_with_retry(
+            messages=[
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": user_content}
+            ],
+            max_completion_tokens=300,
+            temperature=0.2,
+            model=config.SUMMARY_MODEL,
+            label="conversation_summary"
+        )
+        metrics.observe("conversation_summary.refresh_ms", (time.time() - start_time) * 1000)
+
+        if response is None or not response.choices:
+            print(f"ERROR: Summary refresh failed for conversation {conversation_id}")
+            return
+
+        new_summary = response.choices[0].message.content.strip()
+        timestamps = [msg.get("timestamp") for msg in new_messages if msg.get("timestamp")]
+        covered_until_ts = max(timestamps + [summary.get("covered_until_ts") or 0])
+        covered_messages = (summary.get("covered_messages") or 0) + len(new_messages)
+
+        db.update_conversation_summary(
+            conversation_id,
+            new_summary,
+            covered_until_ts,
+            covered_messages,
+            config.SUMMARY_MODEL
+        )
+        metrics.increment("conversation_summary.refreshes")
+        print(f"DEBUG: Conversation summary for {conversation_id} now covers {covered_messages} messages")
+
+    except Exception as e:
+        print(f"ERROR refreshing conversation summary for {conversation_id}: {e}")
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(conversation_id)
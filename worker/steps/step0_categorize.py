@@ -2,13 +2,16 @@ import sys
 import os
 import random
 import re
+import time
 
 # Add parent directory to path so we can import modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 import config
+import metrics
 from openai_utils import call_openai_with_retry
-from common_utils import get_random_reply, clean_html, build_conversation_context
+from common_utils import get_random_reply, clean_html, build_conversation_context, build_summary_context
+from token_budget import truncate_to_tokens, report_prompt_sections
 
 # Sticky prompt for message categorization
 STICKY_PROMPT = """You are a message categorizer for PlusVibe.ai (formely call pipl.ai) customer support. Analyze the ENTIRE conversation context and categorize the customer's intent into one of these types:
@@ -39,6 +42,16 @@ IMPORTANT: For UNHAPPY_WITH_ADMIN category, look for:
 - Repeated questions after receiving admin responses (indicates dissatisfaction with previous answers)
 """
 
+# Bump when STICKY_PROMPT changes. STICKY_PROMPT is sent as the first message so the
+# provider-side prompt cache can reuse it; per-conversation content always comes after it.
+PROMPT_VERSION = "step0-v2"
+
+# Minimum confidence to accept a category - anything below falls back to PROPER_QUESTION
+DEFAULT_CONFIDENCE_THRESHOLD = 0.7
+CATEGORY_CONFIDENCE_THRESHOLDS = {
+    "PROMOTIONAL_EMAIL": 0.9
+}
+
 # Category configurations - easy to modify and extend
 CATEGORY_ACTIONS = {
     "BUG_REPORT": {
@@ -141,29 +154,42 @@ def get_smart_resolution_reply(user_message):
     print(f"DEBUG: Issue resolved but no specific pattern matched: '{clean_msg}' - no reply")
     return None
 
-def categorize_message(user_message, conversation_history=None):
+def categorize_message(user_message, conversation_history=None, conversation_summary=None):
     """
     Categorize the user message and return the appropriate action
+    conversation_summary: optional rolling summary of messages older than conversation_history
     Returns: (category, action, reply_text, next_step)
     """
     try:
         print(f"DEBUG: Step 0 - Categorizing message: {user_message}")
         
         # Build conversation context if provided
-        conversation_context = ""
+        # Summary and verbatim history are built apart so each is counted once below
+        summary_context = ""
+        history_context = ""
         if conversation_history:
             print(f"DEBUG: Including {len(conversation_history)} messages of conversation context")
-            conversation_context = build_conversation_context(conversation_history, 15)  # Increased limit
+            summary_context = build_summary_context(conversation_summary)
+            history_context = build_conversation_context(
+                conversation_history,
+                15,  # Increased limit
+                token_budget=config.TOKEN_BUDGETS["step0"],
+                max_message_tokens=config.MAX_MESSAGE_TOKENS
+            )
+        conversation_context = summary_context + history_context
+        
+        # Cap the current message too - a pasted log file shouldn't blow up the prompt
+        prompt_message = truncate_to_tokens(user_message, config.MAX_MESSAGE_TOKENS)
         
         # Create prompt for AI categorization with context-first approach
         if conversation_context:
             user_content = f"""{conversation_context}
 
-CURRENT MESSAGE: "{user_message}"
+CURRENT MESSAGE: "{prompt_message}"
 
 Based on the ENTIRE conversation above, categorize the customer's intent. Pay special attention to any previous questions or issues that may not be resolved, and consider how the current message relates to the overall conversation flow."""
         else:
-            user_content = f"""Customer message: "{user_message}"
+            user_content = f"""Customer message: "{prompt_message}"
 
 Categorize this message and return JSON with category and confidence."""
         
@@ -172,7 +198,14 @@ Categorize this message and return JSON with category and confidence."""
             {"role": "user", "content": user_content}
         ]
         
-        print(f"DEBUG: Sending to OpenAI for categorization...")
+        report_prompt_sections("step0", {
+            "system": STICKY_PROMPT,
+            "summary": summary_context,
+            "history": history_context,
+            "current_message": prompt_message
+        })
+        
+        print(f"DEBUG: Sending to OpenAI for categorization (prompt {PROMPT_VERSION})...")
         print("=" * 80)
         print("CATEGORIZATION PROMPT:")
         print("=" * 80)
@@ -182,34 +215,22 @@ Categorize this message and return JSON with category and confidence."""
             print("-" * 40)
         print("=" * 80)
         
-        response = call_openai_with_retry(
-            messages=messages,
-            max_completion_tokens=150,  # Increased for more detailed analysis
-            temperature=0.1,  # Low temperature for consistent categorization
-            response_format={"type": "json_object"},
-            max_retries=3
-        )
+        result = _categorize_with_cascade(messages)
         
-        if response is None:
+        if result is None:
             print("ERROR: OpenAI API call failed after all retries")
             # Default to PROPER_QUESTION if categorization fails
             return "PROPER_QUESTION", "pass_to_step1", None, 1
         
-        ai_response = response.choices[0].message.content.strip()
-        print(f"DEBUG: AI categorization response: {ai_response}")
-        
-        # Parse JSON response
-        category, confidence = _parse_categorization_response(ai_response)
+        category, confidence = result
         
         print(f"DEBUG: Parsed category: {category}")
         print(f"DEBUG: Parsed confidence: {confidence}")
         
         # Apply confidence thresholds
-        if category == "PROMOTIONAL_EMAIL" and confidence < 0.9:
-            print(f"DEBUG: PROMOTIONAL_EMAIL confidence ({confidence}) below 0.9 threshold - defaulting to PROPER_QUESTION")
-            category = "PROPER_QUESTION"
-        elif confidence < 0.7:
-            print(f"DEBUG: Low confidence ({confidence}) - defaulting to PROPER_QUESTION")
+        threshold = _confidence_threshold(category)
+        if confidence < threshold:
+            print(f"DEBUG: {category} confidence ({confidence}) below {threshold} threshold - defaulting to PROPER_QUESTION")
             category = "PROPER_QUESTION"
         
         # Get action configuration for this category
@@ -249,6 +270,85 @@ Categorize this message and return JSON with category and confidence."""
         # Default to PROPER_QUESTION if anything goes wrong
         return "PROPER_QUESTION", "pass_to_step1", None, 1
 
+def _confidence_threshold(category):
+    """Get the minimum confidence required to accept a category"""
+    return CATEGORY_CONFIDENCE_THRESHOLDS.get(category, DEFAULT_CONFIDENCE_THRESHOLD)
+
+def _request_categorization(messages, model):
+    """
+    Ask a single model for a category
+    Returns: (category, confidence) or None if the API call failed
+    """
+    start_time = time.time()
+    response = call_openai_with_retry(
+        messages=messages,
+        max_completion_tokens=150,  # Increased for more detailed analysis
+        temperature=0.1,  # Low temperature for consistent categorization
+        response_format={"type": "json_object"},
+        max_retries=3,
+        model=model,
+        label="step0"
+    )
+    latency_ms = (time.time() - start_time) * 1000
+    metrics.observe(f"step0.cascade.latency_ms.{model}", latency_ms)
+    
+    if response is None:
+        print(f"DEBUG: Categorization call to {model} failed ({latency_ms:.0f}ms)")
+        return None
+    
+    ai_response = response.choices[0].message.content.strip()
+    print(f"DEBUG: AI categorization response from {model} ({latency_ms:.0f}ms): {ai_response}")
+    
+    return _parse_categorization_response(ai_response)
+
+def _categorize_with_cascade(messages):
+    """
+    Categorize with the cheap model first and escalate to the default model
+    only when the cheap answer is below the category's confidence threshold
+    Returns: (category, confidence) or None if every call failed
+    """
+    if not config.CATEGORIZATION_CASCADE:
+        return _request_categorization(messages, config.DEFAULT_MODEL)
+    
+    metrics.increment("step0.cascade.calls")
+    cheap_result = _request_categorization(messages, config.CATEGORIZATION_CHEAP_MODEL)
+    
+    if cheap_result:
+        cheap_category, cheap_confidence = cheap_result
+        if cheap_category in CATEGORY_ACTIONS and cheap_confidence >= _confidence_threshold(cheap_category):
+            metrics.increment("step0.cascade.accepted_cheap")
+            _log_cascade_stats()
+            return cheap_result
+        print(f"DEBUG: Cheap model confidence too low ({cheap_category}, {cheap_confidence}) - escalating to {config.DEFAULT_MODEL}")
+    else:
+        print(f"DEBUG: Cheap model failed - escalating to {config.DEFAULT_MODEL}")
+    
+    metrics.increment("step0.cascade.escalations")
+    default_result = _request_categorization(messages, config.DEFAULT_MODEL)
+    
+    # Track whether the cheap model would have picked the same category
+    if cheap_result and default_result:
+        if cheap_result[0] == default_result[0]:
+            metrics.increment("step0.cascade.agreements")
+        else:
+            metrics.increment("step0.cascade.disagreements")
+    
+    _log_cascade_stats()
+    
+    # Fall back to the cheap answer if the default model call failed
+    return default_result or cheap_result
+
+def _log_cascade_stats():
+    """Log escalation and agreement rates for tuning the cascade"""
+    calls = metrics.get_counter("step0.cascade.calls")
+    escalations = metrics.get_counter("step0.cascade.escalations")
+    agreements = metrics.get_counter("step0.cascade.agreements")
+    compared = agreements + metrics.get_counter("step0.cascade.disagreements")
+    
+    escalation_rate = (escalations / calls * 100) if calls else 0
+    agreement_rate = (agreements / compared * 100) if compared else 0
+    print(f"DEBUG: Cascade stats - calls: {calls}, escalation rate: {escalation_rate:.1f}%, agreement rate: {agreement_rate:.1f}% ({compared} compared)")
+
 def _parse_categorization_response(ai_response):
     """Parse JSON response to extract category and confidence"""
     try:
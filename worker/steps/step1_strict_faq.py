@@ -1,5 +1,6 @@
 import sys
 import os
+import hashlib
 import urllib.parse
 
 # Add parent directory to path so we can import modules
@@ -9,6 +10,7 @@ import config
 import db
 from bson import ObjectId
 from openai_utils import call_openai_with_retry
+from token_budget import pack_newest_first, elision_marker, truncate_to_tokens, report_prompt_sections
 
 # Sticky prompt for this step
 STICKY_PROMPT = """You are a human customer support that follows strict rule (never disclose that you're an AI) for PlusVibe.ai (a cold email automation SaaS, formerly called pipl.ai). Determine if the customer question EXACTLY matches one of the predefined FAQ questions.
@@ -18,6 +20,10 @@ Be EXTREMELY strict - only return a match if you are 100% confident the customer
 Return JSON format:
 {"num": [FAQ number if confident, otherwise 0], "confidence": [0.0 to 1.0]}"""
 
+# Bump when STICKY_PROMPT or the prefix layout changes. The static prefix (STICKY_PROMPT + FAQ list)
+# comes first so the provider-side prompt cache can reuse it across conversations.
+PROMPT_VERSION = "step1-v2"
+
 def _decode_faq_answer(answer):
     """Decode URL-encoded content in FAQ answers"""
     if not answer:
@@ -67,16 +73,17 @@ def _decode_faq_answer(answer):
     
     return workaround
 
-def strict_faq_match(user_message, conversation_history=None):
+def strict_faq_match(user_message, conversation_history=None, conversation_summary=None):
     """
     Try to match user message against FAQ database with high confidence
+    conversation_summary: optional rolling summary of messages older than conversation_history
     Returns: (confidence_score, faq_answer) or (0.0, None)
     """
     try:
         print(f"DEBUG: Step 1 - Strict FAQ matching for: {user_message}")
         
-        # Get all FAQ entries from database
-        faq_entries = list(db.qa_entries.find({}))
+        # Get all FAQ entries from database (stable order keeps the cached prompt prefix identical)
+        faq_entries = sorted(db.qa_entries.find({}), key=lambda faq: str(faq['_id']))
         
         if not faq_entries:
             print("DEBUG: No FAQ entries found in database")
@@ -89,27 +96,59 @@ def strict_faq_match(user_message, conversation_history=None):
         for i, faq in enumerate(faq_entries):
             faq_context += f"{i+1}. {faq['question']}\n"
         
-        # Build conversation context if provided
+        # Build conversation context if provided (newest messages first within the token budget);
+        # summary and verbatim history are kept apart so each is counted once below
         conversation_context = ""
+        summary_context = ""
+        history_context = ""
         if conversation_history:
             print(f"DEBUG: Including {len(conversation_history)} messages of conversation context")
-            conversation_context = "\nConversation history: (oldest on top)\n"
+            history_lines = []
             for msg in conversation_history[-20:]:  # Last 20 messages
                 if msg['message'].strip():
                     clean_msg = _clean_html(msg['message'])
                     role = "Customer" if msg['role'] == 'user' else "Support"
-                    conversation_context += f"{role}: {clean_msg}\n"
+                    history_lines.append(f"{role}: {clean_msg}")
+            
+            history_lines, omitted = pack_newest_first(
+                history_lines,
+                config.TOKEN_BUDGETS["step1"],
+                config.MAX_MESSAGE_TOKENS
+            )
+            if omitted:
+                print(f"DEBUG: Token budget elided {omitted} older messages")
+                history_lines.insert(0, elision_marker(omitted))
+            
+            if conversation_summary:
+                summary_context = f"\nSummary of earlier conversation:\n{conversation_summary}\n"
+            history_context = "\nConversation history: (oldest on top)\n"
+            for line in history_lines:
+                history_context += f"{line}\n"
+            conversation_context = summary_context + history_context
+        
+        prompt_question = truncate_to_tokens(user_message, config.MAX_MESSAGE_TOKENS)
+        
+        # Static prefix first (instructions + FAQ list), per-conversation content last
+        static_prefix = f"{STICKY_PROMPT}\n\n{faq_context}"
+        prefix_version = f"{PROMPT_VERSION}:{hashlib.sha1(static_prefix.encode('utf-8')).hexdigest()[:8]}"
+        print(f"DEBUG: Step 1 prompt prefix version: {prefix_version}")
         
         # Create prompt for AI to match
         messages = [
-            {"role": "system", "content": STICKY_PROMPT},
-            {"role": "user", "content": f"""Customer question: "{user_message}"
+            {"role": "system", "content": static_prefix},
+            {"role": "user", "content": f"""Customer question: "{prompt_question}"
 {conversation_context}
-{faq_context}
-
 Return JSON with FAQ number and confidence."""}
         ]
         
+        report_prompt_sections("step1", {
+            "system": STICKY_PROMPT,
+            "question": prompt_question,
+            "summary": summary_context,
+            "history": history_context,
+            "faq": faq_context
+        })
+        
         print(f"DEBUG: Sending to OpenAI for FAQ matching...")
         print("=" * 80)
         print("FULL PROMPT SENT TO OPENAI:")
@@ -125,7 +164,8 @@ Return JSON with FAQ number and confidence."""}
             max_completion_tokens=150,
             temperature=0.1,  # Low temperature for consistent matching
             response_format={"type": "json_object"},
-            max_retries=3
+            max_retries=3,
+            label="step1"
         )
         
         if response is None:
@@ -8,6 +8,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import config
 import db
+import metrics
+import mongo_monitoring
 from intercom_api import intercom_api
 from reply_engine import reply_engine
 
@@ -46,8 +48,9 @@ def handle_conversation(conv_doc):
                 print(f"  Skipping this round - will retry later when API data is fresh")
                 return
         
-        # Extract conversation history (last 20 messages)
-        conversation_history = intercom_api.extract_conversation_history(full_history_data, limit_messages=20)
+        # Extract conversation history (whole thread when rolling summaries are on, else last 20 messages)
+        history_limit = None if config.CONVERSATION_SUMMARY_ENABLED else 20
+        conversation_history = intercom_api.extract_conversation_history(full_history_data, limit_messages=history_limit)
         
         print(f"DEBUG: Conversation history: {len(conversation_history)} messages")
         
@@ -118,12 +121,22 @@ def handle_conversation(conv_doc):
     except Exception as e:
         print(f"Error handling conversation {conversation_id}: {e}")
 
+def dump_metrics():
+    """Print this process's metrics, incl. MongoDB latency histograms and recent slow commands"""
+    print("Worker metrics:")
+    print(metrics.format_snapshot())
+    slow_commands = mongo_monitoring.format_slow_commands()
+    if slow_commands:
+        print("Recent slow MongoDB commands:")
+        print(slow_commands)
+
 def worker_loop():
     """Main worker loop - runs continuously"""
     print(f"Starting bot worker with {config.DELAY_MIN_SECONDS}-{config.DELAY_MAX_SECONDS}s random delay...")
     print(f"Bot Admin ID: {config.BOT_ADMIN_ID}")
     print(f"Testing mode: {config.TESTING}")
     
+    last_dump = time.time()
     while True:
         try:
             # Calculate random delay for this iteration
@@ -141,9 +154,17 @@ def worker_loop():
                     
                     # Small delay between conversations to avoid rate limiting
                     time.sleep(1)
+                
+                dump_metrics()
+                last_dump = time.time()
             else:
                 print("No pending conversations found")
             
+            # Idle scans still query MongoDB - dump periodically so their latencies show up too
+            if time.time() - last_dump >= config.WORKER_METRICS_DUMP_SECONDS:
+                dump_metrics()
+                last_dump = time.time()
+            
             # Wait before next scan
             #print(f"Sleeping for 10 seconds...")
             time.sleep(10)